@@ -0,0 +1,151 @@
+"""Response compression benchmark: CPU time against bytes saved.
+
+Seeds a throwaway database (as http_bench.py does), captures real responses
+of the main pages uncompressed, then compresses each with every gzip level
+and brotli quality given, using the same functions as the app::
+
+    python benchmarks/compression_bench.py
+    python benchmarks/compression_bench.py --entries 500 --gzip-level 1 --gzip-level 6 --brotli-quality 4
+    python benchmarks/compression_bench.py --save benchmarks/compression.json
+
+The streamed export is also compressed chunk by chunk with a flush after
+each chunk, which is what the app does for streaming responses.
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from http_bench import prepare_environment, seed
+
+PAGES = {
+    'GET /journal?limit=100': '/journal?limit=100',
+    'GET /journal/<id>': '/journal/{entry_id}',
+    'GET /dashboard': '/dashboard',
+    'GET /courses': '/courses',
+}
+EXPORT = 'GET /journal/export (stream)'
+
+def capture(app, username, user_id):
+    """Fetch each page uncompressed; returns {name: list of body chunks}."""
+    import database
+    from http_bench import PASSWORD
+
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+    client.get('/dashboard')  # consume the login flash
+    with database.standalone_db() as conn:
+        entry_id = conn.execute('SELECT MAX(id) FROM journal_entries WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+    payloads = {}
+    for name, path in PAGES.items():
+        response = client.get(path.format(entry_id=entry_id))
+        payloads[name] = [response.get_data()]
+    response = client.get('/journal/export?format=ndjson', buffered=False)
+    payloads[EXPORT] = [bytes(chunk) for chunk in response.response]
+    response.close()
+    return payloads
+
+def measure(compress, repeat):
+    """Return (output bytes, CPU seconds per call) of ``compress()``."""
+    size = len(compress())
+    started = time.process_time()
+    for _ in range(repeat):
+        compress()
+    return size, (time.process_time() - started) / repeat
+
+def run(payloads, settings, repeat):
+    import compression
+
+    results = {}
+    for name, chunks in payloads.items():
+        body = b''.join(chunks)
+        rows = []
+        for encoding, level in settings:
+            if len(chunks) > 1:
+                size, cpu = measure(lambda: b''.join(compression.compress_stream(chunks, encoding, level)), repeat)
+            else:
+                size, cpu = measure(lambda: compression.compress_body(body, encoding, level), repeat)
+            rows.append({
+                'encoding': encoding,
+                'level': level,
+                'bytes': size,
+                'saved_bytes': len(body) - size,
+                'ratio': round(size / len(body), 4) if body else 1.0,
+                'cpu_ms': round(cpu * 1000, 4),
+                'mb_per_s': round(len(body) / cpu / 1e6, 1) if cpu else 0.0,
+                # Bytes saved per millisecond of CPU spent compressing
+                'saved_per_cpu_ms': round((len(body) - size) / (cpu * 1000)) if cpu else 0,
+            })
+        results[name] = {'bytes': len(body), 'chunks': len(chunks), 'settings': rows}
+    return results
+
+def print_report(results):
+    header = f"{'response':<30}{'codec':>9}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}{'MB/s':>8}{'saved/ms':>10}"
+    click.echo(header)
+    click.echo('-' * len(header))
+    for name, result in results.items():
+        click.echo(f"{name:<30}{'identity':>9}{result['bytes']:>10}{1:>8.3f}")
+        for row in result['settings']:
+            codec = f"{row['encoding']}-{row['level']}"
+            click.echo(f"{'':<30}{codec:>9}{row['bytes']:>10}{row['ratio']:>8.3f}{row['cpu_ms']:>10.3f}"
+                       f"{row['mb_per_s']:>8.1f}{row['saved_per_cpu_ms']:>10}")
+
+@click.command()
+@click.option('--entries', default=300, show_default=True, help='Journal entries for the measured user.')
+@click.option('--courses', default=8, show_default=True, help='Courses for the measured user.')
+@click.option('--gzip-level', 'gzip_levels', multiple=True, type=click.IntRange(1, 9),
+              help='gzip levels to measure (repeatable; default 1, 6 and 9).')
+@click.option('--brotli-quality', 'brotli_qualities', multiple=True, type=click.IntRange(0, 11),
+              help='brotli qualities to measure (repeatable; default 1, 4 and 11).')
+@click.option('--repeat', default=20, show_default=True, help='Compressions per measurement.')
+@click.option('--seed', 'seed_value', default=1, show_default=True, help='Random seed.')
+@click.option('--save', type=click.Path(dir_okay=False), help='Write results as JSON.')
+def main(entries, courses, gzip_levels, brotli_qualities, repeat, seed_value, save):
+    """Measure compression CPU cost against bytes saved for real responses."""
+    workdir = Path(tempfile.mkdtemp(prefix='journal-compress-'))
+    cwd = os.getcwd()
+    save = save and os.path.abspath(save)
+    prepare_environment(workdir, 'pbkdf2:sha256:1000')
+
+    from app import app, limiter
+    import compression
+    limiter.enabled = False
+
+    user_ids = seed(1, courses, entries, random.Random(seed_value))
+    username, user_id = next(iter(user_ids.items()))
+    try:
+        payloads = capture(app, username, user_id)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    settings = [('gzip', level) for level in gzip_levels or (1, 6, 9)]
+    if compression.brotli is not None:
+        settings += [('br', quality) for quality in brotli_qualities or (1, 4, 11)]
+    elif brotli_qualities:
+        click.echo('brotli is not installed; skipping brotli qualities.', err=True)
+
+    results = run(payloads, settings, repeat)
+    print_report(results)
+    if save:
+        with open(save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'entries': entries, 'courses': courses, 'repeat': repeat,
+                },
+                'responses': results,
+            }, f, indent=2)
+        click.echo(f'Saved results to {save}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""End-to-end HTTP benchmark for the School Journal app.
+
+Seeds a throwaway database, then drives the main routes with concurrent
+clients through the WSGI app (Flask test clients, one per thread) and
+reports throughput and p50/p95/p99 latency per route::
+
+    python benchmarks/http_bench.py --users 50 --entries 200 --clients 8
+    python benchmarks/http_bench.py --save benchmarks/baseline.json
+    python benchmarks/http_bench.py --compare benchmarks/baseline.json
+
+With --compare the exit status is 1 when any route's p95 latency grew, or
+its throughput fell, by more than --tolerance.
+"""
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+import click
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+PASSWORD = 'Bench-passw0rd'
+SUBJECTS = ['Fractions', 'Photosynthesis', 'The French Revolution', 'Loops in Python',
+            'Essay structure', 'Newton\'s laws', 'Irregular verbs', 'Probability']
+WORDS = ('we revised the homework and practised new examples before the quiz while '
+         'the teacher explained common mistakes and I asked questions about the topic').split()
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def _entry_form(rng, course_ids):
+    day = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    return {
+        'course_id': rng.choice(course_ids) if course_ids else '',
+        'date': day.isoformat(),
+        'subject': rng.choice(SUBJECTS),
+        'learnt': _text(rng, 40),
+        'challenges': _text(rng, 20),
+        'schedule': _text(rng, 10),
+    }
+
+def prepare_environment(workdir, hash_method):
+    """Point the app at a fresh database and quiet logs; must run before importing it."""
+    for name in ('templates', 'schema.sql', 'static'):
+        if (APP_DIR / name).exists():
+            os.symlink(APP_DIR / name, workdir / name)
+    (workdir / 'static').mkdir(exist_ok=True)
+    os.environ.update({
+        'SCHOOL_JOURNAL_DB': str(workdir / 'bench.db'),
+        'RATELIMIT_STORAGE_URI': f'sqlite:///{workdir / "ratelimits.db"}',
+        'LOG_FILE': str(workdir / 'bench.log'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+        'PASSWORD_HASH_METHOD': hash_method,
+    })
+    os.chdir(workdir)
+
+def seed(users, courses, entries, rng):
+    """Create users with courses and entries; returns {username: user id}."""
+    import database
+    import importer
+    from security import hash_password
+
+    database.init_db()
+    password_hash = hash_password(PASSWORD)
+    usernames = [f'bench{i}' for i in range(users)]
+    user_rows = ((i, {'first_name': 'Bench', 'last_name': f'User{i}', 'username': name,
+                      'email': f'{name}@example.com', 'password_hash': password_hash})
+                 for i, name in enumerate(usernames))
+    importer.import_users(user_rows)
+
+    def entry_rows():
+        line = itertools.count()
+        for name in usernames:
+            names = [f'Course {c}' for c in range(courses)]
+            for _ in range(entries):
+                row = _entry_form(rng, [])
+                row.update(username=name, course=rng.choice(names) if names else '')
+                yield next(line), row
+    importer.import_entries(entry_rows())
+
+    with database.standalone_db() as conn:
+        rows = conn.execute('SELECT id, username FROM users WHERE username LIKE ?', ('bench%',)).fetchall()
+    return {row['username']: row['id'] for row in rows}
+
+class Context:
+    """Per-thread state: a logged-in test client plus the user's courses and entries."""
+
+    def __init__(self, app, username, user_id, rng):
+        import database
+        self.client = app.test_client()
+        self.username = username
+        self.user_id = user_id
+        self.rng = rng
+        response = self.client.post('/login', data={'username': username, 'password': PASSWORD})
+        if response.status_code != 302:
+            raise click.ClickException(f'Could not log in as {username}: {response.status_code}')
+        with database.standalone_db() as conn:
+            self.course_ids = [row[0] for row in conn.execute(
+                'SELECT id FROM courses WHERE user_id = ?', (user_id,))]
+            self.entry_ids = [row[0] for row in conn.execute(
+                'SELECT id FROM journal_entries WHERE user_id = ?', (user_id,))]
+
+_registered = itertools.count()
+
+def _register(ctx):
+    name = f'newbench{next(_registered)}_{os.getpid()}'
+    return ctx.client.post('/register', data={
+        'first_name': 'New', 'last_name': 'Student', 'username': name,
+        'email': f'{name}@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+
+def _delete(ctx):
+    if not ctx.entry_ids:
+        ctx.client.post('/journal', data=_entry_form(ctx.rng, ctx.course_ids))
+        ctx.entry_ids = [row['id'] for row in _latest_entries(ctx)]
+    return ctx.client.post(f'/journal/{ctx.entry_ids.pop()}/delete')
+
+def _latest_entries(ctx):
+    import database
+    with database.standalone_db() as conn:
+        return conn.execute('SELECT id FROM journal_entries WHERE user_id = ? ORDER BY id DESC LIMIT 50',
+                            (ctx.user_id,)).fetchall()
+
+def _edit_id(ctx):
+    return ctx.rng.choice(ctx.entry_ids) if ctx.entry_ids else 0
+
+# name -> (request function, expected status codes)
+SCENARIOS = {
+    'GET /login': (lambda ctx: ctx.client.get('/login'), (200, 302)),
+    'POST /login': (lambda ctx: ctx.client.post('/login', data={'username': ctx.username, 'password': PASSWORD}), (302,)),
+    'POST /register': (_register, (302,)),
+    'GET /dashboard': (lambda ctx: ctx.client.get('/dashboard'), (200,)),
+    'GET /courses': (lambda ctx: ctx.client.get('/courses'), (200,)),
+    'GET /journal': (lambda ctx: ctx.client.get('/journal'), (200,)),
+    'POST /journal': (lambda ctx: ctx.client.post('/journal', data=_entry_form(ctx.rng, ctx.course_ids)), (302,)),
+    'GET /journal/<id>/edit': (lambda ctx: ctx.client.get(f'/journal/{_edit_id(ctx)}/edit'), (200,)),
+    'POST /journal/<id>/edit': (lambda ctx: ctx.client.post(f'/journal/{_edit_id(ctx)}/edit',
+                                                           data=_entry_form(ctx.rng, ctx.course_ids)), (302,)),
+    'POST /journal/<id>/delete': (_delete, (302,)),
+}
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def run_scenario(contexts, func, expected, requests):
+    """Issue ``requests`` calls of ``func`` spread over one thread per context."""
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker(ctx):
+        local, failed = [], Counter()
+        while next(remaining) < requests:
+            started = time.perf_counter()
+            response = func(ctx)
+            local.append(time.perf_counter() - started)
+            if response.status_code not in expected:
+                failed[str(response.status_code)] += 1
+            response.close()
+        with lock:
+            latencies.extend(local)
+            errors.update(failed)
+
+    threads = [threading.Thread(target=worker, args=(ctx,)) for ctx in contexts]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_statuses': dict(errors),
+        'seconds': round(elapsed, 4),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(1000 * percentile(latencies, 50), 3),
+        'p95_ms': round(1000 * percentile(latencies, 95), 3),
+        'p99_ms': round(1000 * percentile(latencies, 99), 3),
+    }
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages against a saved baseline."""
+    regressions = []
+    for name, current in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if before['rps'] and current['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['rps']}/s -> {current['rps']}/s")
+    return regressions
+
+def print_report(results, baseline=None):
+    header = f"{'route':<28}{'reqs':>7}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'p95 vs base':>13}"
+    click.echo(header)
+    click.echo('-' * len(header))
+    for name, row in results['routes'].items():
+        line = (f"{name:<28}{row['requests']:>7}{row['errors']:>5}{row['rps']:>10.1f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+        before = (baseline or {}).get('routes', {}).get(name)
+        if before and before['p95_ms']:
+            line += f"{(row['p95_ms'] / before['p95_ms'] - 1) * 100:>+12.1f}%"
+        click.echo(line)
+
+@click.command()
+@click.option('--users', default=20, show_default=True, help='Seeded users.')
+@click.option('--courses', default=5, show_default=True, help='Courses per seeded user.')
+@click.option('--entries', default=100, show_default=True, help='Journal entries per seeded user.')
+@click.option('--clients', default=8, show_default=True, help='Concurrent clients (threads).')
+@click.option('--requests', 'requests_per_route', default=200, show_default=True, help='Requests per route.')
+@click.option('--route', 'routes', multiple=True, type=click.Choice(list(SCENARIOS)),
+              help='Only run these routes (repeatable).')
+@click.option('--hash-method', default='pbkdf2:sha256:1000', show_default=True,
+              help='Password hash method; use the production one to include hashing cost.')
+@click.option('--seed', 'seed_value', default=1, show_default=True, help='Random seed.')
+@click.option('--keep', is_flag=True, help='Keep the seeded working directory afterwards.')
+@click.option('--save', type=click.Path(dir_okay=False), help='Write results as a JSON baseline.')
+@click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False),
+              help='Compare against a saved JSON baseline.')
+@click.option('--tolerance', default=0.2, show_default=True, help='Allowed regression ratio with --compare.')
+def main(users, courses, entries, clients, requests_per_route, routes, hash_method, seed_value,
+         keep, save, compare_path, tolerance):
+    """Benchmark the app's routes end to end."""
+    clients = max(1, min(clients, users))
+    workdir = Path(tempfile.mkdtemp(prefix='journal-bench-'))
+    cwd = os.getcwd()
+    save = save and os.path.abspath(save)
+    compare_path = compare_path and os.path.abspath(compare_path)
+    prepare_environment(workdir, hash_method)
+
+    from app import app, limiter
+    # The limiter has already read the app config, so switch it off directly
+    limiter.enabled = False
+
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    user_ids = seed(users, courses, entries, rng)
+    click.echo(f'Seeded {users} users x {entries} entries in {time.perf_counter() - started:.1f}s ({workdir})')
+
+    contexts = [Context(app, name, user_ids[name], random.Random(seed_value + i))
+                for i, name in enumerate(sorted(user_ids)[:clients])]
+
+    results = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'users': users, 'courses': courses, 'entries': entries,
+            'clients': clients, 'requests': requests_per_route, 'hash_method': hash_method,
+        },
+        'routes': {},
+    }
+    for name in routes or SCENARIOS:
+        func, expected = SCENARIOS[name]
+        results['routes'][name] = run_scenario(contexts, func, expected, requests_per_route)
+
+    os.chdir(cwd)
+    if not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    baseline = None
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if save:
+        with open(save, 'w') as f:
+            json.dump(results, f, indent=2)
+        click.echo(f'Saved baseline to {save}')
+    if baseline:
+        regressions = compare(results, baseline, tolerance)
+        for message in regressions:
+            click.echo(f'REGRESSION {message}', err=True)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,62 +1,57 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import get_db, close_db
+from security import hash_password, verify_password, needs_rehash, HashingBusyError
+from database import get_db, close_db, commit_db, rollback_db, get_user_by_username, invalidate_user
 import logging
 import sqlite3
 from flask import g
 
 logger = logging.getLogger(__name__)
 
-def get_user_by_username(username):
-    """Get user by username."""
-    conn = None
-    try:
-        logger.debug(f"Getting user by username: {username}")
-        conn = get_db()
-        cursor = conn.cursor()
-        user = cursor.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        return user
-    except sqlite3.Error as e:
-        logger.error(f"Database error during get user by username: {str(e)}")
-        return None
-    except Exception as e:
-        logger.error(f"Error getting user by username: {str(e)}")
-        return None
-    finally:
-        if conn:
-            close_db(conn)
-
 def handle_login(username, password):
     """Handle user login."""
     conn = None
     try:
-        logger.debug(f"Attempting login for user: {username}")
-        conn = get_db()
-        cursor = conn.cursor()
+        logger.debug("Attempting login for user: %s", username)
+        # Get user from the cache or database
+        user = get_user_by_username(username)
         
-        # Get user from database
-        user = cursor.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        
-        if user and check_password_hash(user['password'], password):
-            logger.info(f"Login successful for user: {username}")
+        if user and verify_password(user['password'], password):
+            logger.info("Login successful for user: %s", username)
+            if needs_rehash(user['password']):
+                conn = get_db()
+                _upgrade_password_hash(conn, user['id'], password)
             return user
         else:
-            logger.warning(f"Login failed for user: {username}")
+            logger.warning("Login failed for user: %s", username)
             return None
+    except HashingBusyError:
+        raise
     except sqlite3.Error as e:
-        logger.error(f"Database error during login: {str(e)}")
+        logger.error("Database error during login: %s", e)
         return None
     except Exception as e:
-        logger.error(f"Error during login: {str(e)}")
+        logger.error("Error during login: %s", e)
         return None
     finally:
         if conn:
             close_db(conn)
 
+def _upgrade_password_hash(conn, user_id, password):
+    """Re-hash a password whose stored hash uses an outdated method or cost."""
+    try:
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (hash_password(password), user_id))
+        commit_db(conn)
+        invalidate_user(user_id=user_id, conn=conn)
+        logger.info("Upgraded password hash for user ID: %s", user_id)
+    except (HashingBusyError, sqlite3.Error) as e:
+        # Not fatal: the old hash still works and we retry on the next login
+        logger.warning("Could not upgrade password hash for user ID %s: %s", user_id, e)
+
 def handle_register(first_name, last_name, username, email, password, confirm_password):
     """Handle user registration."""
+    conn = None
     try:
-        logger.debug(f"Starting registration for user: {username}")
-        logger.debug(f"Form data: first_name={first_name}, last_name={last_name}, email={email}, username={username}")
+        logger.debug("Starting registration for user: %s", username)
+        logger.debug("Form data: first_name=%s, last_name=%s, email=%s, username=%s", first_name, last_name, email, username)
         
         # Validate password confirmation
         if password != confirm_password:
@@ -85,32 +80,36 @@ def handle_register(first_name, last_name, username, email, password, confirm_pa
         logger.debug("Checking for existing username/email")
         existing_user = cursor.execute('SELECT id FROM users WHERE username = ? OR email = ?', (username, email)).fetchone()
         if existing_user:
-            logger.error(f"Username or email already exists: {username}")
+            logger.error("Username or email already exists: %s", username)
             return False
             
         logger.debug("Creating new user record")
         cursor.execute('INSERT INTO users (first_name, last_name, username, email, password) VALUES (?, ?, ?, ?, ?)',
-                     (first_name, last_name, username, email, generate_password_hash(password)))
-        conn.commit()
-        close_db(conn)
-        logger.info(f"User registered successfully: {username}")
+                     (first_name, last_name, username, email, hash_password(password)))
+        commit_db(conn)
+        invalidate_user(username=username, conn=conn)
+        logger.info("User registered successfully: %s", username)
         return True
+    except HashingBusyError:
+        rollback_db(conn)
+        raise
     except sqlite3.Error as e:
-        logger.error(f"Database error during registration: {str(e)}", exc_info=True)
-        close_db(conn)
+        logger.error("Database error during registration: %s", e, exc_info=True)
+        rollback_db(conn)
         return False
     except Exception as e:
-        logger.error(f"Unexpected error during registration: {str(e)}", exc_info=True)
-        close_db(conn)
+        logger.error("Unexpected error during registration: %s", e, exc_info=True)
+        rollback_db(conn)
         return False
     finally:
+        close_db(conn)
         logger.debug("Registration process complete")
 
 def handle_profile_update(user_id, first_name, last_name, username, email, password):
     """Update user profile."""
     conn = None
     try:
-        logger.debug(f"Updating profile for user ID: {user_id}")
+        logger.debug("Updating profile for user ID: %s", user_id)
         conn = get_db()
         cursor = conn.cursor()
         
@@ -131,10 +130,10 @@ def handle_profile_update(user_id, first_name, last_name, username, email, passw
             
         # Check if username or email exists for other users
         if cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?', (username, user_id)).fetchone():
-            logger.error(f"Username already exists for another user: {username}")
+            logger.error("Username already exists for another user: %s", username)
             return False
         if cursor.execute('SELECT id FROM users WHERE email = ? AND id != ?', (email, user_id)).fetchone():
-            logger.error(f"Email already exists for another user: {email}")
+            logger.error("Email already exists for another user: %s", email)
             return False
             
         # Update user
@@ -143,7 +142,7 @@ def handle_profile_update(user_id, first_name, last_name, username, email, passw
                 UPDATE users 
                 SET first_name = ?, last_name = ?, username = ?, email = ?, password = ? 
                 WHERE id = ?
-            ''', (first_name, last_name, username, email, generate_password_hash(password), user_id))
+            ''', (first_name, last_name, username, email, hash_password(password), user_id))
         else:
             cursor.execute('''
                 UPDATE users 
@@ -151,10 +150,12 @@ def handle_profile_update(user_id, first_name, last_name, username, email, passw
                 WHERE id = ?
             ''', (first_name, last_name, username, email, user_id))
         
-        conn.commit()
+        commit_db(conn)
+        invalidate_user(user_id=user_id, username=username, conn=conn)
         return True
     except Exception as e:
-        logger.error(f"Profile update error: {str(e)}")
+        logger.error("Profile update error: %s", e)
+        rollback_db(conn)
         return False
     finally:
         if conn:
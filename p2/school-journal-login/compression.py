@@ -0,0 +1,129 @@
+import logging
+import zlib
+from flask import request
+from werkzeug.wsgi import ClosingIterator
+import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Response compression for dynamic content.
+#
+# An after_request hook compresses responses whose MIME type is in
+# COMPRESS_MIMETYPES with the first of COMPRESS_ALGORITHMS the client
+# accepts (brotli only when the package is installed). Buffered responses
+# smaller than COMPRESS_MIN_SIZE, or that would not get smaller, are sent
+# as they are; streamed ones (the journal export) are compressed chunk by
+# chunk with a sync flush after each, so the client still receives data as
+# it is produced. Responses that already carry a Content-Encoding, files
+# sent by send_file (the fingerprinted static assets are precompressed at
+# build time), partial content and "no-transform" responses are left alone.
+#
+# The compressed body is a different representation, so a strong ETag is
+# weakened (as nginx does) and Vary: Accept-Encoding is added;
+# conditional.py compares ETags weakly. benchmarks/compression_bench.py
+# measures CPU time against bytes saved per algorithm and level.
+
+def _mimetypes(value):
+    return frozenset(item.strip().lower() for item in value.split(',') if item.strip())
+
+MIMETYPES = _mimetypes(config.COMPRESS_MIMETYPES)
+
+def available_encodings():
+    """Configured Content-Encodings this process can produce, in order of preference."""
+    encodings = []
+    for name in config.COMPRESS_ALGORITHMS.split(','):
+        name = name.strip().lower()
+        if name == 'gzip' or (name == 'br' and brotli is not None):
+            encodings.append(name)
+    return encodings
+
+def compress_body(data, encoding, level=None):
+    """Compress ``data`` in one go with gzip or brotli."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.COMPRESS_BROTLI_QUALITY if level is None else level)
+    compressor = zlib.compressobj(config.COMPRESS_LEVEL if level is None else level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def compress_stream(chunks, encoding, level=None):
+    """Compress an iterable of byte (or text) chunks, flushing after each one."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config.COMPRESS_BROTLI_QUALITY if level is None else level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(config.COMPRESS_LEVEL if level is None else level, zlib.DEFLATED, 31)
+        process = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    for encoding in available_encodings():
+        if accepted[encoding]:
+            return encoding
+    return None
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    if response.cache_control.no_transform:
+        return False
+    return response.mimetype in MIMETYPES
+
+def _mark_encoded(response, encoding):
+    response.content_encoding = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+def compress_response(response):
+    """after_request hook: compress ``response`` when the client and thresholds allow."""
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        if config.COMPRESS_STREAMS:
+            # Closing the response must still close the view's iterable,
+            # which may hold a pooled connection (see export_journal)
+            body = response.response
+            response.response = ClosingIterator(compress_stream(body, encoding),
+                                                [getattr(body, 'close', lambda: None)])
+            response.headers.pop('Content-Length', None)
+            _mark_encoded(response, encoding)
+        return response
+
+    data = response.get_data()
+    if len(data) < config.COMPRESS_MIN_SIZE:
+        return response
+    try:
+        compressed = compress_body(data, encoding)
+    except (zlib.error, getattr(brotli, 'error', zlib.error)) as e:
+        logger.error("Error compressing %s response: %s", response.mimetype, e)
+        return response
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    _mark_encoded(response, encoding)
+    return response
+
+def init_app(app):
+    """Compress eligible responses of ``app``."""
+    app.after_request(compress_response)
+    logger.info("Compressing responses with %s", ', '.join(available_encodings()) or 'nothing')
@@ -0,0 +1,69 @@
+import functools
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from flask import current_app, g, make_response, request, session
+from database import get_data_version
+
+logger = logging.getLogger(__name__)
+
+# Conditional GET for per-user pages.
+#
+# A page's ETag is derived from the user's data version (bumped by triggers
+# on every journal or course write), the URL, the logged-in username, today's
+# date (the dashboard counts "this week" and streaks) and the templates'
+# modification times. A request whose If-None-Match matches gets a 304 after
+# one primary-key lookup, before the view runs any query or renders anything.
+# Pages are never made conditional while flash messages are pending, since
+# the rendered flash would otherwise be replayed from the browser cache.
+# ETags are compared weakly: compression.py weakens them on encoded bodies.
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / 'templates'
+
+def _templates_stamp():
+    try:
+        return str(max(int(path.stat().st_mtime) for path in TEMPLATES_DIR.glob('*.html')))
+    except ValueError:
+        return ''
+
+TEMPLATES_STAMP = _templates_stamp()
+
+def page_etag(user_id, version):
+    """Return the strong ETag of the current request's page at ``version``."""
+    parts = (request.endpoint, request.full_path, str(user_id), str(version),
+             session.get('user', ''), datetime.now().date().isoformat(), TEMPLATES_STAMP)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+def current_data_version(user_id):
+    """Return the user's data version, reusing the one conditional_page looked up."""
+    version = g.get('data_version')
+    if version is None:
+        version = get_data_version(user_id)[0]
+    return version
+
+def conditional_page(view):
+    """Serve GETs of ``view`` with ETag/Last-Modified and answer 304 when unchanged."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or 'user_id' not in session or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        version, updated_at = get_data_version(session['user_id'])
+        g.data_version = version
+        etag = page_etag(session['user_id'], version)
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or session.get('_flashes'):
+                return response
+
+        response.set_etag(etag)
+        if updated_at is not None:
+            response.last_modified = datetime.fromtimestamp(updated_at, timezone.utc)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response
+    return wrapper
@@ -0,0 +1,136 @@
+import os
+
+# Application settings, read once from the environment so that every module
+# (and every worker process) sees the same values.
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# Database
+DB_FILE = os.environ.get('SCHOOL_JOURNAL_DB', 'school_journal.db')
+
+# Connection pool
+DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 8)
+DB_POOL_TIMEOUT = _env_float('DB_POOL_TIMEOUT', 5.0)
+
+# Per-connection SQLite tuning
+DB_BUSY_TIMEOUT_MS = _env_int('DB_BUSY_TIMEOUT_MS', 5000)
+DB_CACHE_SIZE_KB = _env_int('DB_CACHE_SIZE_KB', 16384)
+DB_MMAP_SIZE = _env_int('DB_MMAP_SIZE', 128 * 1024 * 1024)
+
+# Journal listing
+JOURNAL_PAGE_SIZE = _env_int('JOURNAL_PAGE_SIZE', 20)
+JOURNAL_MAX_PAGE_SIZE = _env_int('JOURNAL_MAX_PAGE_SIZE', 100)
+
+# Password hashing
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = _env_int('PASSWORD_HASH_MAX_PENDING', 32)
+PASSWORD_HASH_TIMEOUT = _env_float('PASSWORD_HASH_TIMEOUT', 10.0)
+
+# In-process caches
+USER_CACHE_SIZE = _env_int('USER_CACHE_SIZE', 1024)
+USER_CACHE_TTL = _env_float('USER_CACHE_TTL', 60.0)
+COURSES_CACHE_SIZE = _env_int('COURSES_CACHE_SIZE', 1024)
+COURSES_CACHE_TTL = _env_float('COURSES_CACHE_TTL', 300.0)
+
+# Rendered-fragment cache (journal entries table, course dropdowns)
+# memory:// is per process; sqlite:///path is shared by every worker; none:// disables
+FRAGMENT_CACHE_URI = os.environ.get('FRAGMENT_CACHE_URI', 'memory://')
+FRAGMENT_CACHE_MAX_BYTES = _env_int('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+FRAGMENT_CACHE_PRUNE_INTERVAL = _env_float('FRAGMENT_CACHE_PRUNE_INTERVAL', 30.0)
+
+# JSON API
+API_BATCH_MAX_OPERATIONS = _env_int('API_BATCH_MAX_OPERATIONS', 500)
+
+# Bulk import
+IMPORT_BATCH_SIZE = _env_int('IMPORT_BATCH_SIZE', 1000)
+IMPORT_CHUNK_SIZE = _env_int('IMPORT_CHUNK_SIZE', 20000)
+
+# Streaming export
+EXPORT_CHUNK_SIZE = _env_int('EXPORT_CHUNK_SIZE', 500)
+EXPORT_GZIP_LEVEL = _env_int('EXPORT_GZIP_LEVEL', 6)
+
+# Static assets (manage.py build-static)
+STATIC_BUILD_DIR = os.environ.get('STATIC_BUILD_DIR', 'dist')
+STATIC_GZIP_LEVEL = _env_int('STATIC_GZIP_LEVEL', 9)
+STATIC_BROTLI_QUALITY = _env_int('STATIC_BROTLI_QUALITY', 11)
+STATIC_COMPRESS_MIN_SIZE = _env_int('STATIC_COMPRESS_MIN_SIZE', 256)
+
+# Dynamic response compression
+COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+# Content-Encodings in order of preference; br needs the brotli package
+COMPRESS_ALGORITHMS = os.environ.get('COMPRESS_ALGORITHMS', 'br,gzip')
+COMPRESS_MIMETYPES = os.environ.get('COMPRESS_MIMETYPES', ','.join((
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'image/svg+xml')))
+COMPRESS_MIN_SIZE = _env_int('COMPRESS_MIN_SIZE', 1024)
+COMPRESS_LEVEL = _env_int('COMPRESS_LEVEL', 6)
+COMPRESS_BROTLI_QUALITY = _env_int('COMPRESS_BROTLI_QUALITY', 4)
+COMPRESS_STREAMS = os.environ.get('COMPRESS_STREAMS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# Environment
+APP_ENV = os.environ.get('APP_ENV', 'development').lower()
+
+# Logging
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if APP_ENV == 'development' else 'INFO').upper()
+# Per-logger overrides, e.g. "database=WARNING,werkzeug=INFO"
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '' if APP_ENV == 'development' else 'werkzeug=WARNING')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+LOG_MAX_BYTES = _env_int('LOG_MAX_BYTES', 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = _env_int('LOG_BACKUP_COUNT', 5)
+# Set to a TimedRotatingFileHandler interval (e.g. "midnight", "H") to rotate
+# by time instead of by size. Neither applies under `start.py serve` with
+# more than one worker, which leaves rotation to an external tool.
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN', '')
+
+# Production server (start.py serve)
+SERVER_BIND = os.environ.get('SERVER_BIND', '127.0.0.1:5001')
+SERVER_WORKERS = _env_int('SERVER_WORKERS', os.cpu_count() or 1)
+SERVER_THREADS = _env_int('SERVER_THREADS', 4)
+SERVER_TIMEOUT = _env_int('SERVER_TIMEOUT', 30)
+SERVER_GRACEFUL_TIMEOUT = _env_int('SERVER_GRACEFUL_TIMEOUT', 30)
+SERVER_KEEPALIVE = _env_int('SERVER_KEEPALIVE', 5)
+# Recycle each worker after this many requests (0 disables), with jitter so
+# workers do not all restart at once.
+SERVER_MAX_REQUESTS = _env_int('SERVER_MAX_REQUESTS', 10000)
+SERVER_MAX_REQUESTS_JITTER = _env_int('SERVER_MAX_REQUESTS_JITTER', 1000)
+
+# Rate limiting
+# memory:// counts per process; sqlite:///path shares counters between workers
+RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'sqlite:///ratelimits.db')
+RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY', 'sliding-window-counter')
+RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '200 per day;50 per hour')
+RATELIMIT_PRUNE_INTERVAL = _env_float('RATELIMIT_PRUNE_INTERVAL', 60.0)
+RATELIMIT_MAX_KEYS = _env_int('RATELIMIT_MAX_KEYS', 100000)
+
+# Login throttling (per username, and more leniently per client IP)
+LOGIN_FAILURE_WINDOW = _env_int('LOGIN_FAILURE_WINDOW', 900)
+LOGIN_FREE_ATTEMPTS = _env_int('LOGIN_FREE_ATTEMPTS', 3)
+LOGIN_BACKOFF_BASE = _env_float('LOGIN_BACKOFF_BASE', 1.0)
+LOGIN_BACKOFF_MAX = _env_float('LOGIN_BACKOFF_MAX', 60.0)
+LOGIN_LOCKOUT_ATTEMPTS = _env_int('LOGIN_LOCKOUT_ATTEMPTS', 10)
+LOGIN_LOCKOUT_SECONDS = _env_int('LOGIN_LOCKOUT_SECONDS', 900)
+LOGIN_IP_FREE_ATTEMPTS = _env_int('LOGIN_IP_FREE_ATTEMPTS', 20)
+LOGIN_IP_LOCKOUT_ATTEMPTS = _env_int('LOGIN_IP_LOCKOUT_ATTEMPTS', 100)
+
+# Metrics (Prometheus text format on /metrics)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# Slow-query recorder (opt-in)
+SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', '0').lower() in ('1', 'true', 'yes', 'on')
+SLOW_QUERY_THRESHOLD_MS = _env_float('SLOW_QUERY_THRESHOLD_MS', 50.0)
+SLOW_QUERY_BUFFER_SIZE = _env_int('SLOW_QUERY_BUFFER_SIZE', 200)
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = _env_int('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024)
+SLOW_QUERY_LOG_BACKUP_COUNT = _env_int('SLOW_QUERY_LOG_BACKUP_COUNT', 3)
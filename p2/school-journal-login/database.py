@@ -1,122 +1,609 @@
-from flask import g
+from flask import g, has_app_context
 import sqlite3
+import queue
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+import base64
+import binascii
+import re
 from pathlib import Path
-from datetime import datetime
-from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta, date as date_type
+from security import hash_password
+from markupsafe import Markup, escape
 import logging
+import config
+from cache import LRUCache
+import fragment_cache
 
 logger = logging.getLogger(__name__)
 
 # Global variables
-DB_FILE = Path('school_journal.db')
+DB_FILE = Path(config.DB_FILE)
 SCHEMA_FILE = 'schema.sql'
 
+# PRAGMAs applied once to every pooled connection when it is opened.
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA foreign_keys = ON',
+    f'PRAGMA cache_size = -{config.DB_CACHE_SIZE_KB}',
+    f'PRAGMA mmap_size = {config.DB_MMAP_SIZE}',
+    f'PRAGMA busy_timeout = {config.DB_BUSY_TIMEOUT_MS}',
+    'PRAGMA temp_store = MEMORY',
+)
+
+# Called after every statement run on a pooled connection as
+# listener(conn, sql, parameters, seconds); see add_statement_listener().
+_statement_listeners = []
+
+def add_statement_listener(listener):
+    """Register a callback that receives each statement and its duration."""
+    if listener not in _statement_listeners:
+        _statement_listeners.append(listener)
+
+def remove_statement_listener(listener):
+    """Unregister a statement callback."""
+    if listener in _statement_listeners:
+        _statement_listeners.remove(listener)
+
+def _notify_statement(conn, sql, parameters, seconds):
+    for listener in _statement_listeners:
+        try:
+            listener(conn, sql, parameters, seconds)
+        except Exception as e:
+            logger.error("Statement listener failed: %s", e)
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's duration to the statement listeners.
+
+    SQLite does most of a query's work while stepping through its rows, so
+    a statement that returns rows is timed across execute() and every fetch
+    (or iteration step) and reported once its rows run out, or when the
+    cursor is closed, re-executed or dropped. Other statements are reported
+    as soon as execute() returns. With no listeners registered it adds
+    nothing but the method calls.
+    """
+
+    # [sql, parameters, seconds so far] of a statement whose rows are being read
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        if self._pending is not None:
+            self._finish()
+        if not _statement_listeners:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            _notify_statement(self.connection, sql, parameters, time.perf_counter() - started)
+            raise
+        seconds = time.perf_counter() - started
+        if self.description is None:
+            _notify_statement(self.connection, sql, parameters, seconds)
+        else:
+            self._pending = [sql, parameters, seconds]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if self._pending is not None:
+            self._finish()
+        if not _statement_listeners:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _notify_statement(self.connection, sql, None, time.perf_counter() - started)
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            _notify_statement(self.connection, *pending)
+
+    def _fetch(self, fetch, *args):
+        pending = self._pending
+        if pending is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            pending[2] += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None and self._pending is not None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._fetch(super().fetchmany, size)
+        if len(rows) < size and self._pending is not None:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        if self._pending is not None:
+            self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._fetch(super().__next__)
+        except StopIteration:
+            if self._pending is not None:
+                self._finish()
+            raise
+
+    def close(self):
+        if self._pending is not None:
+            self._finish()
+        super().close()
+
+    def __del__(self):
+        # A cursor read with a single fetchone() is usually just dropped
+        if self._pending is not None:
+            try:
+                self._finish()
+            except Exception:
+                pass
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool.
+
+    Statements go through TimedCursor, including those run with the
+    connection's execute() shortcuts.
+    """
+
+    pool = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            sqlite3.Connection.close(self)
+
+class ConnectionPool:
+    """Bounded pool of pre-configured SQLite connections.
+
+    Idle connections are reused most-recently-used first so their page cache
+    stays warm. When every connection is checked out, callers wait up to
+    ``timeout`` seconds for one to be released.
+    """
+
+    def __init__(self, database, max_size=config.DB_POOL_SIZE, timeout=config.DB_POOL_TIMEOUT):
+        self.database = str(database)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._in_use = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stats = {
+            'connections_created': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, factory=PooledConnection,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        self._stats['connections_created'] += 1
+        logger.debug("Opened pooled connection to %s", self.database)
+        return conn
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if there is room."""
+        with self._lock:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+                if len(self._in_use) < self.max_size:
+                    conn = self._connect()
+            if conn is not None:
+                self._in_use.add(conn)
+                self._stats['checkouts'] += 1
+                return conn
+
+        # Pool exhausted: wait for another thread to release a connection.
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise Exception("Timed out waiting for a database connection")
+        with self._lock:
+            self._in_use.add(conn)
+            self._stats['checkouts'] += 1
+            self._stats['waits'] += 1
+            self._stats['wait_seconds'] += time.perf_counter() - started
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        with self._lock:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error("Discarding broken pooled connection: %s", e)
+            sqlite3.Connection.close(conn)
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            sqlite3.Connection.close(conn)
+        with self._lock:
+            for conn in list(self._in_use):
+                conn.pool = None
+
+    def stats(self):
+        """Return a snapshot of checkout and wait statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_use'] = len(self._in_use)
+            stats['idle'] = self._idle.qsize()
+        stats['max_size'] = self.max_size
+        return stats
+
+_pool = None
+_pool_lock = threading.Lock()
+# Pools inherited across a fork; kept referenced so their connections are
+# never closed (and the parent's WAL never checkpointed) from the child.
+_inherited_pools = []
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None or _pool.database != str(DB_FILE):
+        with _pool_lock:
+            if _pool is None or _pool.database != str(DB_FILE):
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DB_FILE)
+    return _pool
+
+def close_pool():
+    """Close all pooled connections, e.g. at shutdown or in tests."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+def reset_pool_after_fork():
+    """Forget the parent's connection pool in a freshly forked server worker.
+
+    SQLite connections must not be used on both sides of a fork, so the
+    worker leaves the inherited handles alone and opens its own on first use.
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+def pool_stats():
+    """Return connection pool statistics."""
+    return get_pool().stats()
+
 def init_db():
     """Initialize the database with required tables."""
+    conn = None
     try:
         logger.debug("Initializing database...")
         conn = sqlite3.connect(DB_FILE)
+        existing = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+        _add_missing_columns(conn, existing)
+        existing -= _drop_outdated_search_index(conn, existing)
         with open(SCHEMA_FILE, 'r') as f:
-            sql = f.read()
-            # Split SQL into individual statements
-            statements = sql.split(';')
-            cursor = conn.cursor()
-            for statement in statements:
-                if statement.strip():
-                    logger.debug(f"Executing SQL statement: {statement.strip()}")
-                    cursor.execute(statement)
-            conn.commit()
-            logger.info("Database initialized successfully!")
-            return True
+            # executescript() copes with the semicolons inside trigger bodies
+            conn.executescript(f.read())
+        # Populate derived tables for entries written while they or their
+        # triggers were missing (before an upgrade, or an interrupted load)
+        if not SEARCH_OBJECTS <= existing:
+            rebuild_search_index(conn)
+        if not STATS_OBJECTS <= existing:
+            rebuild_dashboard_stats(conn)
+        if 'user_data_versions' not in existing:
+            seed_data_versions(conn)
+        conn.commit()
+        logger.info("Database initialized successfully!")
+        return True
     except FileNotFoundError as e:
-        logger.error(f"Schema file not found: {str(e)}")
+        logger.error("Schema file not found: %s", e)
         raise Exception("Schema file not found")
     except sqlite3.Error as e:
-        logger.error(f"SQLite error: {str(e)}")
+        logger.error("SQLite error: %s", e)
         raise Exception("SQLite error occurred")
     except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
+        logger.error("Error initializing database: %s", e)
         raise Exception("Database initialization failed")
     finally:
         if conn:
             conn.close()
 
-def get_db():
-    """Get database connection."""
+# Columns added to tables after their first release. CREATE TABLE IF NOT
+# EXISTS leaves an older table as it is, so init_db() adds these before the
+# schema's indexes and triggers refer to them.
+ADDED_COLUMNS = (
+    ('journal_entries', 'course_id', 'INTEGER REFERENCES courses (id)'),
+)
+
+# Derived tables and the triggers that keep them in step with journal_entries
+SEARCH_OBJECTS = frozenset({'journal_entries_fts', 'journal_entries_fts_insert',
+                            'journal_entries_fts_delete', 'journal_entries_fts_update'})
+STATS_OBJECTS = frozenset({'journal_course_stats', 'journal_daily_stats', 'journal_stats_insert',
+                           'journal_stats_delete', 'journal_stats_update'})
+
+def _add_missing_columns(conn, existing_tables):
+    for table, column, definition in ADDED_COLUMNS:
+        if table not in existing_tables:
+            continue
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            logger.info("Adding column %s.%s", table, column)
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _drop_outdated_search_index(conn, existing):
+    # The search table of the first release had no user_id column, and a
+    # virtual table cannot be altered: drop it and its triggers so the schema
+    # recreates them and init_db() rebuilds the index. Returns what was dropped.
+    if 'journal_entries_fts' not in existing:
+        return set()
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(journal_entries_fts)')}
+    if 'user_id' in columns:
+        return set()
+    logger.info("Recreating the journal search index with a user_id column")
+    for name in SEARCH_OBJECTS - {'journal_entries_fts'}:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    conn.execute('DROP TABLE journal_entries_fts')
+    return SEARCH_OBJECTS
+
+def rebuild_search_index(conn):
+    """Rebuild the full-text index from the journal_entries table."""
+    logger.info("Rebuilding journal search index")
+    conn.execute("INSERT INTO journal_entries_fts (journal_entries_fts) VALUES ('rebuild')")
+
+def rebuild_dashboard_stats(conn):
+    """Recompute the trigger-maintained dashboard summary tables from scratch."""
+    logger.info("Rebuilding dashboard summary tables")
+    conn.execute('DELETE FROM journal_course_stats')
+    conn.execute('DELETE FROM journal_daily_stats')
+    conn.execute('''
+        INSERT INTO journal_course_stats (user_id, course_id, entry_count)
+        SELECT user_id, COALESCE(course_id, 0), COUNT(*)
+        FROM journal_entries
+        GROUP BY user_id, COALESCE(course_id, 0)
+    ''')
+    conn.execute('''
+        INSERT INTO journal_daily_stats (user_id, date, entry_count)
+        SELECT user_id, date, COUNT(*)
+        FROM journal_entries
+        GROUP BY user_id, date
+    ''')
+
+def seed_data_versions(conn):
+    """Start every user who already has entries or courses at version 1.
+
+    Their triggers bump versions from here on; without a row such a user
+    would share version 0 with users who never wrote anything.
+    """
+    conn.execute('''
+        INSERT OR IGNORE INTO user_data_versions (user_id, version, updated_at)
+        SELECT user_id, 1, CAST(strftime('%s', 'now') AS INTEGER)
+        FROM (SELECT user_id FROM journal_entries UNION SELECT user_id FROM courses)
+    ''')
+
+def _acquire():
     try:
-        logger.debug("Getting database connection")
-        conn = sqlite3.connect(str(DB_FILE))
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_pool().acquire()
     except sqlite3.Error as e:
-        logger.error(f"Database connection error: {str(e)}")
+        logger.error("Database connection error: %s", e)
         raise Exception("Failed to connect to database")
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise Exception("Database error occurred")
 
+def _is_request_db(conn):
+    return conn is not None and has_app_context() and g.get('db') is conn
+
+def get_db():
+    """Get a database connection.
+
+    Inside a request the connection is checked out of the pool lazily, on the
+    first query, and shared by every helper until teardown_db() runs.
+    Outside a request each call checks out its own pooled connection.
+    """
+    if has_app_context():
+        conn = g.get('db')
+        if conn is None:
+            conn = g.db = _acquire()
+        return conn
+    return _acquire()
+
+@contextmanager
+def standalone_db():
+    """Check out a pooled connection independent of the request connection.
+
+    For work that manages its own transactions (bulk import, streaming
+    export) and must not be tied to the request's commit at teardown.
+    """
+    conn = _acquire()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def commit_db(conn):
+    """Commit, unless conn is the request connection (committed at teardown)."""
+    if not _is_request_db(conn):
+        conn.commit()
+
+def rollback_db(conn):
+    """Roll back the current transaction on conn."""
+    try:
+        if conn is not None:
+            conn.rollback()
+    except sqlite3.Error as e:
+        logger.error("Error rolling back transaction: %s", e)
+
 def close_db(conn):
-    """Close database connection."""
+    """Return a database connection to the pool.
+
+    The request connection is left open; teardown_db() releases it.
+    """
     try:
-        if conn:
-            logger.debug("Closing database connection")
+        if conn and not _is_request_db(conn):
             conn.close()
     except Exception as e:
-        logger.error(f"Error closing database: {str(e)}")
+        logger.error("Error closing database: %s", e)
+
+def on_commit(conn, callback):
+    """Run callback once conn's writes are committed.
+
+    For the request connection that is after teardown_db() commits; for any
+    other connection (already committed by the caller) it runs immediately.
+    """
+    if _is_request_db(conn):
+        g.setdefault('db_on_commit', []).append(callback)
+    else:
+        callback()
+
+def teardown_db(exception=None):
+    """Commit or roll back the request connection and return it to the pool."""
+    conn = g.pop('db', None)
+    callbacks = g.pop('db_on_commit', [])
+    if conn is None:
+        return
+    try:
+        if exception is None:
+            conn.commit()
+        else:
+            conn.rollback()
+    except sqlite3.Error as e:
+        logger.error("Error finishing request transaction: %s", e)
+        rollback_db(conn)
+    finally:
+        conn.close()
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error("Error in post-commit callback: %s", e)
+
+# User rows are read on almost every authenticated request and rarely change,
+# so lookups by id and by username go through a small LRU/TTL cache. Every
+# write to users must call invalidate_user().
+user_cache = LRUCache(max_size=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+def _cache_user(user):
+    if user is not None:
+        user_cache.set(('id', user['id']), user)
+        user_cache.set(('username', user['username']), user)
+    return user
+
+def invalidate_user(user_id=None, username=None, conn=None):
+    """Drop a user's cached rows, keyed by id and/or username.
+
+    When conn is the request connection the entries are dropped again after
+    teardown commits, so a concurrent read cannot re-cache the old row.
+    """
+    def drop():
+        for key in (('id', user_id), ('username', username)):
+            if key[1] is None:
+                continue
+            user = user_cache.pop(key)
+            if user is not None:
+                user_cache.pop(('id', user['id']))
+                user_cache.pop(('username', user['username']))
+    drop()
+    on_commit(conn, drop)
 
 def get_user_by_username(username):
+    user = user_cache.get(('username', username))
+    if user is not None:
+        return user
     conn = get_db()
-    c = conn.cursor()
-    user = c.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    return user
+    try:
+        c = conn.cursor()
+        return _cache_user(c.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone())
+    finally:
+        close_db(conn)
 
 def get_user_by_id(user_id):
+    user = user_cache.get(('id', user_id))
+    if user is not None:
+        return user
     conn = get_db()
-    c = conn.cursor()
-    user = c.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    close_db(conn)
-    return user
+    try:
+        c = conn.cursor()
+        return _cache_user(c.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone())
+    finally:
+        close_db(conn)
 
 def create_user(first_name, last_name, username, email, password):
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
         
         # Check if username or email already exists
         if c.execute('SELECT id FROM users WHERE username = ? OR email = ?', (username, email)).fetchone():
-            close_db(conn)
             return False
         
         # Create user
         c.execute('INSERT INTO users (first_name, last_name, username, email, password) VALUES (?, ?, ?, ?, ?)',
-                 (first_name, last_name, username, email, generate_password_hash(password)))
-        conn.commit()
-        close_db(conn)
+                 (first_name, last_name, username, email, hash_password(password)))
+        commit_db(conn)
+        invalidate_user(user_id=c.lastrowid, username=username, conn=conn)
         return True
     except Exception as e:
-        close_db(conn)
+        logger.error("Error creating user: %s", e)
+        rollback_db(conn)
         return False
-
-def create_journal_entry(user_id, date, subject, learnt, challenges, schedule):
-    try:
-        conn = get_db()
-        c = conn.cursor()
-        c.execute('INSERT INTO journal_entries (user_id, date, subject, learnt, challenges, schedule) VALUES (?, ?, ?, ?, ?, ?)',
-                 (user_id, date, subject, learnt, challenges, schedule))
-        conn.commit()
-        close_db(conn)
-        return True
-    except Exception as e:
+    finally:
         close_db(conn)
-        return False
 
 def get_journal_entries(user_id):
     """Get journal entries for a user with course information."""
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
         entries = c.execute('''
-            SELECT je.*, c.course_name 
+            SELECT je.*, c.name AS course_name
             FROM journal_entries je
             LEFT JOIN courses c ON je.course_id = c.id
             WHERE je.user_id = ?
@@ -124,13 +611,295 @@ def get_journal_entries(user_id):
         ''', (user_id,)).fetchall()
         return entries
     except sqlite3.Error as e:
-        logger.error(f"Database error while fetching journal entries: {str(e)}")
+        logger.error("Database error while fetching journal entries: %s", e)
+        raise
+    finally:
+        close_db(conn)
+
+# Keyset pagination over (date DESC, id DESC). The cursor is the (date, id)
+# of the boundary entry, so each page is a single index range scan no matter
+# how deep into the journal it is.
+JOURNAL_PAGE_FIRST_SQL = '''
+    SELECT je.*, c.name AS course_name
+    FROM journal_entries je
+    LEFT JOIN courses c ON je.course_id = c.id
+    WHERE je.user_id = ?
+    ORDER BY je.date DESC, je.id DESC
+    LIMIT ?
+'''
+
+JOURNAL_PAGE_AFTER_SQL = '''
+    SELECT je.*, c.name AS course_name
+    FROM journal_entries je
+    LEFT JOIN courses c ON je.course_id = c.id
+    WHERE je.user_id = ? AND (je.date, je.id) < (?, ?)
+    ORDER BY je.date DESC, je.id DESC
+    LIMIT ?
+'''
+
+JOURNAL_PAGE_BEFORE_SQL = '''
+    SELECT je.*, c.name AS course_name
+    FROM journal_entries je
+    LEFT JOIN courses c ON je.course_id = c.id
+    WHERE je.user_id = ? AND (je.date, je.id) > (?, ?)
+    ORDER BY je.date ASC, je.id ASC
+    LIMIT ?
+'''
+
+JOURNAL_COUNT_SQL = 'SELECT COUNT(*) FROM journal_entries WHERE user_id = ?'
+
+def encode_cursor(entry):
+    """Encode the (date, id) position of an entry as an opaque page cursor."""
+    raw = f"{entry['date']}|{entry['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a page cursor into (date, id), or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, entry_id = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+        return date, int(entry_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+def get_journal_page(user_id, limit=config.JOURNAL_PAGE_SIZE, after=None, before=None, with_total=False):
+    """Get one page of a user's journal entries, newest first.
+
+    ``after`` continues with older entries past a cursor, ``before`` goes back
+    to newer ones. Returns a dict with ``entries``, ``next_cursor`` and
+    ``prev_cursor`` (None at either end) and ``total`` (None unless
+    ``with_total`` is set).
+    """
+    limit = max(1, min(int(limit), config.JOURNAL_MAX_PAGE_SIZE))
+    conn = None
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        after_key = decode_cursor(after) if after else None
+        before_key = decode_cursor(before) if before else None
+
+        if before_key:
+            rows = c.execute(JOURNAL_PAGE_BEFORE_SQL, (user_id, *before_key, limit + 1)).fetchall()
+            has_newer = len(rows) > limit
+            entries = rows[:limit][::-1]
+            has_older = True
+        elif after_key:
+            rows = c.execute(JOURNAL_PAGE_AFTER_SQL, (user_id, *after_key, limit + 1)).fetchall()
+            has_older = len(rows) > limit
+            entries = rows[:limit]
+            has_newer = True
+        else:
+            rows = c.execute(JOURNAL_PAGE_FIRST_SQL, (user_id, limit + 1)).fetchall()
+            has_older = len(rows) > limit
+            entries = rows[:limit]
+            has_newer = False
+
+        total = None
+        if with_total:
+            total = c.execute(JOURNAL_COUNT_SQL, (user_id,)).fetchone()[0]
+
+        return {
+            'entries': entries,
+            'next_cursor': encode_cursor(entries[-1]) if entries and has_older else None,
+            'prev_cursor': encode_cursor(entries[0]) if entries and has_newer else None,
+            'limit': limit,
+            'total': total,
+        }
+    except sqlite3.Error as e:
+        logger.error("Database error while fetching journal page: %s", e)
+        raise
+    finally:
+        close_db(conn)
+
+# Full-text search. highlight()/snippet() wrap matches in control characters
+# that cannot appear in form input; _mark_matches() swaps them for <mark> tags
+# after the text has been HTML-escaped.
+HIGHLIGHT_OPEN = '\x02'
+HIGHLIGHT_CLOSE = '\x03'
+
+JOURNAL_SEARCH_SQL = '''
+    SELECT je.id, je.date, je.course_id, c.name AS course_name,
+           highlight(journal_entries_fts, 0, :open, :close) AS subject,
+           snippet(journal_entries_fts, -1, :open, :close, '...', 16) AS snippet,
+           bm25(journal_entries_fts, 8.0, 2.0, 2.0, 1.0, 0.0) AS rank
+    FROM journal_entries_fts
+    JOIN journal_entries je ON je.id = journal_entries_fts.rowid
+    LEFT JOIN courses c ON je.course_id = c.id
+    WHERE journal_entries_fts MATCH :query
+      AND je.user_id = :user_id
+      AND (:course_id IS NULL OR je.course_id = :course_id)
+      AND (:date_from IS NULL OR je.date >= :date_from)
+      AND (:date_to IS NULL OR je.date <= :date_to)
+    ORDER BY rank
+    LIMIT :limit
+'''
+
+def _fts_query(text, user_id):
+    """Turn free text into a safe FTS5 query over one user's entries.
+
+    Every word must match (the last one as a prefix) in the text columns;
+    the user_id term limits matching and ranking to that user's rows.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return f'user_id:"{int(user_id)}" AND {{subject learnt challenges schedule}}:({" ".join(terms)})'
+
+def _mark_matches(text):
+    escaped = str(escape(text or ''))
+    return Markup(escaped.replace(HIGHLIGHT_OPEN, '<mark>').replace(HIGHLIGHT_CLOSE, '</mark>'))
+
+def search_journal_entries(user_id, text, course_id=None, date_from=None, date_to=None, limit=20):
+    """Full-text search a user's journal entries, best matches first.
+
+    Returns a list of dicts whose ``subject`` and ``snippet`` are HTML-safe
+    Markup with the matched terms wrapped in <mark>.
+    """
+    query = _fts_query(text, user_id)
+    if query is None:
+        return []
+    conn = None
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        rows = c.execute(JOURNAL_SEARCH_SQL, {
+            'open': HIGHLIGHT_OPEN,
+            'close': HIGHLIGHT_CLOSE,
+            'query': query,
+            'user_id': user_id,
+            'course_id': course_id,
+            'date_from': date_from or None,
+            'date_to': date_to or None,
+            'limit': max(1, min(int(limit), config.JOURNAL_MAX_PAGE_SIZE)),
+        }).fetchall()
+        return [{
+            'id': row['id'],
+            'date': row['date'],
+            'course_id': row['course_id'],
+            'course_name': row['course_name'],
+            'subject': _mark_matches(row['subject']),
+            'snippet': _mark_matches(row['snippet']),
+            'rank': row['rank'],
+        } for row in rows]
+    except sqlite3.Error as e:
+        logger.error("Database error while searching journal entries: %s", e)
+        raise
+    finally:
+        close_db(conn)
+
+def get_journal_entry(entry_id, user_id):
+    """Get a single journal entry owned by the user, or None."""
+    conn = None
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        return c.execute('''
+            SELECT je.*, c.name AS course_name
+            FROM journal_entries je
+            LEFT JOIN courses c ON je.course_id = c.id
+            WHERE je.id = ? AND je.user_id = ?
+        ''', (entry_id, user_id)).fetchone()
+    except sqlite3.Error as e:
+        logger.error("Database error while fetching journal entry: %s", e)
         raise
     finally:
         close_db(conn)
 
+def get_data_version(user_id):
+    """Return (version, updated_at epoch seconds) of a user's journal and courses.
+
+    Both are bumped by triggers on every write; a user who never wrote
+    anything is at (0, None).
+    """
+    conn = None
+    try:
+        conn = get_db()
+        row = conn.execute('SELECT version, updated_at FROM user_data_versions WHERE user_id = ?',
+                           (user_id,)).fetchone()
+        return (row['version'], row['updated_at']) if row else (0, None)
+    except sqlite3.Error as e:
+        logger.error("Database error while fetching data version: %s", e)
+        raise
+    finally:
+        close_db(conn)
+
+def get_dashboard_summary(user_id, today=None):
+    """Get dashboard statistics from the trigger-maintained summary tables.
+
+    Returns entry counts per course id (0 for entries without a course), the
+    total, entries this week (from Monday) and this month, the current daily
+    writing streak and the last entry date. Only the per-course rows and the
+    most recent daily rows are read.
+    """
+    today = today or datetime.now().date()
+    week_start = (today - timedelta(days=today.weekday())).isoformat()
+    month_start = today.replace(day=1).isoformat()
+    window_start = min(week_start, month_start)
+    conn = None
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        course_counts = {row['course_id']: row['entry_count'] for row in c.execute(
+            'SELECT course_id, entry_count FROM journal_course_stats WHERE user_id = ?', (user_id,))}
+
+        summary = {
+            'course_counts': course_counts,
+            'total_entries': sum(course_counts.values()),
+            'entries_this_week': 0,
+            'entries_this_month': 0,
+            'streak': 0,
+            'last_entry_date': None,
+        }
+        # Walk days newest first and stop once both the week/month window and
+        # the streak are behind us, so the read is bounded by the streak length.
+        expected = today
+        streak_open = True
+        for row in c.execute('''
+            SELECT date, entry_count FROM journal_daily_stats
+            WHERE user_id = ?
+            ORDER BY date DESC
+        ''', (user_id,)):
+            if summary['last_entry_date'] is None:
+                summary['last_entry_date'] = row['date']
+            if row['date'] >= week_start:
+                summary['entries_this_week'] += row['entry_count']
+            if row['date'] >= month_start:
+                summary['entries_this_month'] += row['entry_count']
+            if streak_open:
+                try:
+                    day = date_type.fromisoformat(row['date'])
+                except ValueError:
+                    day = None
+                if day is not None and day > today:
+                    pass
+                elif day == expected or (day == today - timedelta(days=1) and summary['streak'] == 0):
+                    # Today's entry may not be written yet; a streak ending yesterday still counts
+                    summary['streak'] += 1
+                    expected = day - timedelta(days=1)
+                else:
+                    streak_open = False
+            if not streak_open and row['date'] < window_start:
+                break
+        return summary
+    except sqlite3.Error as e:
+        logger.error("Database error while fetching dashboard summary: %s", e)
+        raise
+    finally:
+        close_db(conn)
+
+def invalidate_fragments(user_id, conn=None):
+    """Drop a user's rendered fragments once conn's writes are committed.
+
+    Fragments are keyed by data version, so this only frees them early; a
+    write that skips it can never cause a stale fragment to be served.
+    """
+    on_commit(conn, lambda: fragment_cache.invalidate_user(user_id))
+
 def create_journal_entry(user_id, course_id, date, subject, learnt, challenges, schedule):
-    """Create a new journal entry."""
+    """Create a new journal entry and return its id."""
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
@@ -138,15 +907,19 @@ def create_journal_entry(user_id, course_id, date, subject, learnt, challenges,
             INSERT INTO journal_entries (user_id, course_id, date, subject, learnt, challenges, schedule)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (user_id, course_id, date, subject, learnt, challenges, schedule))
-        conn.commit()
-        return True
+        commit_db(conn)
+        invalidate_fragments(user_id, conn)
+        return c.lastrowid
     except sqlite3.Error as e:
-        logger.error(f"Database error while creating journal entry: {str(e)}")
+        logger.error("Database error while creating journal entry: %s", e)
+        rollback_db(conn)
         raise
     finally:
         close_db(conn)
 
 def update_journal_entry(entry_id, user_id, course_id, date, subject, learnt, challenges, schedule):
+    """Update a journal entry owned by the user. Returns False if none matched."""
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
@@ -155,16 +928,48 @@ def update_journal_entry(entry_id, user_id, course_id, date, subject, learnt, ch
             SET course_id = ?, date = ?, subject = ?, learnt = ?, challenges = ?, schedule = ?
             WHERE id = ? AND user_id = ?
         ''', (course_id, date, subject, learnt, challenges, schedule, entry_id, user_id))
-        conn.commit()
-        return True
+        commit_db(conn)
+        invalidate_fragments(user_id, conn)
+        return c.rowcount > 0
     except sqlite3.Error as e:
-        logger.error(f"Database error while updating journal entry: {str(e)}")
+        logger.error("Database error while updating journal entry: %s", e)
+        rollback_db(conn)
         raise
     finally:
         close_db(conn)
 
+def delete_journal_entry(entry_id, user_id):
+    """Delete a journal entry owned by the user. Returns False if none matched."""
+    conn = None
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('DELETE FROM journal_entries WHERE id = ? AND user_id = ?', (entry_id, user_id))
+        commit_db(conn)
+        invalidate_fragments(user_id, conn)
+        return c.rowcount > 0
+    except Exception as e:
+        logger.error("Error deleting journal entry: %s", e)
+        rollback_db(conn)
+        return False
+    finally:
+        close_db(conn)
+
+# A user's course list fills dropdowns on nearly every page but only changes
+# through add_course()/delete_course(), which invalidate it.
+courses_cache = LRUCache(max_size=config.COURSES_CACHE_SIZE, ttl=config.COURSES_CACHE_TTL)
+
+def invalidate_courses(user_id, conn=None):
+    """Drop a user's cached course list (again after commit, see on_commit)."""
+    courses_cache.pop(user_id)
+    on_commit(conn, lambda: courses_cache.pop(user_id))
+
 def get_courses_by_user(user_id):
     """Get all courses for a user."""
+    courses = courses_cache.get(user_id)
+    if courses is not None:
+        return courses
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
@@ -173,15 +978,17 @@ def get_courses_by_user(user_id):
             WHERE user_id = ?
             ORDER BY name
         ''', (user_id,)).fetchall()
+        courses_cache.set(user_id, courses)
         return courses
     except sqlite3.Error as e:
-        logger.error(f"Database error while fetching courses: {str(e)}")
+        logger.error("Database error while fetching courses: %s", e)
         raise
     finally:
         close_db(conn)
 
 def add_course(user_id, name, code):
-    """Add a new course for a user."""
+    """Add a new course for a user and return its id."""
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
@@ -189,66 +996,160 @@ def add_course(user_id, name, code):
             INSERT INTO courses (user_id, name, code)
             VALUES (?, ?, ?)
         ''', (user_id, name, code))
-        conn.commit()
-        return True
+        commit_db(conn)
+        invalidate_courses(user_id, conn)
+        invalidate_fragments(user_id, conn)
+        return c.lastrowid
     except sqlite3.Error as e:
-        logger.error(f"Database error while adding course: {str(e)}")
+        logger.error("Database error while adding course: %s", e)
+        rollback_db(conn)
         raise
     finally:
         close_db(conn)
 
 def delete_course(course_id, user_id):
     """Delete a course for a user."""
+    conn = None
     try:
         conn = get_db()
         c = conn.cursor()
+        # Foreign keys are enforced, so detach the course's entries first
+        c.execute('''
+            UPDATE journal_entries SET course_id = NULL
+            WHERE course_id = ? AND user_id = ?
+        ''', (course_id, user_id))
         c.execute('''
             DELETE FROM courses 
             WHERE id = ? AND user_id = ?
         ''', (course_id, user_id))
-        conn.commit()
-        return True
-    except sqlite3.Error as e:
-        # First check if the course belongs to the user
-        course = c.execute('''
-            SELECT * FROM courses WHERE id = ? AND user_id = ?
-        ''', (course_id, user_id)).fetchone()
-        if not course:
-            return False
-        
-        c.execute('DELETE FROM courses WHERE id = ?', (course_id,))
-        conn.commit()
-        return True
+        commit_db(conn)
+        invalidate_courses(user_id, conn)
+        invalidate_fragments(user_id, conn)
+        return c.rowcount > 0
     except sqlite3.Error as e:
-        logger.error(f"Database error while deleting course: {str(e)}")
+        logger.error("Database error while deleting course: %s", e)
+        rollback_db(conn)
         raise
     finally:
         close_db(conn)
 
-def update_journal_entry(entry_id, user_id, date, subject, learnt, challenges, schedule):
-    try:
-        conn = get_db()
-        c = conn.cursor()
-        c.execute('UPDATE journal_entries SET date = ?, subject = ?, learnt = ?, challenges = ?, schedule = ? WHERE id = ? AND user_id = ?',
-                 (date, subject, learnt, challenges, schedule, entry_id, user_id))
-        conn.commit()
-        close_db(conn)
-        return True
-    except Exception as e:
-        close_db(conn)
-        return False
+# Batched writes for the JSON API. Every operation of a batch runs in its
+# own savepoint inside one transaction on a dedicated connection, so one
+# that fails is undone on its own while the rest commit together, and the
+# caller gets a result per operation.
 
-def delete_journal_entry(entry_id, user_id):
-    try:
-        conn = get_db()
+COURSE_OWNED_SQL = 'SELECT 1 FROM courses WHERE id = ? AND user_id = ?'
+
+# Only the fields present in an update are changed (course_id may be set to NULL)
+PATCH_ENTRY_SQL = '''
+    UPDATE journal_entries
+    SET course_id = CASE WHEN :set_course_id THEN :course_id ELSE course_id END,
+        date = COALESCE(:date, date),
+        subject = COALESCE(:subject, subject),
+        learnt = COALESCE(:learnt, learnt),
+        challenges = COALESCE(:challenges, challenges),
+        schedule = COALESCE(:schedule, schedule)
+    WHERE id = :id AND user_id = :user_id
+'''
+
+class BatchItemError(Exception):
+    """A batch operation that cannot be applied; ``code`` is 'not_found' or 'invalid'."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def _check_course(c, user_id, course_id):
+    if course_id is not None and c.execute(COURSE_OWNED_SQL, (course_id, user_id)).fetchone() is None:
+        raise BatchItemError('invalid', f'Course {course_id} not found')
+
+def _batch_create_entry(c, user_id, target_id, fields):
+    _check_course(c, user_id, fields.get('course_id'))
+    c.execute('''
+        INSERT INTO journal_entries (user_id, course_id, date, subject, learnt, challenges, schedule)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (user_id, fields.get('course_id'), fields['date'], fields['subject'], fields['learnt'],
+          fields['challenges'], fields['schedule']))
+    return c.lastrowid
+
+def _batch_update_entry(c, user_id, target_id, fields):
+    if 'course_id' in fields:
+        _check_course(c, user_id, fields['course_id'])
+    c.execute(PATCH_ENTRY_SQL, {
+        'id': target_id,
+        'user_id': user_id,
+        'set_course_id': 'course_id' in fields,
+        'course_id': fields.get('course_id'),
+        **{name: fields.get(name) for name in ('date', 'subject', 'learnt', 'challenges', 'schedule')},
+    })
+    if c.rowcount == 0:
+        raise BatchItemError('not_found', f'Entry {target_id} not found')
+    return target_id
+
+def _batch_delete_entry(c, user_id, target_id, fields):
+    c.execute('DELETE FROM journal_entries WHERE id = ? AND user_id = ?', (target_id, user_id))
+    if c.rowcount == 0:
+        raise BatchItemError('not_found', f'Entry {target_id} not found')
+    return target_id
+
+def _batch_create_course(c, user_id, target_id, fields):
+    c.execute('INSERT INTO courses (user_id, name, code) VALUES (?, ?, ?)',
+              (user_id, fields['name'], fields.get('code')))
+    return c.lastrowid
+
+def _batch_delete_course(c, user_id, target_id, fields):
+    c.execute('UPDATE journal_entries SET course_id = NULL WHERE course_id = ? AND user_id = ?',
+              (target_id, user_id))
+    c.execute('DELETE FROM courses WHERE id = ? AND user_id = ?', (target_id, user_id))
+    if c.rowcount == 0:
+        raise BatchItemError('not_found', f'Course {target_id} not found')
+    return target_id
+
+BATCH_OPERATIONS = {
+    'create_entry': _batch_create_entry,
+    'update_entry': _batch_update_entry,
+    'delete_entry': _batch_delete_entry,
+    'create_course': _batch_create_course,
+    'delete_course': _batch_delete_course,
+}
+
+def apply_journal_batch(user_id, operations, atomic=False):
+    """Apply (operation, id, fields) tuples for one user in a single transaction.
+
+    Returns ``(committed, results)`` with one result per operation:
+    ``{'ok': True, 'id': ...}`` or ``{'ok': False, 'error': code, 'message': ...}``
+    where code is 'not_found', 'invalid' or 'conflict'. Failed operations are
+    rolled back individually, unless ``atomic`` is set, in which case any
+    failure rolls back (and does not commit) the whole batch.
+    """
+    results = []
+    with standalone_db() as conn:
         c = conn.cursor()
-        c.execute('DELETE FROM journal_entries WHERE id = ? AND user_id = ?', (entry_id, user_id))
-        conn.commit()
-        close_db(conn)
-        return True
-    except Exception as e:
-        close_db(conn)
-        return False
+        try:
+            c.execute('BEGIN IMMEDIATE')
+            for operation, target_id, fields in operations:
+                c.execute('SAVEPOINT batch_item')
+                try:
+                    results.append({'ok': True, 'id': BATCH_OPERATIONS[operation](c, user_id, target_id, fields)})
+                except BatchItemError as e:
+                    c.execute('ROLLBACK TO batch_item')
+                    results.append({'ok': False, 'error': e.code, 'message': str(e)})
+                except sqlite3.IntegrityError as e:
+                    c.execute('ROLLBACK TO batch_item')
+                    results.append({'ok': False, 'error': 'conflict', 'message': str(e)})
+                c.execute('RELEASE batch_item')
+            if atomic and not all(result['ok'] for result in results):
+                conn.rollback()
+                return False, results
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Database error while applying journal batch: %s", e)
+            rollback_db(conn)
+            raise
+    if any(result['ok'] for result in results):
+        invalidate_courses(user_id)
+        invalidate_fragments(user_id)
+    return True, results
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,223 @@
+import itertools
+import logging
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from werkzeug.security import generate_password_hash
+import config
+import database
+
+logger = logging.getLogger(__name__)
+
+# Deterministic synthetic data for scale testing.
+#
+# Every user draws from its own Random(seed, user number), so the same
+# arguments always produce the same rows however the run is chunked. Text
+# comes from a pool of pre-built sentences rather than word by word, which
+# keeps generation well ahead of SQLite. Rows are written with executemany()
+# on a dedicated connection; by default the journal_entries triggers are
+# dropped for the load and the search index and dashboard tables are rebuilt
+# in one pass afterwards, which is far cheaper than maintaining them per row.
+# The triggers are restored even when the load fails; should the process die
+# before that, init_db() recreates them and rebuilds both on the next start.
+
+FIRST_NAMES = ('Amara', 'Ben', 'Chloe', 'Daniel', 'Elif', 'Farah', 'George', 'Hana', 'Isaac', 'Jade',
+               'Kofi', 'Lena', 'Mateo', 'Nadia', 'Oscar', 'Priya', 'Quinn', 'Rosa', 'Samir', 'Tara',
+               'Umar', 'Vera', 'Wei', 'Ximena', 'Yusuf', 'Zoe')
+LAST_NAMES = ('Adams', 'Bianchi', 'Chen', 'Diallo', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ivanova',
+              'Jensen', 'Khan', 'Lopez', 'Murphy', 'Nguyen', 'Okafor', 'Patel', 'Quispe', 'Rossi',
+              'Silva', 'Tanaka', 'Usman', 'Varga', 'Walker', 'Yilmaz', 'Zhang')
+COURSES = ('Algebra', 'Geometry', 'Statistics', 'Calculus', 'Biology', 'Chemistry', 'Physics',
+           'Earth Science', 'World History', 'Modern History', 'Geography', 'Economics', 'Civics',
+           'English Literature', 'Creative Writing', 'Spanish', 'French', 'German', 'Latin', 'Art',
+           'Music', 'Drama', 'Computer Science', 'Programming', 'Design & Technology', 'Philosophy',
+           'Psychology', 'Sociology', 'Physical Education', 'Health', 'Media Studies', 'Business',
+           'Accounting', 'Astronomy', 'Environmental Science', 'Robotics', 'Photography', 'Debate',
+           'Religious Studies', 'Study Skills')
+TOPICS = ('introduction', 'key concepts', 'worked examples', 'revision', 'practical', 'group project',
+          'quiz preparation', 'essay planning', 'lab report', 'presentation', 'case study', 'mock exam',
+          'reading', 'homework review', 'vocabulary', 'problem set')
+WORDS = ('the', 'a', 'we', 'I', 'our', 'teacher', 'class', 'lesson', 'example', 'problem', 'method',
+         'idea', 'question', 'answer', 'notes', 'chapter', 'diagram', 'formula', 'text', 'source',
+         'evidence', 'argument', 'experiment', 'result', 'mistake', 'pattern', 'rule', 'detail',
+         'explained', 'practised', 'reviewed', 'compared', 'discussed', 'solved', 'wrote', 'read',
+         'tested', 'planned', 'checked', 'learned', 'remembered', 'struggled', 'finished', 'started',
+         'carefully', 'quickly', 'together', 'again', 'finally', 'mostly', 'really', 'still',
+         'with', 'about', 'before', 'after', 'during', 'because', 'and', 'but', 'so', 'then',
+         'new', 'hard', 'useful', 'tricky', 'important', 'clear', 'long', 'short', 'first', 'next')
+SENTENCE_POOL_SIZE = 4096
+
+INSERT_USER_SQL = '''
+    INSERT INTO users (id, first_name, last_name, username, email, password)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+INSERT_COURSE_SQL = 'INSERT INTO courses (id, user_id, name, code) VALUES (?, ?, ?, ?)'
+INSERT_ENTRY_SQL = '''
+    INSERT INTO journal_entries (user_id, course_id, date, subject, learnt, challenges, schedule)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+def _sentences(rng):
+    pool = []
+    for _ in range(SENTENCE_POOL_SIZE):
+        words = rng.choices(WORDS, k=rng.randint(6, 22))
+        pool.append(' '.join(words).capitalize() + rng.choice('..!?'))
+    return pool
+
+def _paragraph(rng, pool, low, high):
+    return ' '.join(rng.choices(pool, k=rng.randint(low, high)))
+
+class Generator:
+    """Produce users, courses and entries for ``users`` students.
+
+    Each student gets ``courses`` courses and, for each of ``days`` days
+    ending at ``end``, an entry with probability ``density``.
+    """
+
+    def __init__(self, users, courses, days, density=0.7, seed=1, end=None, password='Passw0rd!'):
+        self.users = users
+        self.courses = courses
+        self.days = days
+        self.density = density
+        self.seed = seed
+        self.end = end or date.today()
+        self.start = self.end - timedelta(days=days - 1)
+        self.pool = _sentences(random.Random(seed))
+        # One hash shared by every generated user keeps setup instant
+        self.password_hash = generate_password_hash(password, method=config.PASSWORD_HASH_METHOD)
+
+    def _rng(self, number):
+        return random.Random(f'{self.seed}/{number}')
+
+    def user_rows(self, first_id):
+        for number in range(self.users):
+            rng = self._rng(number)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = f'{first.lower()}.{last.lower()}{first_id + number}'
+            yield (first_id + number, first, last, username, f'{username}@school.example', self.password_hash)
+
+    def _course_names(self, rng):
+        names = rng.sample(COURSES, min(self.courses, len(COURSES)))
+        for extra in range(self.courses - len(names)):
+            names.append(f'{rng.choice(COURSES)} {extra + 2}')
+        return names
+
+    def course_rows(self, first_user_id, first_course_id):
+        course_id = first_course_id
+        for number in range(self.users):
+            rng = self._rng(f'courses/{number}')
+            for name in self._course_names(rng):
+                yield (course_id, first_user_id + number, name, f'{name[:4].upper().strip()}{rng.randint(100, 499)}')
+                course_id += 1
+
+    def entry_rows(self, first_user_id, first_course_id):
+        for number in range(self.users):
+            rng = self._rng(f'entries/{number}')
+            user_id = first_user_id + number
+            course_base = first_course_id + number * self.courses
+            names = self._course_names(self._rng(f'courses/{number}'))
+            pool = self.pool
+            for offset in range(self.days):
+                if rng.random() >= self.density:
+                    continue
+                course = rng.randrange(self.courses) if self.courses and rng.random() < 0.9 else None
+                subject = f'{names[course]}: ' if course is not None else ''
+                yield (
+                    user_id,
+                    course_base + course if course is not None else None,
+                    (self.start + timedelta(days=offset)).isoformat(),
+                    subject + rng.choice(TOPICS).capitalize(),
+                    _paragraph(rng, pool, 3, 8),
+                    _paragraph(rng, pool, 1, 4),
+                    _paragraph(rng, pool, 1, 2),
+                )
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute(f'PRAGMA cache_size=-{256 * 1024}')
+    return conn
+
+def has_users(path):
+    """Return whether the database at ``path`` exists and has any users."""
+    if not os.path.exists(path):
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT 1 FROM users LIMIT 1').fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+def _next_id(conn, table):
+    return conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+
+def _insert(conn, sql, rows, chunk_size, progress, label):
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return total
+        conn.execute('BEGIN')
+        conn.executemany(sql, chunk)
+        conn.execute('COMMIT')
+        total += len(chunk)
+        if progress is not None:
+            progress(label, total)
+
+def _restore_triggers(conn, triggers):
+    """Recreate dropped journal_entries triggers and rebuild what they maintain."""
+    if conn.in_transaction:
+        conn.execute('ROLLBACK')
+    conn.execute('BEGIN')
+    for _, sql in triggers:
+        conn.execute(sql)
+    database.rebuild_search_index(conn)
+    database.rebuild_dashboard_stats(conn)
+    conn.execute('COMMIT')
+
+def generate(path, generator, drop_triggers=True, chunk_size=50000, progress=None):
+    """Write ``generator``'s rows into the SQLite database at ``path``.
+
+    Appends to an existing database; ids continue after the current maxima.
+    Returns row counts and elapsed seconds.
+    """
+    started = time.perf_counter()
+    conn = _connect(str(path))
+    try:
+        with open(database.SCHEMA_FILE, 'r') as f:
+            conn.executescript(f.read())
+        triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'journal_entries'"
+        ).fetchall() if drop_triggers else []
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+
+        try:
+            first_user_id = _next_id(conn, 'users')
+            first_course_id = _next_id(conn, 'courses')
+            stats = {
+                'users': _insert(conn, INSERT_USER_SQL, generator.user_rows(first_user_id),
+                                 chunk_size, progress, 'users'),
+                'courses': _insert(conn, INSERT_COURSE_SQL, generator.course_rows(first_user_id, first_course_id),
+                                   chunk_size, progress, 'courses'),
+                'entries': _insert(conn, INSERT_ENTRY_SQL, generator.entry_rows(first_user_id, first_course_id),
+                                   chunk_size, progress, 'entries'),
+            }
+        finally:
+            # Chunks committed before a failure stay, so rebuild either way
+            if triggers:
+                _restore_triggers(conn, triggers)
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info("Generated %(users)d users, %(courses)d courses and %(entries)d entries in %(seconds)ss", stats)
+    return stats
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import logging
+import zlib
+import config
+import database
+
+logger = logging.getLogger(__name__)
+
+# Streaming export of a user's journal. Rows are pulled from the cursor with
+# fetchmany(EXPORT_CHUNK_SIZE) and each chunk is serialised and yielded before
+# the next one is read, so memory use does not grow with the journal.
+
+EXPORT_FIELDS = ('id', 'date', 'course', 'subject', 'learnt', 'challenges', 'schedule', 'created_at')
+
+EXPORT_SQL = '''
+    SELECT je.id, je.date, c.name AS course, je.subject, je.learnt,
+           je.challenges, je.schedule, je.created_at
+    FROM journal_entries je
+    LEFT JOIN courses c ON je.course_id = c.id
+    WHERE je.user_id = :user_id
+      AND (:course_id IS NULL OR je.course_id = :course_id)
+      AND (:date_from IS NULL OR je.date >= :date_from)
+      AND (:date_to IS NULL OR je.date <= :date_to)
+    ORDER BY je.date, je.id
+'''
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+def iter_entry_chunks(conn, user_id, course_id=None, date_from=None, date_to=None,
+                      chunk_size=config.EXPORT_CHUNK_SIZE):
+    """Yield lists of at most chunk_size entry rows, oldest first."""
+    cursor = conn.execute(EXPORT_SQL, {
+        'user_id': user_id,
+        'course_id': course_id,
+        'date_from': date_from or None,
+        'date_to': date_to or None,
+    })
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in chunks:
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_chunks(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+def gzip_chunks(chunks, level=config.EXPORT_GZIP_LEVEL):
+    """Compress a stream of byte chunks into a gzip stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_journal(user_id, fmt='csv', compress=False, **filters):
+    """Yield the user's journal as encoded CSV or NDJSON bytes.
+
+    The generator checks out its own pooled connection and returns it when
+    it is exhausted or closed (e.g. when the client disconnects), so it can
+    safely outlive the request that created it.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    render = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+
+    def generate():
+        exported = 0
+        with database.standalone_db() as conn:
+            def counted(chunks):
+                nonlocal exported
+                for rows in chunks:
+                    exported += len(rows)
+                    yield rows
+            for text in render(counted(iter_entry_chunks(conn, user_id, **filters))):
+                yield text.encode('utf-8')
+        logger.info("Exported %d journal entries for user %s as %s", exported, user_id, fmt)
+
+    return gzip_chunks(generate()) if compress else generate()
+
+def export_filename(fmt, compress=False):
+    """File name offered for a download of the given format."""
+    name = f"journal.{FORMATS[fmt][1]}"
+    return name + '.gz' if compress else name
@@ -0,0 +1,282 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from markupsafe import Markup
+import config
+
+logger = logging.getLogger(__name__)
+
+# Rendered HTML fragments: the journal entries table and the course dropdowns.
+#
+# A fragment is keyed by its name, the user, the user's data version (bumped
+# by triggers on every journal or course write) and whatever view arguments
+# shape it, so a stale fragment can never be served: a write moves the user
+# to a new version and the old keys are simply never asked for again. The
+# write paths in database.py also drop the user's fragments once committed,
+# which frees the memory straight away rather than waiting for the LRU.
+#
+# FRAGMENT_CACHE_URI picks the backend:
+#   memory://               per process, bounded to FRAGMENT_CACHE_MAX_BYTES
+#   sqlite:///fragments.db  one file shared by every worker on the host
+#   none://                 disabled, every view renders
+# Backend errors are logged and treated as misses.
+
+class MemoryBackend:
+    """In-process LRU of rendered fragments bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._by_user = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return item[1]
+
+    def set(self, user_id, key, html):
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._data[key] = (user_id, html, size)
+            self._by_user.setdefault(user_id, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._data)))
+                self._evictions += 1
+
+    def _discard(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        user_id, _, size = item
+        self._bytes -= size
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'size': len(self._data),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+class SQLiteBackend:
+    """Fragments in a SQLite file of their own, shared by every worker process.
+
+    Recency is tracked coarsely (a read refreshes used_at at most once per
+    TOUCH_INTERVAL seconds) so that hits stay reads; the table is trimmed
+    back to max_bytes, least recently used first, every prune_interval
+    seconds.
+    """
+
+    TOUCH_INTERVAL = 60.0
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS fragments (
+            key TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            html TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            used_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_fragments_user ON fragments (user_id);
+        CREATE INDEX IF NOT EXISTS idx_fragments_used_at ON fragments (used_at);
+    '''
+
+    def __init__(self, path, max_bytes, prune_interval):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT html, used_at FROM fragments WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        now = time.time()
+        if now - row[1] > self.TOUCH_INTERVAL:
+            conn.execute('UPDATE fragments SET used_at = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def set(self, user_id, key, html):
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO fragments (key, user_id, html, size, used_at) VALUES (?, ?, ?, ?, ?)',
+            (key, user_id, html, size, now))
+        self._maybe_prune(now)
+
+    def _maybe_prune(self, now):
+        if now < self._next_prune or not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_prune = now + self.prune_interval
+            self.prune()
+        finally:
+            self._prune_lock.release()
+
+    def prune(self):
+        """Drop the least recently used fragments until the total fits max_bytes."""
+        deleted = self._connection().execute('''
+            DELETE FROM fragments WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY used_at DESC, key) AS running
+                    FROM fragments
+                ) WHERE running > ?
+            )
+        ''', (self.max_bytes,)).rowcount
+        if deleted:
+            self._evictions += deleted
+            logger.debug("Pruned %d cached fragments", deleted)
+        return deleted
+
+    def invalidate_user(self, user_id):
+        self._connection().execute('DELETE FROM fragments WHERE user_id = ?', (user_id,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM fragments')
+
+    def stats(self):
+        size, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM fragments').fetchone()
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'size': size,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+        }
+
+def backend_from_uri(uri, max_bytes=None, prune_interval=None):
+    """Build the backend named by ``uri`` (memory://, sqlite:///path or none://)."""
+    max_bytes = config.FRAGMENT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    scheme, _, path = uri.partition('://')
+    if scheme == 'none':
+        return None
+    if scheme == 'memory':
+        return MemoryBackend(max_bytes)
+    if scheme == 'sqlite':
+        # sqlite:///relative.db or sqlite:////absolute.db
+        path = path[1:] if path.startswith('/') else path
+        return SQLiteBackend(path or 'fragments.db', max_bytes,
+                             config.FRAGMENT_CACHE_PRUNE_INTERVAL if prune_interval is None else prune_interval)
+    raise ValueError(f'Unsupported fragment cache URI: {uri}')
+
+_UNSET = object()
+_backend = _UNSET
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the configured backend, creating it on first use (None if disabled)."""
+    global _backend
+    if _backend is _UNSET:
+        with _backend_lock:
+            if _backend is _UNSET:
+                _backend = backend_from_uri(config.FRAGMENT_CACHE_URI)
+    return _backend
+
+def set_backend(backend):
+    """Replace the backend (None disables the cache); returns the previous one."""
+    global _backend
+    previous = get_backend()
+    with _backend_lock:
+        _backend = backend
+    return previous
+
+def fragment_key(name, user_id, version, args=()):
+    return '/'.join((name, str(user_id), str(version)) + tuple('' if arg is None else str(arg) for arg in args))
+
+def cached(name, user_id, version, args, render):
+    """Return fragment ``name`` as Markup, calling ``render()`` only on a miss.
+
+    ``args`` are the view arguments the fragment depends on besides the user
+    and data version; ``render`` returns the HTML.
+    """
+    backend = get_backend()
+    key = fragment_key(name, user_id, version, args)
+    if backend is not None:
+        try:
+            html = backend.get(key)
+            if html is not None:
+                return Markup(html)
+        except sqlite3.Error as e:
+            logger.error("Error reading cached fragment %s: %s", key, e)
+    html = str(render())
+    if backend is not None:
+        try:
+            backend.set(user_id, key, html)
+        except sqlite3.Error as e:
+            logger.error("Error caching fragment %s: %s", key, e)
+    return Markup(html)
+
+def invalidate_user(user_id):
+    """Drop every cached fragment of ``user_id``."""
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        backend.invalidate_user(user_id)
+    except sqlite3.Error as e:
+        logger.error("Error invalidating cached fragments for user %s: %s", user_id, e)
+
+def stats():
+    backend = get_backend()
+    return backend.stats() if backend is not None else None
@@ -0,0 +1,306 @@
+import csv
+import json
+import logging
+import re
+import sqlite3
+import time
+from datetime import date as date_type
+import config
+import database
+from security import hash_password
+
+logger = logging.getLogger(__name__)
+
+# Streaming bulk import of users and journal entries.
+#
+# Rows are read lazily from CSV or NDJSON (or the legacy users_data.json
+# store), validated one at a time, and inserted with executemany() in batches
+# of IMPORT_BATCH_SIZE. A transaction is committed every IMPORT_CHUNK_SIZE
+# rows, so memory stays flat and a failure only loses the current chunk.
+# A batch that hits a constraint violation is replayed row by row inside
+# savepoints so that only the offending rows are rejected.
+
+ENTRY_FIELDS = ('date', 'subject', 'learnt', 'challenges', 'schedule')
+USER_FIELDS = ('first_name', 'last_name', 'username', 'email')
+WERKZEUG_HASH = re.compile(r'^(pbkdf2|scrypt):[^$]+\$[^$]+\$[0-9a-f]+$')
+
+INSERT_ENTRY_SQL = '''
+    INSERT INTO journal_entries (user_id, course_id, date, subject, learnt, challenges, schedule)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_USER_SQL = '''
+    INSERT INTO users (first_name, last_name, username, email, password)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+class RowError(Exception):
+    """Raised for a row that fails validation."""
+
+def read_rows(fileobj, fmt):
+    """Yield (line_number, row dict) from a CSV or NDJSON text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fileobj)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(fileobj, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, RowError("Expected a JSON object")
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def guess_format(filename):
+    """Guess csv/ndjson from a file name, defaulting to CSV."""
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+def read_legacy_users(fileobj):
+    """Split the legacy users_data.json store into user rows and entry rows.
+
+    The store maps usernames to user records; each record may carry its
+    journal under ``entries`` (or ``journal``) as dicts or as
+    [date, subject, learnt, challenges, schedule] lists.
+    """
+    data = json.load(fileobj) or {}
+    if isinstance(data, list):
+        data = {record.get('username'): record for record in data if isinstance(record, dict)}
+    users, entries = [], []
+    for username, record in data.items():
+        if not isinstance(record, dict):
+            users.append((username, RowError("Expected a user object")))
+            continue
+        users.append((username, {**record, 'username': record.get('username', username)}))
+        for entry in record.get('entries', record.get('journal', [])) or []:
+            if isinstance(entry, (list, tuple)):
+                entry = dict(zip(ENTRY_FIELDS, entry))
+            if isinstance(entry, dict):
+                entries.append((username, {**entry, 'username': username}))
+            else:
+                entries.append((username, RowError("Expected an entry object or list")))
+    return users, entries
+
+def _clean(row, field):
+    value = row.get(field)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+class _Resolver:
+    """Memoises username -> id and (user, course name) -> course id lookups."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.user_ids = {}
+        self.course_ids = {}
+        self.owned_courses = {}
+        self.created_courses = set()
+
+    def user_id(self, username):
+        if username not in self.user_ids:
+            row = self.conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+            self.user_ids[username] = row[0] if row else None
+        return self.user_ids[username]
+
+    def course_id(self, user_id, name):
+        key = (user_id, name.lower())
+        if key not in self.course_ids:
+            row = self.conn.execute(
+                'SELECT id FROM courses WHERE user_id = ? AND name = ? COLLATE NOCASE',
+                (user_id, name)).fetchone()
+            if row is None:
+                cursor = self.conn.execute('INSERT INTO courses (user_id, name) VALUES (?, ?)', (user_id, name))
+                self.created_courses.add(user_id)
+                self.course_ids[key] = cursor.lastrowid
+            else:
+                self.course_ids[key] = row[0]
+        return self.course_ids[key]
+
+    def owns_course(self, user_id, course_id):
+        key = (user_id, course_id)
+        if key not in self.owned_courses:
+            row = self.conn.execute('SELECT 1 FROM courses WHERE id = ? AND user_id = ?', (course_id, user_id)).fetchone()
+            self.owned_courses[key] = row is not None
+        return self.owned_courses[key]
+
+def _entry_params(row, resolver, user_id):
+    if user_id is None:
+        username = _clean(row, 'username')
+        if not username:
+            raise RowError("Missing username")
+        user_id = resolver.user_id(username)
+        if user_id is None:
+            raise RowError(f"Unknown user: {username}")
+
+    values = {field: _clean(row, field) for field in ENTRY_FIELDS}
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        raise RowError(f"Missing {', '.join(missing)}")
+    try:
+        values['date'] = date_type.fromisoformat(values['date']).isoformat()
+    except ValueError:
+        raise RowError(f"Invalid date: {values['date']}")
+
+    course_id = None
+    if _clean(row, 'course_id'):
+        try:
+            course_id = int(_clean(row, 'course_id'))
+        except ValueError:
+            raise RowError(f"Invalid course_id: {row.get('course_id')}")
+        if not resolver.owns_course(user_id, course_id):
+            raise RowError(f"Unknown course_id: {course_id}")
+    elif _clean(row, 'course'):
+        course_id = resolver.course_id(user_id, _clean(row, 'course'))
+
+    return (user_id, course_id, values['date'], values['subject'], values['learnt'],
+            values['challenges'], values['schedule'])
+
+def _user_params(row, resolver, user_id):
+    values = {field: _clean(row, field) for field in USER_FIELDS}
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        raise RowError(f"Missing {', '.join(missing)}")
+    if '@' not in values['email']:
+        raise RowError(f"Invalid email: {values['email']}")
+
+    # Pre-hashed passwords (e.g. from the legacy store) are kept as they are;
+    # plain-text ones go through the hashing pool.
+    password = _clean(row, 'password_hash') or _clean(row, 'password')
+    if not password:
+        raise RowError("Missing password")
+    if not WERKZEUG_HASH.match(password):
+        password = hash_password(password)
+    return (values['first_name'], values['last_name'], values['username'], values['email'], password)
+
+class BulkImporter:
+    """Validate and insert a stream of rows in batched, chunked transactions.
+
+    ``rejects`` is an optional text file that receives one NDJSON line per
+    rejected row; ``progress`` is called with the running stats after every
+    committed chunk.
+    """
+
+    def __init__(self, conn, sql, build_params, user_id=None, rejects=None, progress=None,
+                 batch_size=config.IMPORT_BATCH_SIZE, chunk_size=config.IMPORT_CHUNK_SIZE):
+        self.conn = conn
+        self.sql = sql
+        self.build_params = build_params
+        self.user_id = user_id
+        self.rejects = rejects
+        self.progress = progress
+        self.batch_size = max(1, batch_size)
+        self.chunk_size = max(self.batch_size, chunk_size)
+        self.resolver = _Resolver(conn)
+        self.stats = {'read': 0, 'inserted': 0, 'rejected': 0, 'chunks': 0, 'seconds': 0.0}
+        self.reject_samples = []
+        self._batch = []
+        self._in_chunk = 0
+        self._started = None
+
+    def _reject(self, line, reason, row):
+        self.stats['rejected'] += 1
+        record = {'line': line, 'reason': reason}
+        if len(self.reject_samples) < 100:
+            self.reject_samples.append(record)
+        if self.rejects is not None:
+            self.rejects.write(json.dumps({**record, 'row': row}, default=str) + '\n')
+
+    def _flush_batch(self):
+        if not self._batch:
+            return
+        if not self.conn.in_transaction:
+            self.conn.execute('BEGIN')
+        self.conn.execute('SAVEPOINT import_batch')
+        try:
+            self.conn.executemany(self.sql, [params for _, _, params in self._batch])
+            self.stats['inserted'] += len(self._batch)
+        except sqlite3.IntegrityError:
+            # Replay the batch row by row so only the offending rows are rejected
+            self.conn.execute('ROLLBACK TO import_batch')
+            for line, row, params in self._batch:
+                self.conn.execute('SAVEPOINT import_row')
+                try:
+                    self.conn.execute(self.sql, params)
+                    self.stats['inserted'] += 1
+                except sqlite3.IntegrityError as e:
+                    self.conn.execute('ROLLBACK TO import_row')
+                    self._reject(line, str(e), row)
+                self.conn.execute('RELEASE import_row')
+        self.conn.execute('RELEASE import_batch')
+        self._in_chunk += len(self._batch)
+        self._batch = []
+        if self._in_chunk >= self.chunk_size:
+            self._commit_chunk()
+
+    def _commit_chunk(self):
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.stats['chunks'] += 1
+        self._in_chunk = 0
+        self.stats['seconds'] = time.perf_counter() - self._started
+        logger.info("Import progress: %(read)d read, %(inserted)d inserted, %(rejected)d rejected", self.stats)
+        if self.progress is not None:
+            self.progress(dict(self.stats))
+
+    def run(self, rows):
+        """Import ``rows``, an iterable of (line_number, dict) pairs."""
+        self._started = time.perf_counter()
+        try:
+            for line, row in rows:
+                self.stats['read'] += 1
+                if isinstance(row, Exception):
+                    self._reject(line, str(row), None)
+                    continue
+                try:
+                    params = self.build_params(row, self.resolver, self.user_id)
+                except RowError as e:
+                    self._reject(line, str(e), row)
+                    continue
+                self._batch.append((line, row, params))
+                if len(self._batch) >= self.batch_size:
+                    self._flush_batch()
+            self._flush_batch()
+            self._commit_chunk()
+        except Exception:
+            database.rollback_db(self.conn)
+            raise
+        finally:
+            for user_id in self.resolver.created_courses:
+                database.invalidate_courses(user_id)
+            if self.user_id is not None:
+                database.invalidate_fragments(self.user_id)
+        return {**self.stats, 'reject_samples': self.reject_samples}
+
+def import_entries(rows, user_id=None, **options):
+    """Bulk import journal entries.
+
+    With ``user_id`` every row belongs to that user; otherwise each row names
+    its owner in a ``username`` column. Courses may be given by ``course_id``
+    or by ``course`` name (created on demand).
+    """
+    with database.standalone_db() as conn:
+        return BulkImporter(conn, INSERT_ENTRY_SQL, _entry_params, user_id=user_id, **options).run(rows)
+
+def import_users(rows, **options):
+    """Bulk import users; duplicate usernames or emails are rejected."""
+    with database.standalone_db() as conn:
+        return BulkImporter(conn, INSERT_USER_SQL, _user_params, **options).run(rows)
+
+def import_legacy_store(fileobj, **options):
+    """Import users and their journals from the legacy users_data.json store."""
+    users, entries = read_legacy_users(fileobj)
+    return {
+        'users': import_users(users, **options),
+        'entries': import_entries(entries, **options),
+    }
@@ -0,0 +1,206 @@
+import functools
+import logging
+import sqlite3
+from datetime import date as date_type
+from flask import jsonify, request, session
+import config
+from database import BATCH_OPERATIONS, apply_journal_batch
+
+logger = logging.getLogger(__name__)
+
+# Request validation and JSON shapes for the journal API in urls.py.
+#
+# Entries and courses are validated here, before any SQL runs; ownership and
+# existence are checked by database.apply_journal_batch(), which every
+# write, single or batched, goes through.
+
+ENTRY_TEXT_FIELDS = ('subject', 'learnt', 'challenges', 'schedule')
+ENTRY_FIELDS = ('course_id', 'date') + ENTRY_TEXT_FIELDS
+COURSE_FIELDS = ('name', 'code')
+
+# apply_journal_batch() error code -> HTTP status of the item
+ERROR_STATUS = {'invalid': 422, 'not_found': 404, 'conflict': 409}
+# Status of an operation that succeeded but was rolled back with an atomic batch
+ROLLED_BACK_STATUS = 424
+
+class ApiError(ValueError):
+    """Invalid request data; reported to the client with ``status``."""
+
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+def _object(data, what):
+    if not isinstance(data, dict):
+        raise ApiError(f'{what} must be a JSON object', 400)
+    return data
+
+def _unknown(data, allowed):
+    unknown = sorted(set(data) - set(allowed))
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+
+def entry_fields(data, partial=False):
+    """Validate entry fields; with ``partial`` only the given ones are required."""
+    data = _object(data, 'Entry')
+    _unknown(data, ENTRY_FIELDS)
+    missing = [name for name in ('date',) + ENTRY_TEXT_FIELDS if name not in data]
+    if missing and not partial:
+        raise ApiError(f"Missing field(s): {', '.join(missing)}")
+
+    fields = {}
+    if 'course_id' in data:
+        course_id = data['course_id']
+        if course_id is not None and (not isinstance(course_id, int) or isinstance(course_id, bool)):
+            raise ApiError('course_id must be an integer or null')
+        fields['course_id'] = course_id
+    if 'date' in data:
+        try:
+            fields['date'] = date_type.fromisoformat(data['date']).isoformat()
+        except (TypeError, ValueError):
+            raise ApiError('date must be a YYYY-MM-DD date')
+    for name in ENTRY_TEXT_FIELDS:
+        if name in data:
+            value = data[name]
+            if not isinstance(value, str) or not value.strip():
+                raise ApiError(f'{name} must be a non-empty string')
+            fields[name] = value
+    return fields
+
+def form_entry_fields(form):
+    """Validate the journal entry form (new entry or edit) by the API's rules."""
+    data = {name: form.get(name, '') for name in ('date',) + ENTRY_TEXT_FIELDS}
+    data['course_id'] = form.get('course_id', type=int)
+    return entry_fields(data)
+
+def course_fields(data):
+    data = _object(data, 'Course')
+    _unknown(data, COURSE_FIELDS)
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise ApiError('name must be a non-empty string')
+    code = data.get('code')
+    if code is not None and not isinstance(code, str):
+        raise ApiError('code must be a string or null')
+    return {'name': name.strip(), 'code': code or None}
+
+def _target_id(item, operation):
+    target_id = item.get('id')
+    if not isinstance(target_id, int) or isinstance(target_id, bool):
+        raise ApiError(f'{operation} needs an integer id')
+    return target_id
+
+def parse_operation(item):
+    """Turn one batch item ``{"op": ..., "id": ..., "data": {...}}`` into a database operation."""
+    item = _object(item, 'Operation')
+    operation = item.get('op')
+    if operation not in BATCH_OPERATIONS:
+        raise ApiError(f"op must be one of: {', '.join(BATCH_OPERATIONS)}")
+    if operation == 'create_entry':
+        return operation, None, entry_fields(item.get('data'))
+    if operation == 'update_entry':
+        return operation, _target_id(item, operation), entry_fields(item.get('data'), partial=True)
+    if operation == 'create_course':
+        return operation, None, course_fields(item.get('data'))
+    return operation, _target_id(item, operation), {}
+
+def parse_batch(data):
+    """Validate a batch request; returns (atomic, list of operation-or-ApiError)."""
+    data = _object(data, 'Batch')
+    items = data.get('operations')
+    if not isinstance(items, list) or not items:
+        raise ApiError('operations must be a non-empty list', 400)
+    if len(items) > config.API_BATCH_MAX_OPERATIONS:
+        raise ApiError(f'At most {config.API_BATCH_MAX_OPERATIONS} operations per batch', 413)
+    operations = []
+    for item in items:
+        try:
+            operations.append(parse_operation(item))
+        except ApiError as e:
+            operations.append(e)
+    return bool(data.get('atomic', False)), operations
+
+def item_status(operation, result):
+    if not result['ok']:
+        return ERROR_STATUS.get(result['error'], 400)
+    return 201 if operation.startswith('create_') else 200
+
+def json_body():
+    data = request.get_json(silent=True)
+    if data is None:
+        raise ApiError('Expected a JSON request body', 400)
+    return data
+
+def apply_one(user_id, operation, target_id, fields):
+    """Apply a single write; returns the affected id or raises ApiError."""
+    _, (result,) = apply_journal_batch(user_id, [(operation, target_id, fields)])
+    if not result['ok']:
+        raise ApiError(result['message'], ERROR_STATUS.get(result['error'], 400))
+    return result['id']
+
+def run_batch(user_id, data):
+    """Validate and apply a batch request; returns (committed, per-item results)."""
+    atomic, operations = parse_batch(data)
+    results = [None] * len(operations)
+    valid = []
+    for index, operation in enumerate(operations):
+        if isinstance(operation, ApiError):
+            results[index] = {'index': index, 'status': operation.status, 'error': str(operation)}
+        else:
+            valid.append((index, operation))
+
+    if atomic and len(valid) < len(operations):
+        committed, applied = False, [{'ok': True, 'id': None}] * len(valid)
+    else:
+        committed, applied = apply_journal_batch(user_id, [operation for _, operation in valid], atomic)
+
+    for (index, operation), result in zip(valid, applied):
+        item = {'index': index, 'op': operation[0]}
+        if result['ok'] and not committed:
+            item.update(status=ROLLED_BACK_STATUS, error='Not applied: another operation in the atomic batch failed')
+        elif result['ok']:
+            item.update(status=item_status(operation[0], result), id=result['id'])
+        else:
+            item.update(status=item_status(operation[0], result), error=result['message'])
+        results[index] = item
+    return committed, results
+
+def api_view(view):
+    """JSON error handling for API views: 401 when logged out, ApiError as its status."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify(error='Please log in first'), 401
+        try:
+            return view(*args, **kwargs)
+        except ApiError as e:
+            return jsonify(error=str(e)), e.status
+        except sqlite3.Error as e:
+            logger.error("Database error in %s: %s", request.endpoint, e)
+            return jsonify(error='Database error occurred'), 500
+    return wrapper
+
+def entry_json(row):
+    return {
+        'id': row['id'],
+        'date': row['date'],
+        'course_id': row['course_id'],
+        'course_name': row['course_name'],
+        'subject': row['subject'],
+        'learnt': row['learnt'],
+        'challenges': row['challenges'],
+        'schedule': row['schedule'],
+    }
+
+def entry_summary_json(row):
+    """The listing shape: what the journal table shows."""
+    return {
+        'id': row['id'],
+        'date': row['date'],
+        'course_id': row['course_id'],
+        'course_name': row['course_name'],
+        'subject': row['subject'],
+    }
+
+def course_json(row):
+    return {'id': row['id'], 'name': row['name'], 'code': row['code']}
@@ -0,0 +1,139 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import config
+
+# Application logging.
+#
+# Request threads only put records on an in-memory queue (QueueHandler); a
+# QueueListener thread does the formatting and the file/console I/O, so slow
+# disks and terminals never add to request latency. The log file rotates by
+# size, or by time when LOG_ROTATE_WHEN is set.
+#
+# Rotation is per process: every rotating handler renames the file on its
+# own, so several processes rotating one file lose lines or write them to
+# the rotated copy. When pre-forked server workers share a file
+# (share_log_files()), it is opened with a WatchedFileHandler instead: each
+# process only appends, rotation is left to an external tool such as
+# logrotate, and each process reopens the file once it has been moved.
+
+_listener = None
+_lock = threading.Lock()
+_atexit_registered = False
+_shared_files = False
+# Dedicated log files: logger name -> (path, max_bytes, backup_count), see add_log_file()
+_log_files = {}
+
+def parse_levels(spec):
+    """Parse "name=LEVEL,name=LEVEL" into a {logger name: level} dict."""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def file_handler(path, max_bytes, backup_count, when=''):
+    """Return a handler for log file ``path``, rotating unless files are shared."""
+    if _shared_files:
+        return logging.handlers.WatchedFileHandler(path, encoding='utf-8', delay=True)
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+
+def _file_handler():
+    return file_handler(config.LOG_FILE, config.LOG_MAX_BYTES, config.LOG_BACKUP_COUNT, config.LOG_ROTATE_WHEN)
+
+def configure_logging():
+    """Install the queue-based logging pipeline; safe to call more than once."""
+    global _listener, _atexit_registered
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = logging.Formatter(config.LOG_FORMAT)
+        handlers = [logging.StreamHandler()]
+        if config.LOG_FILE:
+            handlers.insert(0, _file_handler())
+        dedicated = tuple(_log_files)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            if dedicated:
+                handler.addFilter(lambda record: not record.name.startswith(dedicated))
+        for name, (path, max_bytes, backup_count) in _log_files.items():
+            handler = file_handler(path, max_bytes, backup_count)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            handler.addFilter(logging.Filter(name))
+            handlers.append(handler)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(config.LOG_LEVEL)
+        for name, level in parse_levels(config.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        if not _atexit_registered:
+            atexit.register(stop_logging)
+            _atexit_registered = True
+        return _listener
+
+def add_log_file(name, path, max_bytes, backup_count):
+    """Write logger ``name``'s records, message only, to a file of their own.
+
+    The records go through the same queue and listener thread as every
+    other record, so the caller never waits on the file.
+    """
+    if _log_files.get(name) == (path, max_bytes, backup_count):
+        return
+    _log_files[name] = (path, max_bytes, backup_count)
+    logging.getLogger(name).setLevel(logging.INFO)
+    if _listener is not None:
+        stop_logging()
+        configure_logging()
+
+def share_log_files():
+    """Stop rotating log files in-process because several processes write them.
+
+    Call before forking server workers; they inherit the setting. Rotate
+    LOG_FILE externally (e.g. logrotate without copytruncate) from then on.
+    """
+    global _shared_files
+    if _shared_files:
+        return
+    _shared_files = True
+    stop_logging()
+    configure_logging()
+    logging.getLogger(__name__).info(
+        "Log files are shared by several processes; in-process rotation is off, rotate them externally")
+
+def restart_logging_after_fork():
+    """Start a fresh queue and listener thread in a forked server worker.
+
+    The listener thread does not survive a fork, so records queued by the
+    worker would otherwise never be written. Workers keep the parent's
+    shared-file setting (see share_log_files()).
+    """
+    global _listener, _lock
+    _listener = None
+    _lock = threading.Lock()
+    configure_logging()
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from math import ceil
+from limits.storage import storage_from_string
+import config
+
+logger = logging.getLogger(__name__)
+
+# Login throttling by username and by client IP.
+#
+# check() runs before the user lookup and the password hash, so a throttled
+# attempt costs a couple of counter reads instead of a scrypt computation.
+# After LOGIN_FREE_ATTEMPTS failures within LOGIN_FAILURE_WINDOW seconds,
+# every further failure blocks the key for an exponentially growing delay
+# (capped at LOGIN_BACKOFF_MAX); LOGIN_LOCKOUT_ATTEMPTS failures lock it out
+# for LOGIN_LOCKOUT_SECONDS. IPs get much higher thresholds because a whole
+# school may share one address.
+#
+# Counters live in the rate-limit storage (RATELIMIT_STORAGE_URI), so all
+# worker processes see the same failures.
+
+_storage = None
+_storage_lock = threading.Lock()
+
+USER_POLICY = {
+    'free': config.LOGIN_FREE_ATTEMPTS,
+    'lockout': config.LOGIN_LOCKOUT_ATTEMPTS,
+}
+IP_POLICY = {
+    'free': config.LOGIN_IP_FREE_ATTEMPTS,
+    'lockout': config.LOGIN_IP_LOCKOUT_ATTEMPTS,
+}
+
+def _get_storage():
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = storage_from_string(config.RATELIMIT_STORAGE_URI)
+    return _storage
+
+def _keys(username, ip):
+    keys = []
+    if username:
+        keys.append((f"login/user/{username.strip().lower()}", USER_POLICY))
+    if ip:
+        keys.append((f"login/ip/{ip}", IP_POLICY))
+    return keys
+
+def backoff_seconds(failures, policy):
+    """Return how long a key is blocked after its ``failures``-th failure."""
+    if failures >= policy['lockout']:
+        return config.LOGIN_LOCKOUT_SECONDS
+    if failures <= policy['free']:
+        return 0
+    return min(config.LOGIN_BACKOFF_BASE * 2 ** (failures - policy['free'] - 1), config.LOGIN_BACKOFF_MAX)
+
+def check(username, ip):
+    """Return the seconds until a login may be attempted, or 0 if it may go ahead."""
+    try:
+        storage = _get_storage()
+        now = time.time()
+        wait = 0
+        for key, _ in _keys(username, ip):
+            if storage.get(f"{key}/blocked"):
+                wait = max(wait, storage.get_expiry(f"{key}/blocked") - now)
+        return int(ceil(wait))
+    except Exception as e:
+        # Fail open: a broken throttle must not lock everyone out
+        logger.error("Login throttle check failed: %s", e)
+        return 0
+
+def record_failure(username, ip):
+    """Count a failed login and block the username/IP if it is over its allowance."""
+    try:
+        storage = _get_storage()
+        for key, policy in _keys(username, ip):
+            failures = storage.incr(f"{key}/failures", config.LOGIN_FAILURE_WINDOW)
+            delay = backoff_seconds(failures, policy)
+            if delay:
+                storage.clear(f"{key}/blocked")
+                storage.incr(f"{key}/blocked", int(ceil(delay)))
+                logger.warning("Throttling %s for %ss after %d failed logins", key, delay, failures)
+    except Exception as e:
+        logger.error("Could not record failed login: %s", e)
+
+def record_success(username):
+    """Forget the failures of a username after it logs in (the IP keeps its count)."""
+    try:
+        storage = _get_storage()
+        for key, _ in _keys(username, None):
+            storage.clear(f"{key}/failures")
+            storage.clear(f"{key}/blocked")
+    except Exception as e:
+        logger.error("Could not reset login throttle: %s", e)
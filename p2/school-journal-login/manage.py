@@ -0,0 +1,146 @@
+import logging
+import time
+from pathlib import Path
+import click
+import config
+import database
+import datagen
+import exporter
+import importer
+import static_assets
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+@click.group()
+def cli():
+    """School Journal maintenance commands."""
+
+@cli.command('init-db')
+def init_db():
+    """Create any missing tables, indexes and triggers."""
+    database.init_db()
+
+@cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the dashboard summary tables from journal_entries."""
+    conn = database.get_db()
+    try:
+        database.rebuild_dashboard_stats(conn)
+        conn.commit()
+    finally:
+        database.close_db(conn)
+    click.echo('Dashboard summary tables rebuilt.')
+
+@cli.command('rebuild-search')
+def rebuild_search():
+    """Rebuild the full-text search index from journal_entries."""
+    conn = database.get_db()
+    try:
+        database.rebuild_search_index(conn)
+        conn.commit()
+    finally:
+        database.close_db(conn)
+    click.echo('Search index rebuilt.')
+
+@cli.command('import')
+@click.argument('kind', type=click.Choice(['entries', 'users', 'legacy']))
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format (default: from the file extension).')
+@click.option('--user', 'username', help='Import every entry for this user instead of a username column.')
+@click.option('--rejects', type=click.File('w', encoding='utf-8'),
+              help='Write rejected rows here, one JSON object per line.')
+@click.option('--batch-size', type=int, default=config.IMPORT_BATCH_SIZE, show_default=True)
+@click.option('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE, show_default=True,
+              help='Rows per committed transaction.')
+def import_data(kind, source, fmt, username, rejects, batch_size, chunk_size):
+    """Stream users or journal entries from SOURCE (a file or '-')."""
+    def progress(stats):
+        click.echo(f"  {stats['read']} read, {stats['inserted']} inserted, "
+                   f"{stats['rejected']} rejected ({stats['seconds']:.1f}s)", err=True)
+
+    options = dict(rejects=rejects, progress=progress, batch_size=batch_size, chunk_size=chunk_size)
+    if kind == 'legacy':
+        results = importer.import_legacy_store(source, **options)
+    else:
+        rows = importer.read_rows(source, fmt or importer.guess_format(source.name))
+        if kind == 'users':
+            results = {'users': importer.import_users(rows, **options)}
+        else:
+            user_id = None
+            if username:
+                user = database.get_user_by_username(username)
+                if user is None:
+                    raise click.ClickException(f"Unknown user: {username}")
+                user_id = user['id']
+            results = {'entries': importer.import_entries(rows, user_id=user_id, **options)}
+
+    for name, stats in results.items():
+        click.echo(f"{name}: {stats['inserted']} inserted, {stats['rejected']} rejected "
+                   f"of {stats['read']} rows in {stats['seconds']:.2f}s")
+
+@cli.command('export')
+@click.argument('username')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Output file (default: stdout).')
+@click.option('--course-id', type=int, help='Only entries for this course.')
+@click.option('--from', 'date_from', help='Only entries on or after this date (YYYY-MM-DD).')
+@click.option('--to', 'date_to', help='Only entries on or before this date (YYYY-MM-DD).')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+def export_data(username, fmt, output, course_id, date_from, date_to, compress):
+    """Stream USERNAME's journal as CSV or NDJSON."""
+    user = database.get_user_by_username(username)
+    if user is None:
+        raise click.ClickException(f"Unknown user: {username}")
+    for chunk in exporter.export_journal(user['id'], fmt, compress=compress, course_id=course_id,
+                                         date_from=date_from, date_to=date_to):
+        output.write(chunk)
+
+@cli.command('generate')
+@click.option('--db', 'path', required=True, type=click.Path(dir_okay=False),
+              help='SQLite database to write to (created if missing).')
+@click.option('--users', default=1000, show_default=True, help='Number of students.')
+@click.option('--courses', default=24, show_default=True, help='Courses per student.')
+@click.option('--days', default=730, show_default=True, help='Days of journal history per student.')
+@click.option('--density', default=0.7, show_default=True, type=click.FloatRange(0, 1),
+              help='Chance of an entry on any given day.')
+@click.option('--seed', default=1, show_default=True, help='Random seed; equal seeds give equal data.')
+@click.option('--end', 'end_date', type=click.DateTime(['%Y-%m-%d']),
+              help='Last day of history (default: today). Fix it for reproducible dates.')
+@click.option('--password', default='Passw0rd!', show_default=True, help='Password for every generated user.')
+@click.option('--keep-triggers', is_flag=True,
+              help='Maintain the search index and dashboard tables row by row instead of rebuilding them.')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows per transaction.')
+@click.option('--append', is_flag=True, help='Add to a database that already has users.')
+def generate(path, users, courses, days, density, seed, end_date, password, keep_triggers, chunk_size, append):
+    """Fill a database with deterministic synthetic students and journals."""
+    if not append and datagen.has_users(path):
+        raise click.ClickException(f'{path} already has users; pass --append to add generated data to it.')
+    generator = datagen.Generator(users, courses, days, density=density, seed=seed,
+                                  end=end_date.date() if end_date else None, password=password)
+    started = time.perf_counter()
+
+    def progress(label, total):
+        elapsed = time.perf_counter() - started
+        click.echo(f'{label}: {total} rows ({elapsed:.1f}s)', err=True)
+
+    stats = datagen.generate(path, generator, drop_triggers=not keep_triggers,
+                             chunk_size=chunk_size, progress=progress)
+    click.echo(f"Generated {stats['users']} users, {stats['courses']} courses and "
+               f"{stats['entries']} entries in {stats['seconds']}s.")
+
+@cli.command('build-static')
+@click.option('--static-dir', type=click.Path(file_okay=False, exists=True, path_type=Path),
+              default=Path(__file__).resolve().parent / 'static', show_default=True)
+@click.option('--clean', is_flag=True, help='Remove hashed files left over from earlier builds.')
+def build_static(static_dir, clean):
+    """Fingerprint and precompress static assets for long-lived caching."""
+    manifest = static_assets.build(static_dir, clean=clean)
+    for source, target in sorted(manifest.items()):
+        click.echo(f'{source} -> {config.STATIC_BUILD_DIR}/{target}')
+    click.echo('Restart the server to serve the new assets.')
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,180 @@
+import bisect
+import logging
+import threading
+import time
+from flask import Response, g, has_request_context, request
+import database
+import fragment_cache
+import security
+
+logger = logging.getLogger(__name__)
+
+# Request and SQL metrics in the Prometheus text exposition format.
+#
+# Recording is a bisect and a few additions under a lock per request and per
+# statement; everything else (pool, cache and hashing statistics, and the
+# text rendering) only happens when /metrics is scraped. Metrics are per
+# process: under gunicorn a scrape sees the worker that served it.
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STATEMENT_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts (last one is +Inf), then sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}')
+            labels = _labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {series[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+REQUEST_DURATION = Histogram(
+    'journal_request_duration_seconds', 'Time spent handling a request.',
+    ('endpoint', 'method', 'status'), REQUEST_BUCKETS)
+REQUEST_SQL_STATEMENTS = Histogram(
+    'journal_request_sql_statements', 'SQL statements run while handling a request.',
+    ('endpoint',), STATEMENT_COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram(
+    'journal_request_sql_seconds', 'Time spent in SQL while handling a request.',
+    ('endpoint',), SQL_BUCKETS)
+SQL_DURATION = Histogram(
+    'journal_sql_statement_duration_seconds', 'Time spent executing one SQL statement and reading its rows.',
+    ('operation',), SQL_BUCKETS)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_SQL_STATEMENTS, REQUEST_SQL_SECONDS, SQL_DURATION)
+
+def _operation(sql):
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+def record_statement(conn, sql, parameters, seconds):
+    """Statement listener: per-operation histogram plus per-request totals."""
+    SQL_DURATION.observe((_operation(sql),), seconds)
+    if has_request_context():
+        g.metrics_sql_statements = g.get('metrics_sql_statements', 0) + 1
+        g.metrics_sql_seconds = g.get('metrics_sql_seconds', 0.0) + seconds
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+
+def _capture_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _finish_request(exception=None):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    endpoint = request.endpoint or 'unmatched'
+    status = g.pop('metrics_status', 500)
+    REQUEST_DURATION.observe((endpoint, request.method, str(status)), time.perf_counter() - started)
+    REQUEST_SQL_STATEMENTS.observe((endpoint,), g.pop('metrics_sql_statements', 0))
+    REQUEST_SQL_SECONDS.observe((endpoint,), g.pop('metrics_sql_seconds', 0.0))
+
+def _stat_lines(name, documentation, metric_type, values):
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {metric_type}']
+    for labels, value in values:
+        lines.append(f'{name}{_labels(labels.keys(), labels.values())} {value}')
+    return lines
+
+def _runtime_lines():
+    lines = []
+    pool = database.pool_stats()
+    for key in ('connections_created', 'checkouts', 'waits', 'timeouts'):
+        lines += _stat_lines(f'journal_db_pool_{key}_total', f'Connection pool {key.replace("_", " ")}.',
+                             'counter', [({}, pool[key])])
+    lines += _stat_lines('journal_db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.',
+                         'counter', [({}, pool['wait_seconds'])])
+    for key in ('in_use', 'idle', 'max_size'):
+        lines += _stat_lines(f'journal_db_pool_{key}', f'Pooled connections {key.replace("_", " ")}.',
+                             'gauge', [({}, pool[key])])
+
+    caches = {'users': database.user_cache.stats(), 'courses': database.courses_cache.stats()}
+    for key in ('hits', 'misses', 'evictions'):
+        lines += _stat_lines(f'journal_cache_{key}_total', f'Cache {key}.', 'counter',
+                             [({'cache': name}, stats[key]) for name, stats in caches.items()])
+    for key in ('size', 'max_size'):
+        lines += _stat_lines(f'journal_cache_{key}', f'Cache entries ({key.replace("_", " ")}).', 'gauge',
+                             [({'cache': name}, stats[key]) for name, stats in caches.items()])
+
+    fragments = fragment_cache.stats()
+    if fragments is not None:
+        for key in ('hits', 'misses', 'evictions'):
+            lines += _stat_lines(f'journal_fragment_cache_{key}_total', f'Fragment cache {key}.', 'counter',
+                                 [({}, fragments[key])])
+        for key in ('size', 'bytes', 'max_bytes'):
+            lines += _stat_lines(f'journal_fragment_cache_{key}', f'Fragment cache {key.replace("_", " ")}.',
+                                 'gauge', [({}, fragments[key])])
+
+    hashing = security.hashing_stats()
+    lines += _stat_lines('journal_password_hash_operations_total', 'Password hashes and checks.',
+                         'counter', [({}, hashing['operations'])])
+    lines += _stat_lines('journal_password_hash_seconds_total', 'Time spent computing password hashes.',
+                         'counter', [({}, hashing['hash_seconds'])])
+    lines += _stat_lines('journal_password_hash_wait_seconds_total', 'Time spent queued for a hashing worker.',
+                         'counter', [({}, hashing['wait_seconds'])])
+    lines += _stat_lines('journal_password_hash_rejected_total', 'Hashing requests rejected as busy.',
+                         'counter', [({}, hashing['rejected'])])
+    return lines
+
+def render():
+    """Return every metric in the Prometheus text format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    try:
+        lines += _runtime_lines()
+    except Exception as e:
+        logger.error("Error collecting runtime metrics: %s", e)
+    return '\n'.join(lines) + '\n'
+
+def metrics_view():
+    return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def init_app(app):
+    """Record request and SQL metrics for ``app`` and serve them on /metrics."""
+    database.add_statement_listener(record_statement)
+    app.before_request(_start_request)
+    app.after_request(_capture_status)
+    app.teardown_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,233 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+from limits.storage import Storage
+from limits.storage.base import MovingWindowSupport, SlidingWindowCounterSupport, TimestampedSlidingWindow
+import config
+
+logger = logging.getLogger(__name__)
+
+# Rate-limit counters shared by every worker process on the host.
+#
+# Flask-Limiter's default memory:// storage is per process, so N workers
+# allow N times the configured limit, and its counters live as long as the
+# process. This storage keeps the counters in a small SQLite file of their
+# own (so limiter writes never contend with journal writes) and supports
+# every RATELIMIT_STRATEGY: fixed-window keeps one counter row per limit;
+# sliding-window-counter keeps two fixed-window rows, the previous window
+# weighted by how much of it still overlaps; moving-window keeps one row per
+# acquisition. Expired rows are pruned every RATELIMIT_PRUNE_INTERVAL
+# seconds and each table is capped at RATELIMIT_MAX_KEYS rows.
+#
+# Select it with RATELIMIT_STORAGE_URI=sqlite:///ratelimits.db (a relative
+# path) or sqlite:////var/lib/journal/ratelimits.db (an absolute one).
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits (expires_at);
+    CREATE TABLE IF NOT EXISTS rate_limit_entries (
+        key TEXT NOT NULL,
+        acquired_at REAL NOT NULL,
+        amount INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_rate_limit_entries_key ON rate_limit_entries (key, expires_at);
+    CREATE INDEX IF NOT EXISTS idx_rate_limit_entries_expires ON rate_limit_entries (expires_at);
+'''
+
+INCR_SQL = '''
+    INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+    ON CONFLICT (key) DO UPDATE SET
+        count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END,
+        expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+    RETURNING count
+'''
+
+GET_SQL = 'SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?'
+
+MOVING_WINDOW_SQL = '''
+    SELECT MIN(acquired_at), COALESCE(SUM(amount), 0) FROM rate_limit_entries
+    WHERE key = ? AND expires_at > ?
+'''
+
+# Table -> the column that identifies one of its rows
+TABLES = {'rate_limits': 'key', 'rate_limit_entries': 'rowid'}
+
+def database_from_uri(uri):
+    """Return the file path from a sqlite:///relative or sqlite:////absolute URI."""
+    path = uri.split('://', 1)[1] if '://' in uri else uri
+    if path.startswith('/'):
+        path = path[1:]
+    return path or 'ratelimits.db'
+
+class SQLiteStorage(Storage, MovingWindowSupport, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate-limit storage backed by a SQLite file shared between processes."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, prune_interval=None, max_keys=None, **options):
+        self.database = database_from_uri(uri or config.RATELIMIT_STORAGE_URI)
+        self.prune_interval = float(prune_interval or config.RATELIMIT_PRUNE_INTERVAL)
+        self.max_keys = int(max_keys or config.RATELIMIT_MAX_KEYS)
+        self._local = threading.local()
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0.0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().executescript(SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork so workers never
+        # share a handle with the master.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.database, timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a
+        # read-check-increment cannot interleave with another process.
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _maybe_prune(self, now):
+        if now < self._next_prune or not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_prune = now + self.prune_interval
+            self.prune(now)
+        finally:
+            self._prune_lock.release()
+
+    def prune(self, now=None):
+        """Delete expired counters and trim the table to max_keys rows."""
+        now = time.time() if now is None else now
+        expired = excess = 0
+        with self._transaction() as conn:
+            for table, row_id in TABLES.items():
+                expired += conn.execute(f'DELETE FROM {table} WHERE expires_at <= ?', (now,)).rowcount
+                over = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] - self.max_keys
+                if over > 0:
+                    # Over the cap: drop the rows closest to expiring anyway
+                    excess += conn.execute(f'''
+                        DELETE FROM {table} WHERE {row_id} IN (
+                            SELECT {row_id} FROM {table} ORDER BY expires_at LIMIT ?
+                        )
+                    ''', (over,)).rowcount
+        if expired or excess:
+            logger.debug("Pruned %d expired and %d excess rate-limit rows", expired, excess)
+        return expired + excess
+
+    def _incr(self, conn, key, expiry, amount, now):
+        return conn.execute(INCR_SQL, {
+            'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now,
+        }).fetchone()[0]
+
+    def _get(self, conn, key, now):
+        row = conn.execute(GET_SQL, (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        self._maybe_prune(now)
+        with self._transaction() as conn:
+            return self._incr(conn, key, expiry, amount, now)
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(GET_SQL, (key, now)).fetchone()
+        return row[1] if row else now
+
+    def clear(self, key):
+        with self._transaction() as conn:
+            for table in TABLES:
+                conn.execute(f'DELETE FROM {table} WHERE key = ?', (key,))
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as conn:
+            return sum(conn.execute(f'DELETE FROM {table}').rowcount for table in TABLES)
+
+    def _moving_window(self, conn, key, now):
+        oldest, count = conn.execute(MOVING_WINDOW_SQL, (key, now)).fetchone()
+        return (oldest if oldest is not None else now), count
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        self._maybe_prune(now)
+        with self._transaction() as conn:
+            if self._moving_window(conn, key, now)[1] + amount > limit:
+                return False
+            conn.execute('INSERT INTO rate_limit_entries (key, acquired_at, amount, expires_at) VALUES (?, ?, ?, ?)',
+                         (key, now, amount, now + expiry))
+            return True
+
+    def get_moving_window(self, key, limit, expiry):
+        return self._moving_window(self._connection(), key, time.time())
+
+    def _window(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        self._maybe_prune(now)
+        with self._transaction() as conn:
+            previous_count, previous_ttl, current_count, _ = self._window(conn, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            # The current window's row must outlive it to serve as the next
+            # window's "previous" count.
+            self._incr(conn, self.sliding_window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        return self._window(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM rate_limits WHERE key IN (?, ?)', (previous_key, current_key))
@@ -34,7 +34,158 @@ CREATE TABLE IF NOT EXISTS courses (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
-CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
-CREATE INDEX IF NOT EXISTS idx_journal_entries_user_id ON journal_entries (user_id);
-CREATE INDEX IF NOT EXISTS idx_courses_user_id ON courses (user_id);
+-- Each index matches a hot access pattern, so lookups are a single index
+-- search and ORDER BY never needs a temporary sort:
+--   journal pages, exports:  WHERE user_id = ? ORDER BY date, id (id is the rowid)
+--   course lists:            WHERE user_id = ? ORDER BY name
+--   course deletion:         the foreign-key check on journal_entries.course_id
+-- username and email are looked up through their UNIQUE constraints' indexes.
+CREATE INDEX IF NOT EXISTS idx_journal_entries_user_date ON journal_entries (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_journal_entries_course_id ON journal_entries (course_id);
+CREATE INDEX IF NOT EXISTS idx_courses_user_name ON courses (user_id, name);
+
+-- Superseded by the indexes above (kept as drops so existing databases shed
+-- the extra write cost on the next init_db)
+DROP INDEX IF EXISTS idx_users_username;
+DROP INDEX IF EXISTS idx_users_email;
+DROP INDEX IF EXISTS idx_journal_entries_user_id;
+DROP INDEX IF EXISTS idx_courses_user_id;
+
+-- Full-text search over journal entries (external content table, kept in
+-- sync with journal_entries by the triggers below). user_id is indexed as a
+-- token so a search matches "user_id:N AND ..." and only ever reads and
+-- ranks that user's rows, however many entries other users have.
+CREATE VIRTUAL TABLE IF NOT EXISTS journal_entries_fts USING fts5(
+    subject,
+    learnt,
+    challenges,
+    schedule,
+    user_id,
+    content='journal_entries',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN
+    INSERT INTO journal_entries_fts (rowid, subject, learnt, challenges, schedule, user_id)
+    VALUES (new.id, new.subject, new.learnt, new.challenges, new.schedule, new.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN
+    INSERT INTO journal_entries_fts (journal_entries_fts, rowid, subject, learnt, challenges, schedule, user_id)
+    VALUES ('delete', old.id, old.subject, old.learnt, old.challenges, old.schedule, old.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update AFTER UPDATE OF subject, learnt, challenges, schedule, user_id ON journal_entries BEGIN
+    INSERT INTO journal_entries_fts (journal_entries_fts, rowid, subject, learnt, challenges, schedule, user_id)
+    VALUES ('delete', old.id, old.subject, old.learnt, old.challenges, old.schedule, old.user_id);
+    INSERT INTO journal_entries_fts (rowid, subject, learnt, challenges, schedule, user_id)
+    VALUES (new.id, new.subject, new.learnt, new.challenges, new.schedule, new.user_id);
+END;
+
+-- Dashboard summaries, maintained by the triggers below so the dashboard
+-- never has to scan journal_entries. course_id 0 counts entries without a
+-- course. Rebuild with: python manage.py rebuild-stats
+CREATE TABLE IF NOT EXISTS journal_course_stats (
+    user_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, course_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS journal_daily_stats (
+    user_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, date)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS journal_stats_insert AFTER INSERT ON journal_entries BEGIN
+    INSERT INTO journal_course_stats (user_id, course_id, entry_count)
+    VALUES (new.user_id, COALESCE(new.course_id, 0), 1)
+    ON CONFLICT (user_id, course_id) DO UPDATE SET entry_count = entry_count + 1;
+    INSERT INTO journal_daily_stats (user_id, date, entry_count)
+    VALUES (new.user_id, new.date, 1)
+    ON CONFLICT (user_id, date) DO UPDATE SET entry_count = entry_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_stats_delete AFTER DELETE ON journal_entries BEGIN
+    UPDATE journal_course_stats SET entry_count = entry_count - 1
+    WHERE user_id = old.user_id AND course_id = COALESCE(old.course_id, 0);
+    DELETE FROM journal_course_stats
+    WHERE user_id = old.user_id AND course_id = COALESCE(old.course_id, 0) AND entry_count <= 0;
+    UPDATE journal_daily_stats SET entry_count = entry_count - 1
+    WHERE user_id = old.user_id AND date = old.date;
+    DELETE FROM journal_daily_stats
+    WHERE user_id = old.user_id AND date = old.date AND entry_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_stats_update AFTER UPDATE OF user_id, course_id, date ON journal_entries
+WHEN old.user_id IS NOT new.user_id OR old.course_id IS NOT new.course_id OR old.date IS NOT new.date
+BEGIN
+    UPDATE journal_course_stats SET entry_count = entry_count - 1
+    WHERE user_id = old.user_id AND course_id = COALESCE(old.course_id, 0);
+    DELETE FROM journal_course_stats
+    WHERE user_id = old.user_id AND course_id = COALESCE(old.course_id, 0) AND entry_count <= 0;
+    UPDATE journal_daily_stats SET entry_count = entry_count - 1
+    WHERE user_id = old.user_id AND date = old.date;
+    DELETE FROM journal_daily_stats
+    WHERE user_id = old.user_id AND date = old.date AND entry_count <= 0;
+    INSERT INTO journal_course_stats (user_id, course_id, entry_count)
+    VALUES (new.user_id, COALESCE(new.course_id, 0), 1)
+    ON CONFLICT (user_id, course_id) DO UPDATE SET entry_count = entry_count + 1;
+    INSERT INTO journal_daily_stats (user_id, date, entry_count)
+    VALUES (new.user_id, new.date, 1)
+    ON CONFLICT (user_id, date) DO UPDATE SET entry_count = entry_count + 1;
+END;
+
+-- Per-user data version, bumped by every write to a user's journal entries
+-- or courses. Page ETags are derived from it, so an unchanged page can be
+-- answered with 304 Not Modified after a single primary-key lookup.
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS journal_version_insert AFTER INSERT ON journal_entries BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (new.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_version_update AFTER UPDATE ON journal_entries BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (old.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (new.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_version_delete AFTER DELETE ON journal_entries BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (old.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS courses_version_insert AFTER INSERT ON courses BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (new.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS courses_version_update AFTER UPDATE ON courses BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (old.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (new.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS courses_version_delete AFTER DELETE ON courses BEGIN
+    INSERT INTO user_data_versions (user_id, version, updated_at)
+    VALUES (old.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import logging
+import multiprocessing
+import threading
+import time
+import config
+
+logger = logging.getLogger(__name__)
+
+# Password hashing runs in a small process pool so a burst of logins does not
+# hold the GIL on request threads. At most PASSWORD_HASH_MAX_PENDING hashes
+# may be queued or running at once, including ones whose caller timed out;
+# beyond that callers get HashingBusyError straight away instead of piling
+# up behind the workers.
+#
+# The workers are never forked from the server process itself: it runs
+# logging and rate-limit threads, and a forked child could inherit one of
+# their locks while it is held. A fork server that has imported only this
+# module starts them instead (or they are spawned where there is none).
+
+class HashingBusyError(Exception):
+    """Raised when the password hashing queue is full."""
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(config.PASSWORD_HASH_MAX_PENDING)
+_stats_lock = threading.Lock()
+_stats = {
+    'operations': 0,
+    'hash_seconds': 0.0,
+    'wait_seconds': 0.0,
+    'rejected': 0,
+}
+_method_prefix = None
+
+def _timed_hash(password, method):
+    started = time.perf_counter()
+    return generate_password_hash(password, method=method), time.perf_counter() - started
+
+def _timed_check(pwhash, password):
+    started = time.perf_counter()
+    return check_password_hash(pwhash, password), time.perf_counter() - started
+
+def _mp_context():
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # Preload just this module, not __main__ (start.py configures logging)
+    context.set_forkserver_preload([__name__])
+    return context
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                logger.info("Starting %d password hashing workers", config.PASSWORD_HASH_WORKERS)
+                _executor = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS,
+                                                mp_context=_mp_context())
+    return _executor
+
+def shutdown_hashing_pool():
+    """Stop the hashing workers (a new pool starts on next use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def reset_hashing_pool_after_fork():
+    """Drop the parent's hashing pool in a freshly forked server worker.
+
+    The parent's executor and its management threads do not survive a fork,
+    so the worker starts its own pool on first use.
+    """
+    global _executor, _executor_lock, _slots, _stats_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(config.PASSWORD_HASH_MAX_PENDING)
+    _stats_lock = threading.Lock()
+
+def _record(total, hashing):
+    with _stats_lock:
+        _stats['operations'] += 1
+        _stats['hash_seconds'] += hashing
+        _stats['wait_seconds'] += max(0.0, total - hashing)
+
+def _run(func, *args):
+    started = time.perf_counter()
+    if config.PASSWORD_HASH_WORKERS <= 0:
+        result, hashing = func(*args)
+        _record(time.perf_counter() - started, hashing)
+        return result
+
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats['rejected'] += 1
+        logger.warning("Password hashing queue full, rejecting request")
+        raise HashingBusyError("Password hashing queue is full")
+    try:
+        future = _get_executor().submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is freed when the work is done (or cancelled before it
+    # started), not when the caller stops waiting: a hash that outlives its
+    # timeout still occupies a worker and counts against the bound.
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        result, hashing = future.result(timeout=config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        with _stats_lock:
+            _stats['rejected'] += 1
+        raise HashingBusyError("Timed out waiting for password hashing")
+    _record(time.perf_counter() - started, hashing)
+    return result
+
+def hash_password(password):
+    """Hash a password with the configured method and cost."""
+    return _run(_timed_hash, password, config.PASSWORD_HASH_METHOD)
+
+def verify_password(pwhash, password):
+    """Check a password against a stored hash."""
+    if not pwhash or password is None:
+        return False
+    return _run(_timed_check, pwhash, password)
+
+def needs_rehash(pwhash):
+    """Return True if pwhash was made with a different method or cost than configured."""
+    global _method_prefix
+    if _method_prefix is None:
+        # Werkzeug expands defaults (e.g. 'scrypt' -> 'scrypt:32768:8:1'),
+        # so learn the canonical prefix from a throwaway hash once.
+        _method_prefix = generate_password_hash('', method=config.PASSWORD_HASH_METHOD).split('$', 1)[0]
+    return pwhash.split('$', 1)[0] != _method_prefix
+
+def hashing_stats():
+    """Return counters for time spent hashing and rejected requests."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['workers'] = config.PASSWORD_HASH_WORKERS
+    stats['max_pending'] = config.PASSWORD_HASH_MAX_PENDING
+    return stats
@@ -0,0 +1,117 @@
+import collections
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from flask import has_request_context, request
+import config
+import database
+from logging_config import add_log_file
+
+logger = logging.getLogger(__name__)
+
+# Opt-in slow-query recorder (SLOW_QUERY_ENABLED=1).
+#
+# Listens to every statement on pooled connections. Statements faster than
+# SLOW_QUERY_THRESHOLD_MS cost one comparison; slower ones are recorded with
+# the shapes (never the values) of their parameters and their EXPLAIN QUERY
+# PLAN, with full table scans and temporary B-trees flagged. A statement's
+# duration includes reading its rows (see database.TimedCursor), which is
+# where a slow scan spends its time. Records are kept in a bounded
+# in-memory ring buffer (recent()) and appended as JSON lines to their own
+# rotating log file by the logging_config queue listener, off the request
+# thread. There is deliberately no HTTP endpoint: the records hold SQL text
+# and endpoint names, so read the log file instead.
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+_records = collections.deque(maxlen=config.SLOW_QUERY_BUFFER_SIZE)
+_records_lock = threading.Lock()
+_slow_log = logging.getLogger('slow_queries.log')
+
+def _shape(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}({len(value)})'
+    return type(value).__name__
+
+def parameter_shapes(parameters):
+    """Describe bound parameters by type (and length), leaving out their values."""
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    return [_shape(value) for value in parameters]
+
+def explain(conn, sql, parameters):
+    """Return the EXPLAIN QUERY PLAN rows for ``sql`` as indented strings."""
+    # A plain sqlite3.Cursor bypasses TimedCursor, so this is not itself timed
+    rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node_id] + detail)
+    return plan
+
+def is_full_scan(detail):
+    detail = detail.strip()
+    return detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail
+
+def record_statement(conn, sql, parameters, seconds):
+    """Statement listener: record statements slower than the threshold."""
+    if seconds * 1000 < config.SLOW_QUERY_THRESHOLD_MS:
+        return
+    text = re.sub(r'\s+', ' ', sql).strip()
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration_ms': round(seconds * 1000, 3),
+        'sql': text,
+        'parameters': parameter_shapes(parameters),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'plan': None,
+        'full_scan': False,
+        'temp_btree': False,
+    }
+    if parameters is not None and text.split(' ', 1)[0].upper() in EXPLAINABLE:
+        try:
+            plan = explain(conn, sql, parameters)
+            record['plan'] = plan
+            record['full_scan'] = any(is_full_scan(line) for line in plan)
+            record['temp_btree'] = any('USE TEMP B-TREE' in line for line in plan)
+        except sqlite3.Error as e:
+            record['plan'] = [f'EXPLAIN failed: {e}']
+
+    with _records_lock:
+        _records.append(record)
+    _slow_log.info(json.dumps(record))
+    logger.warning("Slow query (%.1f ms%s): %s", record['duration_ms'],
+                   ', full scan' if record['full_scan'] else '', text[:200])
+
+def recent(limit=None):
+    """Return the most recent slow-query records, newest first."""
+    with _records_lock:
+        records = list(_records)
+    records.reverse()
+    return records[:limit] if limit else records
+
+def clear():
+    with _records_lock:
+        _records.clear()
+
+def _configure_log():
+    if config.SLOW_QUERY_LOG_FILE:
+        add_log_file(_slow_log.name, config.SLOW_QUERY_LOG_FILE,
+                     config.SLOW_QUERY_LOG_MAX_BYTES, config.SLOW_QUERY_LOG_BACKUP_COUNT)
+    else:
+        # Only the in-memory buffer; keep the JSON lines out of the main log
+        _slow_log.disabled = True
+
+def init_app(app):
+    """Start recording slow statements."""
+    _configure_log()
+    database.add_statement_listener(record_statement)
+    logger.info("Recording statements slower than %s ms", config.SLOW_QUERY_THRESHOLD_MS)
@@ -1,45 +1,118 @@
 import os
 import sys
 import logging
+import click
+import config
+from logging_config import configure_logging, restart_logging_after_fork, share_log_files
 from app import app
 
 # Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Check if schema.sql exists
 SCHEMA_FILE = 'schema.sql'
 if not os.path.exists(SCHEMA_FILE):
-    logger.error(f"Schema file {SCHEMA_FILE} not found. Please create it first.")
+    logger.error("Schema file %s not found. Please create it first.", SCHEMA_FILE)
     sys.exit(1)
 
 # Check if required directories exist
 TEMPLATES_DIR = 'templates'
 STATIC_DIR = 'static'
 if not os.path.exists(TEMPLATES_DIR):
-    logger.error(f"Templates directory {TEMPLATES_DIR} not found.")
+    logger.error("Templates directory %s not found.", TEMPLATES_DIR)
     sys.exit(1)
 if not os.path.exists(STATIC_DIR):
-    logger.error(f"Static directory {STATIC_DIR} not found.")
+    logger.error("Static directory %s not found.", STATIC_DIR)
     sys.exit(1)
 
-# Start Flask app
-if __name__ == '__main__':
+def post_fork(server, worker):
+    """Give each forked worker its own DB pool, hashing pool and log listener."""
+    import database
+    import security
+    restart_logging_after_fork()
+    database.reset_pool_after_fork()
+    security.reset_hashing_pool_after_fork()
+    logger.info("Worker %s started", worker.pid)
+
+def worker_exit(server, worker):
+    """Release the worker's resources when it stops."""
+    import database
+    import security
+    database.close_pool()
+    security.shutdown_hashing_pool()
+
+def create_server(options):
+    """Build a gunicorn application that serves the preloaded Flask app."""
     try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise click.ClickException("gunicorn is not installed; run: pip install gunicorn")
+
+    class JournalServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Runs once in the master with preload_app, before any fork;
+            # importing app has already created or upgraded the database
+            import database
+            database.close_pool()
+            return app
+
+    return JournalServer()
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def cli(ctx):
+    """Run the School Journal application."""
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(run)
+
+@cli.command()
+@click.option('--port', default=5001, show_default=True, help='Port for the development server.')
+def run(port):
+    """Run the single-process development server."""
+    try:
+        # Importing app has already created or upgraded the database
         logger.info("Starting Flask application...")
-        # Initialize app first
-        from app import initialize_app
-        initialize_app()
-        
-        # Then run the app
-        app.run(debug=True, port=5001)
+        app.run(debug=config.APP_ENV == 'development', port=port)
     except Exception as e:
-        logger.error(f"Failed to start application: {str(e)}")
+        logger.error("Failed to start application: %s", e)
         sys.exit(1)
+
+@cli.command()
+@click.option('--bind', '-b', default=config.SERVER_BIND, show_default=True, help='Address to listen on.')
+@click.option('--workers', '-w', default=config.SERVER_WORKERS, show_default=True, type=click.IntRange(1),
+              help='Number of worker processes.')
+@click.option('--threads', '-t', default=config.SERVER_THREADS, show_default=True, type=click.IntRange(1),
+              help='Request threads per worker.')
+@click.option('--timeout', default=config.SERVER_TIMEOUT, show_default=True, help='Worker timeout in seconds.')
+def serve(bind, workers, threads, timeout):
+    """Run the app under gunicorn with preloaded, pre-forked workers.
+
+    Send SIGHUP to reload workers gracefully and SIGTERM to drain and stop.
+    """
+    if workers > 1:
+        # Workers append to the same files; rotating them per process would race
+        share_log_files()
+    logger.info("Starting gunicorn on %s with %d workers x %d threads", bind, workers, threads)
+    create_server({
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'preload_app': True,
+        'timeout': timeout,
+        'graceful_timeout': config.SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': config.SERVER_KEEPALIVE,
+        'max_requests': config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': config.SERVER_MAX_REQUESTS_JITTER,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }).run()
+
+# Start Flask app
+if __name__ == '__main__':
+    cli()
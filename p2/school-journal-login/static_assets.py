@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from pathlib import Path
+from flask import request, send_from_directory
+import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Fingerprinted, precompressed static assets.
+#
+# `manage.py build-static` copies every file under static/ into
+# static/<STATIC_BUILD_DIR>/ with a content hash in its name
+# (css/app.css -> css/app.1a2b3c4d5e6f.css), writes .gz and, when the brotli
+# package is installed, .br variants next to it, and records the mapping in
+# manifest.json. With a manifest present, url_for('static', filename=...)
+# emits the hashed name, and hashed files are served with a one-year
+# immutable Cache-Control and the smallest precompressed variant the client
+# accepts, so a browser fetches each version of an asset exactly once.
+# Without a build everything falls back to Flask's plain static files.
+#
+# The manifest is read when the app starts, so run the build before
+# starting (or restarting) the server. Old hashed files are kept by default
+# so pages rendered before a deploy can still load their assets; --clean
+# removes them.
+
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Already compressed; gzip or brotli would only add overhead
+INCOMPRESSIBLE = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.woff', '.woff2',
+                  '.gz', '.br', '.zip', '.mp3', '.mp4', '.webm', '.pdf'}
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def hashed_name(relative, content):
+    path = Path(relative)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()
+
+def _sources(static_dir, build_dir):
+    for path in sorted(static_dir.rglob('*')):
+        if path.is_file() and build_dir not in path.parents and not path.name.startswith('.'):
+            yield path
+
+def _write(path, data):
+    # Write atomically so a running server never serves a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def _compressed_variants(content):
+    yield '.gz', gzip.compress(content, compresslevel=config.STATIC_GZIP_LEVEL, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(content, quality=config.STATIC_BROTLI_QUALITY)
+
+def build(static_dir, build_dir_name=None, clean=False):
+    """Fingerprint and precompress every file under ``static_dir``.
+
+    Returns the manifest: each source path relative to ``static_dir``
+    mapped to its hashed path relative to the build directory.
+    """
+    static_dir = Path(static_dir)
+    build_dir = static_dir / (build_dir_name or config.STATIC_BUILD_DIR)
+    manifest = {}
+    written = set()
+    for source in _sources(static_dir, build_dir):
+        relative = source.relative_to(static_dir).as_posix()
+        content = source.read_bytes()
+        target = hashed_name(relative, content)
+        manifest[relative] = target
+        written.add(target)
+        target_path = build_dir / target
+        if not target_path.exists():
+            _write(target_path, content)
+        if source.suffix.lower() in INCOMPRESSIBLE or len(content) < config.STATIC_COMPRESS_MIN_SIZE:
+            continue
+        for suffix, data in _compressed_variants(content):
+            # Only keep a variant that is actually smaller
+            if len(data) < len(content):
+                _write(build_dir / (target + suffix), data)
+                written.add(target + suffix)
+    if brotli is None:
+        logger.info("brotli is not installed; only gzip variants were written")
+
+    _write(build_dir / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    if clean:
+        for path in build_dir.rglob('*'):
+            relative = path.relative_to(build_dir).as_posix()
+            if path.is_file() and relative != MANIFEST_NAME and relative not in written:
+                path.unlink()
+                logger.debug("Removed stale asset %s", relative)
+    logger.info("Built %d static assets into %s", len(manifest), build_dir)
+    return manifest
+
+def load_manifest(static_dir, build_dir_name=None):
+    path = Path(static_dir) / (build_dir_name or config.STATIC_BUILD_DIR) / MANIFEST_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error("Could not read static manifest %s: %s", path, e)
+        return {}
+
+def _accepted_variant(build_dir, filename):
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and (build_dir / (filename + suffix)).is_file():
+            return encoding, suffix
+    return None, ''
+
+def init_app(app):
+    """Emit hashed static URLs and serve hashed files with immutable caching."""
+    static_dir = Path(app.static_folder)
+    build_dir = static_dir / config.STATIC_BUILD_DIR
+    manifest = load_manifest(static_dir)
+    hashed = set(manifest.values())
+    if not manifest:
+        logger.info("No static manifest in %s; serving unversioned static files", build_dir)
+        return
+
+    @app.url_defaults
+    def versioned_static_url(endpoint, values):
+        if endpoint == 'static':
+            target = manifest.get(values.get('filename'))
+            if target is not None:
+                values['filename'] = f'{config.STATIC_BUILD_DIR}/{target}'
+
+    plain_static = app.view_functions['static']
+    prefix = config.STATIC_BUILD_DIR + '/'
+
+    def static(filename):
+        name = filename[len(prefix):] if filename.startswith(prefix) else None
+        if name not in hashed:
+            return plain_static(filename=filename)
+
+        encoding, suffix = _accepted_variant(build_dir, name)
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = send_from_directory(build_dir, name + suffix, mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.content_encoding = encoding
+            # send_file names the .gz/.br file; the client asked for the asset
+            response.headers.pop('Content-Disposition', None)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+    logger.info("Serving %d fingerprinted static assets from %s", len(manifest), build_dir)
@@ -0,0 +1,147 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Import the Flask app against a throwaway database and working directory."""
+    workdir = tmp_path_factory.mktemp('school-journal')
+    for name in ('templates', 'schema.sql'):
+        os.symlink(APP_DIR / name, workdir / name)
+    (workdir / 'static').mkdir()
+
+    os.environ['SCHOOL_JOURNAL_DB'] = str(workdir / 'test.db')
+    os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    os.chdir(workdir)
+
+    import app as app_module
+    app_module.app.config.update(TESTING=True, RATELIMIT_ENABLED=False)
+    # The limiter read its config at import time, so switch it off directly
+    app_module.limiter.enabled = False
+    return app_module.app
+
+_user_count = 0
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as a freshly registered user."""
+    global _user_count
+    _user_count += 1
+    username = f'student{_user_count}'
+    client = app.test_client()
+    client.post('/register', data={
+        'first_name': 'Test',
+        'last_name': 'Student',
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'Passw0rd!',
+        'confirm_password': 'Passw0rd!',
+    })
+    client.post('/login', data={'username': username, 'password': 'Passw0rd!'})
+    with client.session_transaction() as session:
+        assert session.get('user') == username
+    return client
+
+@pytest.fixture
+def statements(app, monkeypatch):
+    """Record every SQL statement run on connections checked out during the test."""
+    import database
+
+    recorded = []
+    acquire = database._acquire
+
+    def traced_acquire():
+        conn = acquire()
+        conn.set_trace_callback(recorded.append)
+        return conn
+
+    monkeypatch.setattr(database, '_acquire', traced_acquire)
+    yield recorded
+    # Pooled connections keep their trace callback, so start the next test fresh
+    database.close_pool()
+
+# The tables as the first release created them (and as the checked-in
+# school_journal.db still has them): no course_id on journal_entries and none
+# of the search, summary or version tables.
+BASELINE_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE journal_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        learnt TEXT NOT NULL,
+        challenges TEXT NOT NULL,
+        schedule TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE courses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        code TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+    CREATE INDEX idx_users_username ON users (username);
+    CREATE INDEX idx_users_email ON users (email);
+    CREATE INDEX idx_journal_entries_user_id ON journal_entries (user_id);
+    CREATE INDEX idx_courses_user_id ON courses (user_id);
+'''
+
+BASELINE_USER = {'username': 'legacy', 'password': 'Passw0rd!'}
+
+def _clear_caches():
+    import database
+    import fragment_cache
+
+    database.close_pool()
+    database.user_cache.clear()
+    database.courses_cache.clear()
+    backend = fragment_cache.get_backend()
+    if backend is not None:
+        backend.clear()
+
+@pytest.fixture
+def baseline_db(app, tmp_path, monkeypatch):
+    """Point the app at a baseline-schema database holding one user and two entries.
+
+    The user is BASELINE_USER; the database is not upgraded, so tests call
+    initialize_app() or database.init_db() themselves.
+    """
+    import sqlite3
+    import database
+    from security import hash_password
+
+    path = tmp_path / 'baseline.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute('''INSERT INTO users (username, password, first_name, last_name, email)
+                    VALUES (?, ?, 'Legacy', 'Student', 'legacy@example.com')''',
+                 (BASELINE_USER['username'], hash_password(BASELINE_USER['password'])))
+    conn.executemany('''INSERT INTO journal_entries (user_id, date, subject, learnt, challenges, schedule)
+                        VALUES (1, ?, ?, ?, 'None', 'Revise')''', [
+        ('2024-03-04', 'Biology', 'Photosynthesis turns light into sugar'),
+        ('2024-03-05', 'History', 'The printing press spread literacy'),
+    ])
+    conn.commit()
+    conn.close()
+
+    _clear_caches()
+    monkeypatch.setattr(database, 'DB_FILE', path)
+    yield path
+    _clear_caches()
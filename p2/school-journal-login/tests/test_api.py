@@ -0,0 +1,93 @@
+import pytest
+
+ENTRY = {'date': '2024-09-02', 'subject': 'Fractions', 'learnt': 'Adding fractions',
+         'challenges': 'Common denominators', 'schedule': 'Worksheet'}
+
+@pytest.fixture
+def course_id(client):
+    response = client.post('/api/courses', json={'name': 'Maths', 'code': 'MA1'})
+    assert response.status_code == 201
+    return response.json['id']
+
+def _create(client, **fields):
+    response = client.post('/api/entries', json={**ENTRY, **fields})
+    assert response.status_code == 201, response.json
+    return response.json
+
+def test_entry_crud(client, course_id):
+    entry = _create(client, course_id=course_id)
+    assert entry['course_name'] == 'Maths'
+    assert client.get(f"/api/entries/{entry['id']}").json == entry
+
+    patched = client.patch(f"/api/entries/{entry['id']}", json={'subject': 'Decimals', 'course_id': None})
+    assert patched.status_code == 200
+    assert patched.json['subject'] == 'Decimals'
+    assert patched.json['course_id'] is None
+    assert patched.json['learnt'] == ENTRY['learnt']
+
+    assert client.delete(f"/api/entries/{entry['id']}").status_code == 204
+    assert client.get(f"/api/entries/{entry['id']}").status_code == 404
+    assert client.delete(f"/api/entries/{entry['id']}").status_code == 404
+
+def test_listing_pages_through_entries(client):
+    for day in range(1, 6):
+        _create(client, date=f'2024-09-{day:02d}')
+
+    first = client.get('/api/entries?limit=3').json
+    second = client.get(f"/api/entries?limit=3&after={first['next_cursor']}").json
+
+    assert first['total'] == 5
+    assert [entry['date'] for entry in first['entries'] + second['entries']] == [
+        f'2024-09-{day:02d}' for day in range(5, 0, -1)]
+    assert second['next_cursor'] is None
+
+def test_validation_and_ownership(client, app):
+    assert client.post('/api/entries', json={**ENTRY, 'date': 'yesterday'}).status_code == 422
+    assert client.post('/api/entries', json={'subject': 'Only this'}).status_code == 422
+    assert client.post('/api/entries', data='not json').status_code == 400
+
+    other = app.test_client()
+    assert other.get('/api/entries').status_code == 401
+
+    foreign_course = client.post('/api/courses', json={'name': 'Mine'}).json['id']
+    with client.session_transaction() as session:
+        session['user_id'] = session['user_id'] + 10000
+    response = client.post('/api/entries', json={**ENTRY, 'course_id': foreign_course})
+    assert response.status_code == 422
+
+def test_batch_reports_each_item(client, course_id):
+    existing = _create(client)
+    response = client.post('/api/batch', json={'operations': [
+        {'op': 'create_entry', 'data': {**ENTRY, 'course_id': course_id}},
+        {'op': 'update_entry', 'id': existing['id'], 'data': {'subject': 'Renamed'}},
+        {'op': 'delete_entry', 'id': 999999},
+        {'op': 'create_entry', 'data': {'subject': 'Incomplete'}},
+        {'op': 'create_course', 'data': {'name': 'Physics'}},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json['committed'] is True
+    assert [item['status'] for item in response.json['results']] == [201, 200, 404, 422, 201]
+    assert client.get(f"/api/entries/{existing['id']}").json['subject'] == 'Renamed'
+    assert client.get('/api/entries').json['total'] == 2
+    assert 'Physics' in [course['name'] for course in client.get('/api/courses').json['courses']]
+
+def test_atomic_batch_rolls_back_everything(client):
+    existing = _create(client)
+    response = client.post('/api/batch', json={'atomic': True, 'operations': [
+        {'op': 'delete_entry', 'id': existing['id']},
+        {'op': 'update_entry', 'id': 999999, 'data': {'subject': 'Nope'}},
+    ]})
+
+    assert response.status_code == 409
+    assert response.json['committed'] is False
+    assert [item['status'] for item in response.json['results']] == [424, 404]
+    assert client.get(f"/api/entries/{existing['id']}").status_code == 200
+
+def test_api_writes_refresh_the_journal_page(client):
+    client.get('/dashboard')  # consume the login flash
+    assert b'Photosynthesis' not in client.get('/journal').data
+
+    _create(client, subject='Photosynthesis')
+
+    assert b'Photosynthesis' in client.get('/journal').data
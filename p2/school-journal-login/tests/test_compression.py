@@ -0,0 +1,54 @@
+import gzip
+import json
+
+import pytest
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+@pytest.fixture
+def client(client):
+    """The logged-in client, its login flash shown, with enough entries for a large page."""
+    client.get('/dashboard')
+    for day in range(1, 21):
+        client.post('/journal', data={'date': f'2024-03-{day:02d}', 'subject': f'Lesson {day}',
+                                      'learnt': 'fractions ' * 50, 'challenges': 'x', 'schedule': 'y'})
+    client.get('/journal')
+    return client
+
+def test_large_page_is_gzipped(client):
+    plain = client.get('/journal')
+    compressed = client.get('/journal', headers=GZIP)
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.vary
+    assert len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+
+def test_small_response_is_not_compressed(client):
+    response = client.get('/journal/search?q=nothingmatches', headers=GZIP)
+
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+def test_compressed_page_keeps_conditional_get(client):
+    first = client.get('/journal', headers=GZIP)
+    etag, weak = first.get_etag()
+    assert weak
+
+    again = client.get('/journal', headers={**GZIP, 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+def test_streamed_export_is_compressed_on_the_fly(client):
+    response = client.get('/journal/export?format=ndjson', headers=GZIP)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    rows = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert len(rows) == 20
+
+def test_gzipped_export_is_not_compressed_twice(client):
+    response = client.get('/journal/export?format=ndjson&gzip=1', headers=GZIP)
+
+    assert 'Content-Encoding' not in response.headers
+    assert len(gzip.decompress(response.data).splitlines()) == 20
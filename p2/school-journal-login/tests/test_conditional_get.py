@@ -0,0 +1,41 @@
+import pytest
+
+@pytest.fixture
+def client(client):
+    """The logged-in client with its login flash message already shown."""
+    client.get('/dashboard')
+    return client
+
+@pytest.mark.parametrize('path', ['/journal', '/courses', '/dashboard'])
+def test_unchanged_page_is_not_modified_without_queries(client, statements, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers['ETag']
+
+    statements.clear()
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+
+    assert again.status_code == 304
+    assert again.data == b''
+    assert [sql for sql in statements if 'user_data_versions' not in sql] == []
+
+def test_writes_change_the_etag(client):
+    etag = client.get('/journal').headers['ETag']
+
+    client.post('/courses', data={'name': 'History'})
+    response = client.get('/journal', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert b'History' in response.data
+
+def test_pending_flash_is_never_served_conditionally(client):
+    etag = client.get('/journal').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Saved!')]
+
+    response = client.get('/journal', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert b'Saved!' in response.data
+    assert 'ETag' not in response.headers
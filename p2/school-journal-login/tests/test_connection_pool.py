@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import config
+import database
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = database.ConnectionPool(tmp_path / 'pool.db', max_size=2, timeout=0.2)
+    yield pool
+    pool.close_all()
+
+def _pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+def test_connections_are_configured(pool):
+    conn = pool.acquire()
+    try:
+        assert _pragma(conn, 'journal_mode') == 'wal'
+        assert _pragma(conn, 'synchronous') == 1  # NORMAL
+        assert _pragma(conn, 'foreign_keys') == 1
+        assert _pragma(conn, 'busy_timeout') == config.DB_BUSY_TIMEOUT_MS
+        assert _pragma(conn, 'cache_size') == -config.DB_CACHE_SIZE_KB
+        assert _pragma(conn, 'temp_store') == 2  # MEMORY
+        assert conn.row_factory is sqlite3.Row
+        assert isinstance(conn.cursor(), database.TimedCursor)
+    finally:
+        conn.close()
+
+def test_released_connections_are_reused(pool):
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+
+    assert second is first
+    stats = pool.stats()
+    assert stats['connections_created'] == 1
+    assert stats['checkouts'] == 2
+    assert (stats['in_use'], stats['idle']) == (1, 0)
+    second.close()
+    assert (pool.stats()['in_use'], pool.stats()['idle']) == (0, 1)
+
+def test_pool_size_is_bounded(pool):
+    held = [pool.acquire(), pool.acquire()]
+
+    started = time.perf_counter()
+    with pytest.raises(Exception, match='Timed out'):
+        pool.acquire()
+
+    assert time.perf_counter() - started >= pool.timeout
+    stats = pool.stats()
+    assert stats['connections_created'] == 2 == stats['max_size']
+    assert stats['timeouts'] == 1
+    for conn in held:
+        conn.close()
+
+def test_waiters_get_the_next_released_connection(pool):
+    held = [pool.acquire(), pool.acquire()]
+    releaser = threading.Timer(0.05, held[0].close)
+    releaser.start()
+
+    conn = pool.acquire()
+
+    releaser.join()
+    assert conn is held[0]
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['wait_seconds'] > 0
+    assert stats['connections_created'] == 2
+    conn.close()
+    held[1].close()
+
+def test_release_rolls_back_an_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute('CREATE TABLE items (name TEXT)')
+    conn.commit()
+    conn.execute("INSERT INTO items VALUES ('uncommitted')")
+    conn.close()
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    conn.close()
+
+def test_close_all_closes_idle_and_detaches_checked_out_connections(pool):
+    idle, checked_out = pool.acquire(), pool.acquire()
+    idle.close()
+
+    pool.close_all()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        idle.execute('SELECT 1')
+    checked_out.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        checked_out.execute('SELECT 1')
+    assert pool.stats()['idle'] == 0
@@ -0,0 +1,42 @@
+import database
+
+def _course_queries(statements):
+    return [sql for sql in statements if 'FROM courses' in sql]
+
+def test_cached_journal_render_runs_no_courses_query(client, statements):
+    client.post('/courses', data={'name': 'Biology', 'code': 'BIO1'})
+    assert client.get('/journal').status_code == 200
+
+    statements.clear()
+    response = client.get('/journal')
+
+    assert response.status_code == 200
+    assert b'Biology' in response.data
+    assert statements, 'the journal page should still query its entries'
+    assert _course_queries(statements) == []
+
+def test_adding_and_deleting_courses_invalidates_cache(client, statements):
+    client.post('/courses', data={'name': 'Chemistry'})
+    client.get('/journal')
+
+    client.post('/courses', data={'name': 'Physics'})
+    statements.clear()
+    response = client.get('/journal')
+    assert b'Physics' in response.data
+    assert len(_course_queries(statements)) == 1
+
+    with client.session_transaction() as session:
+        user_id = session['user_id']
+    physics = [c for c in database.get_courses_by_user(user_id) if c['name'] == 'Physics'][0]
+    client.post(f"/courses/delete/{physics['id']}")
+    assert b'Physics' not in client.get('/journal').data
+
+def test_courses_cache_is_bounded():
+    cache = database.LRUCache(max_size=2)
+    for user_id in (1, 2, 3):
+        cache.set(user_id, [])
+
+    assert cache.get(1) is None
+    assert cache.get(3) == []
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
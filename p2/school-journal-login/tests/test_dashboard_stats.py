@@ -0,0 +1,111 @@
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+TODAY = date(2024, 3, 14)
+
+def expected_summary(user_id, today=TODAY):
+    """The dashboard numbers aggregated straight from journal_entries."""
+    import database
+
+    with database.standalone_db() as conn:
+        rows = conn.execute('SELECT COALESCE(course_id, 0) AS course_id, date FROM journal_entries WHERE user_id = ?',
+                            (user_id,)).fetchall()
+    course_counts = Counter(row['course_id'] for row in rows)
+    days = Counter(row['date'] for row in rows)
+    week_start = (today - timedelta(days=today.weekday())).isoformat()
+    month_start = today.replace(day=1).isoformat()
+
+    day = today if today.isoformat() in days else today - timedelta(days=1)
+    streak = 0
+    while day.isoformat() in days:
+        streak += 1
+        day -= timedelta(days=1)
+
+    return {
+        'course_counts': dict(course_counts),
+        'total_entries': len(rows),
+        'entries_this_week': sum(n for d, n in days.items() if week_start <= d <= today.isoformat()),
+        'entries_this_month': sum(n for d, n in days.items() if month_start <= d <= today.isoformat()),
+        'streak': streak,
+        'last_entry_date': max(days) if days else None,
+    }
+
+def database_summary(user_id):
+    import database
+
+    return database.get_dashboard_summary(user_id, today=TODAY)
+
+def assert_stats_match(user_id):
+    assert database_summary(user_id) == expected_summary(user_id)
+
+@pytest.fixture
+def user_id(client):
+    with client.session_transaction() as session:
+        return session['user_id']
+
+def _entry_ids(user_id):
+    import database
+
+    with database.standalone_db() as conn:
+        return [row['id'] for row in conn.execute('SELECT id FROM journal_entries WHERE user_id = ? ORDER BY id',
+                                                  (user_id,))]
+
+def _course_id(client, user_id, name):
+    import database
+
+    client.post('/courses', data={'name': name})
+    with database.standalone_db() as conn:
+        return conn.execute('SELECT id FROM courses WHERE user_id = ? AND name = ?', (user_id, name)).fetchone()['id']
+
+def _entry(date, course_id=None, subject='Maths'):
+    return {'course_id': '' if course_id is None else course_id, 'date': date, 'subject': subject,
+            'learnt': 'Fractions', 'challenges': 'None', 'schedule': 'Revise'}
+
+def test_dashboard_matches_entries_after_insert_update_and_delete(client, user_id):
+    maths = _course_id(client, user_id, 'Maths')
+    physics = _course_id(client, user_id, 'Physics')
+    assert_stats_match(user_id)
+
+    for day, course_id in [('2024-03-13', maths), ('2024-03-12', maths), ('2024-03-12', physics),
+                           ('2024-03-10', None), ('2024-02-28', physics)]:
+        client.post('/journal', data=_entry(day, course_id))
+    assert_stats_match(user_id)
+    assert database_summary(user_id)['streak'] == 2
+
+    ids = _entry_ids(user_id)
+    # Move an entry to another course and day, detach one from its course
+    client.post(f'/journal/{ids[1]}/edit', data=_entry('2024-03-11', physics))
+    client.post(f'/journal/{ids[0]}/edit', data=_entry('2024-03-13', None))
+    assert_stats_match(user_id)
+    assert database_summary(user_id)['streak'] == 4
+
+    client.post(f'/journal/{ids[2]}/delete')
+    client.post(f'/journal/{ids[4]}/delete')
+    assert_stats_match(user_id)
+
+    # Deleting a course detaches its entries
+    client.post(f'/courses/delete/{physics}')
+    assert_stats_match(user_id)
+
+def test_stats_rebuild_matches_triggers(client, user_id):
+    import database
+
+    for day in ('2024-03-14', '2024-03-13', '2024-03-01'):
+        client.post('/journal', data=_entry(day))
+    before = database_summary(user_id)
+
+    with database.standalone_db() as conn:
+        database.rebuild_dashboard_stats(conn)
+        conn.commit()
+
+    assert database_summary(user_id) == before == expected_summary(user_id)
+
+def test_upgrade_backfills_stats(app, baseline_db):
+    import database
+
+    database.init_db()
+
+    assert_stats_match(1)
+    assert database_summary(1)['total_entries'] == 2
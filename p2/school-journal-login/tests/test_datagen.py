@@ -0,0 +1,81 @@
+import sqlite3
+from datetime import date
+
+import pytest
+from click.testing import CliRunner
+
+import datagen
+
+def _triggers(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'journal_entries'")}
+    finally:
+        conn.close()
+
+def _count(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+@pytest.fixture
+def generator(app):
+    return datagen.Generator(users=3, courses=2, days=10, seed=7, end=date(2024, 3, 14))
+
+def test_generate_restores_triggers_and_rebuilds(tmp_path, generator):
+    path = tmp_path / 'generated.db'
+
+    stats = datagen.generate(path, generator, chunk_size=4)
+
+    assert _count(path, 'SELECT COUNT(*) FROM journal_entries') == stats['entries'] > 0
+    assert _count(path, 'SELECT SUM(entry_count) FROM journal_daily_stats') == stats['entries']
+    assert _count(path, 'SELECT COUNT(*) FROM journal_entries_fts') == stats['entries']
+    assert {'journal_entries_fts_insert', 'journal_stats_insert', 'journal_version_insert'} <= _triggers(path)
+
+def test_failed_load_still_restores_triggers(tmp_path, generator, monkeypatch):
+    path = tmp_path / 'generated.db'
+    datagen.generate(path, generator)
+    triggers = _triggers(path)
+
+    rows = generator.entry_rows
+
+    def failing_rows(*args):
+        for number, row in enumerate(rows(*args)):
+            if number == 5:
+                raise RuntimeError('disk on fire')
+            yield row
+
+    monkeypatch.setattr(generator, 'entry_rows', failing_rows)
+    with pytest.raises(RuntimeError):
+        datagen.generate(path, generator, chunk_size=2)
+
+    assert _triggers(path) == triggers
+    # The chunks committed before the failure are searchable and counted
+    entries = _count(path, 'SELECT COUNT(*) FROM journal_entries')
+    assert _count(path, 'SELECT SUM(entry_count) FROM journal_daily_stats') == entries
+    assert _count(path, 'SELECT COUNT(*) FROM journal_entries_fts') == entries
+
+def test_cli_refuses_a_populated_database_without_append(tmp_path, generator):
+    import manage
+
+    path = tmp_path / 'generated.db'
+    args = ['generate', '--db', str(path), '--users', '2', '--courses', '1', '--days', '5']
+    runner = CliRunner()
+
+    assert runner.invoke(manage.cli, args).exit_code == 0
+    refused = runner.invoke(manage.cli, args)
+    assert refused.exit_code != 0
+    assert '--append' in refused.output
+    assert runner.invoke(manage.cli, args + ['--append']).exit_code == 0
+    assert _count(path, 'SELECT COUNT(*) FROM users') == 4
+
+def test_cli_requires_a_database_path(app):
+    import manage
+
+    result = CliRunner().invoke(manage.cli, ['generate', '--users', '1'])
+
+    assert result.exit_code != 0
+    assert '--db' in result.output
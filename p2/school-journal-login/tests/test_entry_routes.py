@@ -0,0 +1,102 @@
+import pytest
+
+import database
+
+ENTRY = {'date': '2024-09-02', 'subject': 'Fractions', 'learnt': 'Adding fractions',
+         'challenges': 'Common denominators', 'schedule': 'Worksheet'}
+
+_other_count = 0
+
+@pytest.fixture
+def other(app):
+    """A second logged-in user."""
+    global _other_count
+    _other_count += 1
+    username = f'intruder{_other_count}'
+    other = app.test_client()
+    other.post('/register', data={'first_name': 'Other', 'last_name': 'Student', 'username': username,
+                                  'email': f'{username}@example.com', 'password': 'Passw0rd!',
+                                  'confirm_password': 'Passw0rd!'})
+    other.post('/login', data={'username': username, 'password': 'Passw0rd!'})
+    other.get('/dashboard')  # consume the login flash
+    return other
+
+def _course(client, name):
+    return client.post('/api/courses', json={'name': name}).json['id']
+
+def _entries(client):
+    return {entry['id']: entry for entry in client.get('/api/entries').json['entries']}
+
+def _create(client, **fields):
+    before = set(_entries(client))
+    client.post('/journal', data={**ENTRY, **fields})
+    (entry_id,) = set(_entries(client)) - before
+    return entry_id
+
+def _flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+def _row(entry_id):
+    with database.standalone_db() as conn:
+        return conn.execute('SELECT * FROM journal_entries WHERE id = ?', (entry_id,)).fetchone()
+
+def test_owner_can_view_edit_and_delete(client):
+    course_id = _course(client, 'Maths')
+    entry_id = _create(client, course_id=course_id)
+
+    page = client.get(f'/journal/{entry_id}')
+    assert page.status_code == 200
+    assert b'Fractions' in page.data and b'Maths' in page.data
+    assert client.get(f'/journal/{entry_id}/edit').status_code == 200
+
+    client.post(f'/journal/{entry_id}/edit', data={**ENTRY, 'subject': 'Decimals', 'course_id': ''})
+    assert _flashes(client)[-1] == 'Entry updated successfully'
+    assert _row(entry_id)['subject'] == 'Decimals'
+    assert _row(entry_id)['course_id'] is None
+
+    client.post(f'/journal/{entry_id}/delete')
+    assert _flashes(client)[-1] == 'Journal entry deleted successfully'
+    assert _row(entry_id) is None
+
+def test_other_users_cannot_view_edit_or_delete(client, other):
+    entry_id = _create(client)
+
+    response = other.get(f'/journal/{entry_id}')
+    assert response.status_code == 302
+    assert _flashes(other) == ['Entry not found']
+    other.get(f'/journal/{entry_id}/edit')
+    assert _flashes(other) == ['Entry not found']
+
+    other.post(f'/journal/{entry_id}/edit', data={**ENTRY, 'subject': 'Hijacked'})
+    assert _flashes(other) == ['Entry not found']
+    other.post(f'/journal/{entry_id}/delete')
+    assert _flashes(other) == ['Entry not found']
+
+    assert _row(entry_id)['subject'] == ENTRY['subject']
+
+def test_entries_cannot_use_another_users_course(client, other):
+    foreign_course = _course(other, 'Secret course')
+    entry_id = _create(client)
+    _flashes(client)
+
+    client.post('/journal', data={**ENTRY, 'subject': 'Borrowed', 'course_id': foreign_course})
+    assert _flashes(client) == [f'Course {foreign_course} not found']
+    assert 'Borrowed' not in {entry['subject'] for entry in _entries(client).values()}
+
+    client.post(f'/journal/{entry_id}/edit', data={**ENTRY, 'course_id': foreign_course})
+    assert _flashes(client) == [f'Course {foreign_course} not found']
+    assert _row(entry_id)['course_id'] is None
+    assert b'Secret course' not in client.get(f'/journal/{entry_id}').data
+
+def test_form_dates_are_validated(client):
+    entry_id = _create(client)
+    _flashes(client)
+
+    client.post('/journal', data={**ENTRY, 'date': 'yesterday'})
+    assert _flashes(client) == ['date must be a YYYY-MM-DD date']
+    assert list(_entries(client)) == [entry_id]
+
+    client.post(f'/journal/{entry_id}/edit', data={**ENTRY, 'date': '2024-02-30'})
+    assert _flashes(client) == ['date must be a YYYY-MM-DD date']
+    assert _row(entry_id)['date'] == ENTRY['date']
@@ -0,0 +1,101 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import database
+import exporter
+
+@pytest.fixture
+def user_id(client):
+    with client.session_transaction() as session:
+        user_id = session['user_id']
+    with database.standalone_db() as conn:
+        course_id = conn.execute('INSERT INTO courses (user_id, name) VALUES (?, ?)', (user_id, 'Physics')).lastrowid
+        conn.executemany('''INSERT INTO journal_entries (user_id, course_id, date, subject, learnt, challenges, schedule)
+                            VALUES (?, ?, ?, ?, 'Things', 'None', 'Revise')''', [
+            (user_id, course_id if day % 2 else None, f'2024-05-{day:02d}', f'Entry {day} ✓')
+            for day in range(7, 0, -1)])
+        conn.commit()
+    return user_id
+
+def _in_use():
+    return database.get_pool().stats()['in_use']
+
+def test_chunks_are_read_oldest_first(user_id):
+    with database.standalone_db() as conn:
+        chunks = list(exporter.iter_entry_chunks(conn, user_id, chunk_size=3))
+
+    assert [len(rows) for rows in chunks] == [3, 3, 1]
+    assert [row['date'] for rows in chunks for row in rows] == [f'2024-05-{day:02d}' for day in range(1, 8)]
+
+def test_filters_narrow_the_export(user_id):
+    with database.standalone_db() as conn:
+        course_id = conn.execute('SELECT id FROM courses WHERE user_id = ?', (user_id,)).fetchone()[0]
+        rows = [row for rows in exporter.iter_entry_chunks(conn, user_id, course_id=course_id,
+                                                           date_from='2024-05-02', date_to='2024-05-06')
+                for row in rows]
+
+    assert [row['date'] for row in rows] == ['2024-05-03', '2024-05-05']
+    assert {row['course'] for row in rows} == {'Physics'}
+
+def test_csv_export_yields_one_piece_per_chunk(user_id):
+    pieces = list(exporter.export_journal(user_id, 'csv', chunk_size=3))
+
+    assert len(pieces) == 3
+    rows = list(csv.reader(io.StringIO(b''.join(pieces).decode('utf-8'))))
+    assert rows[0] == list(exporter.EXPORT_FIELDS)
+    assert [row[3] for row in rows[1:]] == [f'Entry {day} ✓' for day in range(1, 8)]
+
+def test_ndjson_export(user_id):
+    lines = b''.join(exporter.export_journal(user_id, 'ndjson')).decode('utf-8').splitlines()
+
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 7
+    assert set(records[0]) == set(exporter.EXPORT_FIELDS)
+    assert records[0]['subject'] == 'Entry 1 ✓' and records[0]['course'] == 'Physics'
+    assert '✓' in lines[0]
+
+def test_gzip_export_matches_the_plain_one(user_id):
+    plain = b''.join(exporter.export_journal(user_id, 'csv', chunk_size=2))
+    compressed = b''.join(exporter.export_journal(user_id, 'csv', compress=True, chunk_size=2))
+
+    assert gzip.decompress(compressed) == plain
+
+def test_generator_reads_lazily_and_returns_its_connection(user_id, monkeypatch):
+    fetched = []
+    iter_entry_chunks = exporter.iter_entry_chunks
+
+    def counted(*args, **kwargs):
+        for rows in iter_entry_chunks(*args, **kwargs):
+            fetched.append(len(rows))
+            yield rows
+
+    monkeypatch.setattr(exporter, 'iter_entry_chunks', counted)
+    in_use = _in_use()
+    stream = exporter.export_journal(user_id, 'ndjson', chunk_size=2)
+    assert _in_use() == in_use
+
+    first = next(stream)
+    assert fetched == [2]
+    assert len(first.splitlines()) == 2
+    assert _in_use() == in_use + 1
+
+    stream.close()
+    assert _in_use() == in_use
+
+def test_unsupported_format_is_rejected():
+    with pytest.raises(ValueError):
+        exporter.export_journal(1, 'xml')
+
+def test_export_route_streams_a_download(client, user_id):
+    response = client.get('/journal/export?format=ndjson&gzip=1&date_from=2024-05-06')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="journal.ndjson.gz"'
+    assert len(gzip.decompress(response.data).splitlines()) == 2
+
+    assert client.get('/journal/export?format=xml').status_code == 302
@@ -0,0 +1,78 @@
+import pytest
+
+import fragment_cache
+
+@pytest.fixture
+def client(client):
+    """The logged-in client with its login flash message already shown."""
+    client.get('/dashboard')
+    return client
+
+def _journal_queries(statements):
+    return [sql for sql in statements if 'journal_entries' in sql or 'FROM courses' in sql]
+
+def test_repeat_view_skips_queries(client, statements):
+    client.post('/courses', data={'name': 'Algebra'})
+    first = client.get('/journal')
+    assert first.status_code == 200
+
+    statements.clear()
+    again = client.get('/journal')
+
+    assert again.data == first.data
+    assert _journal_queries(statements) == []
+
+def test_entry_writes_show_up(client):
+    client.post('/courses', data={'name': 'Biology'})
+    assert b'Cells' not in client.get('/journal').data
+
+    client.post('/journal', data={'date': '2024-05-01', 'subject': 'Cells', 'learnt': 'a',
+                                  'challenges': 'b', 'schedule': 'c'})
+    client.get('/journal')  # consume the flash message
+    response = client.get('/journal')
+
+    assert b'Cells' in response.data
+    assert b'1 entries' in response.data
+
+def test_memory_backend_evicts_least_recently_used_bytes():
+    backend = fragment_cache.MemoryBackend(max_bytes=10)
+    backend.set(1, 'a', 'aaaa')
+    backend.set(1, 'b', 'bbbb')
+    backend.get('a')
+    backend.set(2, 'c', 'cccc')
+
+    assert backend.get('b') is None
+    assert backend.get('a') == 'aaaa'
+    assert backend.stats()['bytes'] == 8
+
+    backend.invalidate_user(1)
+    assert backend.get('a') is None
+    assert backend.get('c') == 'cccc'
+    assert backend.stats()['bytes'] == 4
+
+def test_sqlite_backend_is_shared_and_pruned(tmp_path):
+    path = str(tmp_path / 'fragments.db')
+    writer = fragment_cache.SQLiteBackend(path, max_bytes=10, prune_interval=0)
+    reader = fragment_cache.SQLiteBackend(path, max_bytes=10, prune_interval=0)
+
+    writer.set(1, 'a', 'aaaa')
+    assert reader.get('a') == 'aaaa'
+
+    writer.set(1, 'b', 'bbbb')
+    writer.set(2, 'c', 'cccc')
+    assert reader.get('a') is None
+    assert reader.stats()['bytes'] == 8
+
+    reader.invalidate_user(1)
+    assert writer.get('b') is None
+    assert writer.get('c') == 'cccc'
+
+def test_disabled_cache_always_renders():
+    previous = fragment_cache.set_backend(None)
+    try:
+        calls = []
+        for _ in range(2):
+            fragment_cache.cached('test', 1, 1, (), lambda: calls.append(1) or '<b>x</b>')
+        assert len(calls) == 2
+    finally:
+        fragment_cache.set_backend(previous)
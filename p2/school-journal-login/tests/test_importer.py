@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+
+import database
+import importer
+
+def _entry(day, subject='Maths', **extra):
+    return {'date': f'2024-04-{day:02d}', 'subject': subject, 'learnt': 'Things',
+            'challenges': 'None', 'schedule': 'Revise', **extra}
+
+def _user(username):
+    return {'first_name': 'Imported', 'last_name': 'Student', 'username': username,
+            'email': f'{username}@example.com', 'password': 'Passw0rd!'}
+
+def _numbered(rows):
+    return list(enumerate(rows, 2))
+
+@pytest.fixture
+def user_id(client):
+    with client.session_transaction() as session:
+        return session['user_id']
+
+def _subjects(user_id):
+    with database.standalone_db() as conn:
+        return [row[0] for row in conn.execute(
+            'SELECT subject FROM journal_entries WHERE user_id = ? ORDER BY id', (user_id,))]
+
+def _usernames(prefix):
+    with database.standalone_db() as conn:
+        return {row[0] for row in conn.execute(
+            'SELECT username FROM users WHERE username LIKE ?', (prefix + '%',))}
+
+def test_rows_are_committed_in_chunks(user_id):
+    progress = []
+    rows = [_entry(day, f'Subject {day}') for day in range(1, 6)]
+
+    result = importer.import_entries(_numbered(rows), user_id=user_id, batch_size=2, chunk_size=4,
+                                     progress=progress.append)
+
+    assert result['inserted'] == 5 and result['rejected'] == 0
+    assert result['chunks'] == 2
+    assert [stats['inserted'] for stats in progress] == [4, 5]
+    assert _subjects(user_id) == [f'Subject {day}' for day in range(1, 6)]
+
+def test_constraint_violation_rejects_only_the_offending_rows(client):
+    rejects = io.StringIO()
+    importer.import_users(_numbered([_user('bulk-a')]))
+    rows = [_user('bulk-b'), _user('bulk-a'), _user('bulk-c'), _user('bulk-c')]
+
+    result = importer.import_users(_numbered(rows), batch_size=4, rejects=rejects)
+
+    assert result['inserted'] == 2 and result['rejected'] == 2
+    assert [sample['line'] for sample in result['reject_samples']] == [3, 5]
+    assert all('UNIQUE' in sample['reason'] for sample in result['reject_samples'])
+    assert _usernames('bulk-') == {'bulk-a', 'bulk-b', 'bulk-c'}
+    lines = [json.loads(line) for line in rejects.getvalue().splitlines()]
+    assert [line['row']['username'] for line in lines] == ['bulk-a', 'bulk-c']
+    assert 'password' in lines[0]['row']
+
+def test_invalid_rows_are_rejected_with_their_line_numbers(user_id):
+    text = '\n'.join([
+        json.dumps(_entry(1)),
+        '{not json',
+        json.dumps(_entry(2, subject='')),
+        json.dumps({**_entry(3), 'date': '2024-02-30'}),
+        json.dumps(_entry(4, course_id=999999)),
+        '[1, 2]',
+        json.dumps(_entry(5)),
+    ])
+
+    result = importer.import_entries(importer.read_rows(io.StringIO(text), 'ndjson'), user_id=user_id)
+
+    assert result['read'] == 7 and result['inserted'] == 2
+    assert [(sample['line'], sample['reason'].split(':')[0]) for sample in result['reject_samples']] == [
+        (2, 'Invalid JSON'), (3, 'Missing subject'), (4, 'Invalid date'),
+        (5, 'Unknown course_id'), (6, 'Expected a JSON object')]
+
+def test_courses_named_by_rows_are_created_once(user_id):
+    rows = [_entry(day, course='Chemistry') for day in range(1, 4)] + [_entry(4, course='chemistry')]
+
+    importer.import_entries(_numbered(rows), user_id=user_id, batch_size=2)
+
+    with database.standalone_db() as conn:
+        courses = conn.execute('SELECT id FROM courses WHERE user_id = ?', (user_id,)).fetchall()
+        linked = conn.execute('SELECT DISTINCT course_id FROM journal_entries WHERE user_id = ?',
+                              (user_id,)).fetchall()
+    assert len(courses) == 1
+    assert [tuple(row) for row in linked] == [tuple(courses[0])]
+
+def test_failure_keeps_committed_chunks_and_rolls_back_the_rest(user_id):
+    def rows():
+        for day in range(1, 6):
+            yield day, _entry(day, f'Subject {day}')
+        raise OSError('disk went away')
+
+    with pytest.raises(OSError):
+        importer.import_entries(rows(), user_id=user_id, batch_size=2, chunk_size=2)
+
+    assert _subjects(user_id) == [f'Subject {day}' for day in range(1, 5)]
+
+def test_csv_rows_name_their_owner(client):
+    importer.import_users(_numbered([_user('csv-owner')]))
+    text = 'username,date,subject,learnt,challenges,schedule\n' \
+           'csv-owner,2024-04-01,Art,Colour,None,Revise\n' \
+           'nobody,2024-04-02,Art,Colour,None,Revise\n'
+
+    result = importer.import_entries(importer.read_rows(io.StringIO(text), 'csv'))
+
+    assert result['inserted'] == 1
+    assert result['reject_samples'] == [{'line': 3, 'reason': 'Unknown user: nobody'}]
@@ -0,0 +1,59 @@
+import logging
+import logging.handlers
+
+import pytest
+
+import config
+import logging_config
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """Run the logging pipeline against a temporary LOG_FILE, restoring it afterwards."""
+    path = tmp_path / 'app.log'
+    monkeypatch.setattr(config, 'LOG_FILE', str(path))
+    logging_config.stop_logging()
+    yield path
+    logging_config.stop_logging()
+    monkeypatch.setattr(logging_config, '_shared_files', False)
+    monkeypatch.undo()
+    logging_config.configure_logging()
+
+def _file_handlers():
+    return [handler for handler in logging_config._listener.handlers
+            if isinstance(handler, logging.FileHandler)]
+
+def test_single_process_rotates_by_size(log_file):
+    logging_config.configure_logging()
+
+    (handler,) = _file_handlers()
+    assert isinstance(handler, logging.handlers.RotatingFileHandler)
+
+def test_shared_log_files_are_never_rotated_in_process(log_file, monkeypatch):
+    monkeypatch.setattr(config, 'LOG_ROTATE_WHEN', 'midnight')
+    logging_config.configure_logging()
+
+    logging_config.share_log_files()
+
+    (handler,) = _file_handlers()
+    assert type(handler) is logging.handlers.WatchedFileHandler
+    # A forked worker keeps the setting
+    logging_config.restart_logging_after_fork()
+    (handler,) = _file_handlers()
+    assert type(handler) is logging.handlers.WatchedFileHandler
+
+def test_shared_log_file_is_reopened_after_external_rotation(log_file, monkeypatch):
+    monkeypatch.setattr(logging_config, '_shared_files', True)
+    handler = logging_config.file_handler(str(log_file), config.LOG_MAX_BYTES, config.LOG_BACKUP_COUNT)
+
+    def emit(message):
+        handler.emit(logging.LogRecord('tests', logging.WARNING, __file__, 0, message, None, None))
+
+    try:
+        emit('before rotation')
+        log_file.rename(log_file.with_name('app.log.1'))
+        emit('after rotation')
+    finally:
+        handler.close()
+
+    assert log_file.with_name('app.log.1').read_text() == 'before rotation\n'
+    assert log_file.read_text() == 'after rotation\n'
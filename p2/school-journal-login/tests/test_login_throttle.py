@@ -0,0 +1,123 @@
+import pytest
+
+import config
+import login_throttle
+import ratelimit_storage
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_700_000_000.0)
+    monkeypatch.setattr(ratelimit_storage, 'time', clock)
+    monkeypatch.setattr(login_throttle, 'time', clock)
+    return clock
+
+@pytest.fixture
+def storage(app, tmp_path, clock, monkeypatch):
+    """A fresh throttle storage with the default policy: 3 free failures, lockout at 10."""
+    storage = ratelimit_storage.SQLiteStorage(f'sqlite:///{tmp_path}/throttle.db')
+    monkeypatch.setattr(login_throttle, '_storage', storage)
+    monkeypatch.setattr(config, 'LOGIN_BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(config, 'LOGIN_BACKOFF_MAX', 60.0)
+    monkeypatch.setattr(config, 'LOGIN_LOCKOUT_SECONDS', 900)
+    monkeypatch.setitem(login_throttle.USER_POLICY, 'free', 3)
+    monkeypatch.setitem(login_throttle.USER_POLICY, 'lockout', 10)
+    monkeypatch.setitem(login_throttle.IP_POLICY, 'free', 5)
+    monkeypatch.setitem(login_throttle.IP_POLICY, 'lockout', 8)
+    return storage
+
+def _fail(times, username='alice', ip='10.0.0.1'):
+    for _ in range(times):
+        login_throttle.record_failure(username, ip)
+
+def test_backoff_doubles_after_the_free_attempts_then_locks_out(storage):
+    policy = login_throttle.USER_POLICY
+
+    delays = [login_throttle.backoff_seconds(failures, policy) for failures in range(1, 12)]
+
+    assert delays == [0, 0, 0, 1, 2, 4, 8, 16, 32, 900, 900]
+
+def test_backoff_is_capped(storage, monkeypatch):
+    monkeypatch.setitem(login_throttle.USER_POLICY, 'lockout', 100)
+
+    assert login_throttle.backoff_seconds(20, login_throttle.USER_POLICY) == config.LOGIN_BACKOFF_MAX
+
+def test_failures_block_the_username_for_growing_delays(storage, clock):
+    _fail(3)
+    assert login_throttle.check('alice', '10.0.0.1') == 0
+
+    _fail(1)
+    assert login_throttle.check('alice', '10.0.0.1') == 1
+    clock.now += 1
+    assert login_throttle.check('alice', '10.0.0.1') == 0
+
+    _fail(1)
+    assert login_throttle.check('alice', '10.0.0.1') == 2
+
+def test_lockout_after_too_many_failures(storage, clock):
+    _fail(10)
+
+    assert login_throttle.check('alice', '10.0.0.1') == 900
+    clock.now += 899
+    assert login_throttle.check('alice', '10.0.0.1') == 1
+    clock.now += 1
+    assert login_throttle.check('alice', '10.0.0.1') == 0
+
+def test_username_is_blocked_from_any_ip_and_case(storage):
+    _fail(4, username='Alice')
+
+    assert login_throttle.check('alice ', '192.168.1.9') == 1
+    assert login_throttle.check('bob', '192.168.1.9') == 0
+
+def test_ip_is_blocked_across_usernames(storage):
+    for number in range(6):
+        login_throttle.record_failure(f'user{number}', '10.0.0.1')
+
+    # No single username is over its allowance, but the address is
+    assert login_throttle.check('someone-else', '10.0.0.1') == 1
+    assert login_throttle.check('someone-else', '10.0.0.2') == 0
+
+def test_success_resets_the_username_but_not_the_ip(storage):
+    _fail(5)
+
+    login_throttle.record_success('alice')
+
+    assert login_throttle.check('alice', None) == 0
+    _fail(1, ip='10.0.0.1')
+    # The IP's five earlier failures still count towards its own allowance
+    assert login_throttle.check(None, '10.0.0.1') == 1
+
+def test_failing_storage_fails_open(storage, monkeypatch):
+    _fail(10)
+
+    def broken(*args, **kwargs):
+        raise ratelimit_storage.sqlite3.OperationalError('database is locked')
+
+    for method in ('get', 'get_expiry', 'incr', 'clear'):
+        monkeypatch.setattr(storage, method, broken)
+
+    assert login_throttle.check('alice', '10.0.0.1') == 0
+    login_throttle.record_failure('alice', '10.0.0.1')
+    login_throttle.record_success('alice')
+
+def test_throttled_login_is_rejected_before_hashing(app, storage, monkeypatch):
+    import urls
+
+    client = app.test_client()
+    for _ in range(4):
+        client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+
+    def no_hashing(*args):
+        raise AssertionError('password checked while throttled')
+
+    monkeypatch.setattr(urls, 'handle_login', no_hashing)
+    response = client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
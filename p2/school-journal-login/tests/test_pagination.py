@@ -0,0 +1,83 @@
+import pytest
+
+import database
+
+# Two entries share each of the first dates, so ties are broken by id
+DATES = ['2024-03-01', '2024-03-01', '2024-03-02', '2024-03-02', '2024-03-03', '2024-03-05', '2024-03-04']
+
+@pytest.fixture
+def user_id(client):
+    for number, date in enumerate(DATES):
+        client.post('/journal', data={'date': date, 'subject': f'Entry {number}', 'learnt': 'Things',
+                                      'challenges': 'None', 'schedule': 'Revise'})
+    with client.session_transaction() as session:
+        return session['user_id']
+
+def _ids(page):
+    return [entry['id'] for entry in page['entries']]
+
+def _newest_first(user_id):
+    with database.standalone_db() as conn:
+        return [row['id'] for row in conn.execute(
+            'SELECT id FROM journal_entries WHERE user_id = ? ORDER BY date DESC, id DESC', (user_id,))]
+
+def test_pages_walk_the_journal_newest_first(user_id):
+    pages = [database.get_journal_page(user_id, limit=3, with_total=True)]
+    while pages[-1]['next_cursor']:
+        pages.append(database.get_journal_page(user_id, limit=3, after=pages[-1]['next_cursor']))
+
+    assert [len(page['entries']) for page in pages] == [3, 3, 1]
+    assert [entry_id for page in pages for entry_id in _ids(page)] == _newest_first(user_id)
+    assert pages[0]['total'] == len(DATES)
+    assert pages[0]['prev_cursor'] is None
+    assert all(page['prev_cursor'] for page in pages[1:])
+
+def test_before_cursor_walks_back_to_the_same_pages(user_id):
+    first = database.get_journal_page(user_id, limit=3)
+    second = database.get_journal_page(user_id, limit=3, after=first['next_cursor'])
+    third = database.get_journal_page(user_id, limit=3, after=second['next_cursor'])
+
+    back = database.get_journal_page(user_id, limit=3, before=third['prev_cursor'])
+    assert _ids(back) == _ids(second)
+    assert back['next_cursor'] == second['next_cursor']
+    start = database.get_journal_page(user_id, limit=3, before=back['prev_cursor'])
+    assert _ids(start) == _ids(first)
+    assert start['prev_cursor'] is None
+
+def test_pages_do_not_shift_when_newer_entries_are_added(client, user_id):
+    first = database.get_journal_page(user_id, limit=3)
+    expected = _ids(database.get_journal_page(user_id, limit=3, after=first['next_cursor']))
+
+    client.post('/journal', data={'date': '2024-03-09', 'subject': 'Newest', 'learnt': 'Things',
+                                  'challenges': 'None', 'schedule': 'Revise'})
+
+    assert _ids(database.get_journal_page(user_id, limit=3, after=first['next_cursor'])) == expected
+
+def test_cursor_round_trip_and_malformed_cursors():
+    cursor = database.encode_cursor({'date': '2024-03-01', 'id': 42})
+
+    assert '=' not in cursor
+    assert database.decode_cursor(cursor) == ('2024-03-01', 42)
+    assert database.decode_cursor('not a cursor!') is None
+    assert database.decode_cursor(database.encode_cursor({'date': '2024-03-01', 'id': 'x'})) is None
+
+def test_malformed_cursor_falls_back_to_the_first_page(user_id):
+    assert _ids(database.get_journal_page(user_id, limit=3, after='%%%')) == _newest_first(user_id)[:3]
+
+def test_limit_is_clamped(user_id, monkeypatch):
+    monkeypatch.setattr(database.config, 'JOURNAL_MAX_PAGE_SIZE', 4)
+
+    assert database.get_journal_page(user_id, limit=0)['limit'] == 1
+    assert len(database.get_journal_page(user_id, limit=50)['entries']) == 4
+
+def test_journal_page_links_to_older_entries(client, user_id):
+    page = database.get_journal_page(user_id, limit=3)
+
+    response = client.get('/journal?limit=3')
+    assert response.status_code == 200
+    assert f'after={page["next_cursor"]}'.encode() in response.data
+
+    older = client.get(f'/journal?limit=3&after={page["next_cursor"]}')
+    assert older.status_code == 200
+    assert b'Entry 2' not in response.data
+    assert b'Entry 2' in older.data
@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+import security
+from security import HashingBusyError
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-worker hashing pool (threads stand in for processes) with a gate to hold work."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setattr(security, '_get_executor', lambda: executor)
+    gate = threading.Event()
+    yield gate
+    gate.set()
+    executor.shutdown(wait=True)
+
+def _limit(monkeypatch, max_pending, timeout=5.0):
+    monkeypatch.setattr(config, 'PASSWORD_HASH_MAX_PENDING', max_pending)
+    monkeypatch.setattr(config, 'PASSWORD_HASH_TIMEOUT', timeout)
+    monkeypatch.setattr(security, '_slots', threading.BoundedSemaphore(max_pending))
+
+def _held(gate):
+    gate.wait(5)
+    return 'held', 0.0
+
+def _quick():
+    return 'quick', 0.0
+
+def _wait_for_free_slots(count):
+    for _ in range(count):
+        assert security._slots.acquire(timeout=5)
+    for _ in range(count):
+        security._slots.release()
+
+def test_full_queue_rejects_without_waiting(pool, monkeypatch):
+    _limit(monkeypatch, 2)
+    callers = [threading.Thread(target=security._run, args=(_held, pool)) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    # Both slots are taken: one hash running, one queued behind it
+    for _ in range(100):
+        if security._slots._value == 0:
+            break
+        threading.Event().wait(0.01)
+    rejected = security.hashing_stats()['rejected']
+
+    with pytest.raises(HashingBusyError):
+        security._run(_quick)
+    assert security.hashing_stats()['rejected'] == rejected + 1
+
+    pool.set()
+    for caller in callers:
+        caller.join(5)
+    _wait_for_free_slots(2)
+    assert security._run(_quick) == 'quick'
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes(pool, monkeypatch):
+    _limit(monkeypatch, 1, timeout=0.05)
+
+    with pytest.raises(HashingBusyError, match='Timed out'):
+        security._run(_held, pool)
+    # The timed-out hash is still running, so the queue is still full
+    with pytest.raises(HashingBusyError, match='queue is full'):
+        security._run(_quick)
+
+    pool.set()
+    _wait_for_free_slots(1)
+    assert security._run(_quick) == 'quick'
+
+def test_cancelled_queued_hash_frees_its_slot(pool, monkeypatch):
+    _limit(monkeypatch, 2, timeout=0.05)
+    # Occupy the only worker
+    security._get_executor().submit(_held, pool)
+
+    # Queued behind it: times out and is cancelled before it ever starts
+    with pytest.raises(HashingBusyError, match='Timed out'):
+        security._run(_quick)
+    assert security._slots._value == 2
+
+def test_workers_are_not_forked_from_the_server_process(monkeypatch):
+    monkeypatch.setattr(config, 'PASSWORD_HASH_WORKERS', 1)
+    security.shutdown_hashing_pool()
+    try:
+        pwhash = security.hash_password('Passw0rd!')
+        assert security._get_executor()._mp_context.get_start_method() in ('forkserver', 'spawn')
+        assert security.verify_password(pwhash, 'Passw0rd!')
+    finally:
+        security.shutdown_hashing_pool()
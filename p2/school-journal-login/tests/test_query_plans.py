@@ -0,0 +1,82 @@
+import ast
+import re
+import sqlite3
+
+import pytest
+
+from conftest import APP_DIR
+
+# Every SQL literal in these modules is planned against the real schema.
+# A plan that scans a whole table or builds a temporary B-tree fails the
+# test unless the statement is allowlisted below with the reason why.
+MODULES = ('database.py', 'app.py', 'urls.py', 'business.py', 'exporter.py')
+
+SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s')
+FULL_SCAN = re.compile(r'\bSCAN (?!.*VIRTUAL TABLE)')
+TEMP_BTREE = 'USE TEMP B-TREE'
+
+# Substring of the normalised SQL -> why its scan or sort is acceptable
+ALLOWLIST = {
+    'ORDER BY rank': 'bm25 rank is computed per match, so ranked search results must be sorted',
+    'FROM sqlite_master': 'schema introspection in init_db',
+    'DELETE FROM journal_course_stats': 'maintenance rebuild of the dashboard tables',
+    'DELETE FROM journal_daily_stats': 'maintenance rebuild of the dashboard tables',
+    'GROUP BY user_id, COALESCE(course_id, 0)': 'maintenance rebuild of the dashboard tables',
+    'GROUP BY user_id, date': 'maintenance rebuild of the dashboard tables',
+    'INSERT OR IGNORE INTO user_data_versions': 'one-off backfill when init_db creates the table',
+}
+
+def _normalise(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+def _sql_literals():
+    for module in MODULES:
+        tree = ast.parse((APP_DIR / module).read_text(), filename=module)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START.match(node.value):
+                yield pytest.param(node.value, id=f'{module}:{node.lineno}')
+
+def _parameters(sql):
+    names = re.findall(r':(\w+)', sql)
+    if names:
+        return dict.fromkeys(names)
+    return (None,) * sql.count('?')
+
+@pytest.fixture(scope='module')
+def schema_db():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript((APP_DIR / 'schema.sql').read_text())
+    yield conn
+    conn.close()
+
+def test_modules_contain_queries():
+    assert len(list(_sql_literals())) > 20
+
+@pytest.mark.parametrize('sql', list(_sql_literals()))
+def test_query_plan_uses_indexes(schema_db, sql):
+    text = _normalise(sql)
+    if any(marker in text for marker in ALLOWLIST):
+        pytest.skip('allowlisted')
+    plan = [row[3] for row in schema_db.execute('EXPLAIN QUERY PLAN ' + sql, _parameters(sql))]
+    problems = [detail for detail in plan if FULL_SCAN.search(detail) or TEMP_BTREE in detail]
+    assert not problems, f'{text}\n' + '\n'.join(plan)
+
+def test_init_db_replaces_the_baseline_indexes(baseline_db):
+    import database
+
+    database.init_db()
+
+    conn = sqlite3.connect(baseline_db)
+    try:
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+        plan = [row[3] for row in conn.execute(
+            'EXPLAIN QUERY PLAN ' + database.JOURNAL_PAGE_FIRST_SQL, (1, 20))]
+    finally:
+        conn.close()
+
+    assert {'idx_journal_entries_user_date', 'idx_journal_entries_course_id', 'idx_courses_user_name'} <= indexes
+    assert not indexes & {'idx_users_username', 'idx_users_email',
+                          'idx_journal_entries_user_id', 'idx_courses_user_id'}
+    assert any('idx_journal_entries_user_date' in detail for detail in plan), plan
+    assert not any(TEMP_BTREE in detail for detail in plan), plan
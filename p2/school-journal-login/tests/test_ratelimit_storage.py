@@ -0,0 +1,128 @@
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import (FixedWindowRateLimiter, MovingWindowRateLimiter,
+                               SlidingWindowCounterRateLimiter)
+
+import ratelimit_storage
+
+STRATEGIES = {
+    'fixed-window': FixedWindowRateLimiter,
+    'moving-window': MovingWindowRateLimiter,
+    'sliding-window-counter': SlidingWindowCounterRateLimiter,
+}
+
+class Clock:
+    """Stands in for the time module so windows can be stepped through."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Start on a minute boundary so fixed and sliding windows line up with it
+    clock = Clock(1_700_000_040.0)
+    monkeypatch.setattr(ratelimit_storage, 'time', clock)
+    return clock
+
+@pytest.fixture
+def uri(tmp_path):
+    return f'sqlite:///{tmp_path}/ratelimits.db'
+
+@pytest.fixture
+def storage(uri, clock):
+    return storage_from_string(uri)
+
+def test_uri_selects_the_sqlite_storage(storage, tmp_path):
+    assert isinstance(storage, ratelimit_storage.SQLiteStorage)
+    assert storage.database == f'{tmp_path}/ratelimits.db'
+    assert storage.check()
+    assert ratelimit_storage.database_from_uri('sqlite:///ratelimits.db') == 'ratelimits.db'
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_counts_up_to_the_limit(storage, strategy):
+    limiter = STRATEGIES[strategy](storage)
+    limit = RateLimitItemPerMinute(3)
+
+    assert [limiter.hit(limit, 'ip') for _ in range(4)] == [True, True, True, False]
+    assert limiter.get_window_stats(limit, 'ip').remaining == 0
+    # Keys are counted separately
+    assert limiter.hit(limit, 'other-ip')
+
+def test_fixed_window_resets_when_the_window_expires(storage, clock):
+    limiter = FixedWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(2)
+    limiter.hit(limit, 'ip')
+    limiter.hit(limit, 'ip')
+
+    clock.now += 59
+    assert not limiter.hit(limit, 'ip')
+    clock.now += 1
+    assert limiter.hit(limit, 'ip')
+    assert limiter.get_window_stats(limit, 'ip').remaining == 1
+
+def test_moving_window_frees_entries_one_by_one(storage, clock):
+    limiter = MovingWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(2)
+    limiter.hit(limit, 'ip')
+    clock.now += 30
+    limiter.hit(limit, 'ip')
+
+    clock.now += 29
+    assert not limiter.hit(limit, 'ip')
+    # The first hit has left the window, the second has not
+    clock.now += 1
+    assert limiter.hit(limit, 'ip')
+    assert not limiter.hit(limit, 'ip')
+
+def test_sliding_window_weights_the_previous_window(storage, clock):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    limit = RateLimitItemPerMinute(4)
+    for _ in range(4):
+        assert limiter.hit(limit, 'ip')
+
+    # Half-way into the next window, half of the previous 4 still count
+    clock.now += 90
+    assert [limiter.hit(limit, 'ip') for _ in range(3)] == [True, True, False]
+    # A window later, the previous window is entirely behind us
+    clock.now += 60
+    assert [limiter.hit(limit, 'ip') for _ in range(4)] == [True, True, True, False]
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_two_connections_share_counts(uri, clock, strategy):
+    # Two storages on one file stand for two worker processes
+    first, second = storage_from_string(uri), storage_from_string(uri)
+    limit = RateLimitItemPerMinute(3)
+
+    assert STRATEGIES[strategy](first).hit(limit, 'ip')
+    assert STRATEGIES[strategy](second).hit(limit, 'ip')
+    assert STRATEGIES[strategy](first).hit(limit, 'ip')
+    assert not STRATEGIES[strategy](second).hit(limit, 'ip')
+    assert first._connection() is not second._connection()
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_clear_forgets_a_key(storage, strategy):
+    limiter = STRATEGIES[strategy](storage)
+    limit = RateLimitItemPerMinute(1)
+    limiter.hit(limit, 'ip')
+
+    limiter.clear(limit, 'ip')
+
+    assert limiter.hit(limit, 'ip')
+
+def test_prune_drops_expired_rows_and_enforces_the_cap(uri, clock):
+    storage = storage_from_string(uri, max_keys=2)
+    storage.incr('expiring', 10)
+    storage.acquire_entry('moving', 5, 10)
+    clock.now += 10
+    for key in ('a', 'b', 'c'):
+        storage.incr(key, 60)
+
+    assert storage.prune() == 3
+    assert storage.get('expiring') == 0
+    assert storage.get_moving_window('moving', 5, 10)[1] == 0
+    # The counter closest to expiring went to keep the table at two rows
+    assert [storage.get(key) for key in ('a', 'b', 'c')] == [0, 1, 1]
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+import database
+
+@pytest.fixture
+def acquired(client, monkeypatch):
+    """Count the pooled connections each request checks out."""
+    client.get('/dashboard')  # consume the login flash
+    count = [0]
+    acquire = database._acquire
+
+    def counted_acquire():
+        count[0] += 1
+        return acquire()
+
+    monkeypatch.setattr(database, '_acquire', counted_acquire)
+    return count
+
+def _checkouts(acquired, client, path):
+    acquired[0] = 0
+    assert client.get(path).status_code == 200, path
+    return acquired[0]
+
+def test_journal_page_uses_one_connection(client, acquired):
+    for day in range(1, 4):
+        client.post('/journal', data={'date': f'2024-03-0{day}', 'subject': 'Maths', 'learnt': 'Things',
+                                      'challenges': 'None', 'schedule': 'Revise'})
+
+    assert _checkouts(acquired, client, '/journal') == 1
+    assert _checkouts(acquired, client, '/journal?limit=2') == 1
+
+def test_static_files_and_home_page_use_no_connection(app, client, acquired):
+    assert (Path(app.static_folder) / 'css' / 'app.css').exists()
+
+    assert _checkouts(acquired, client, '/static/css/app.css') == 0
+    assert _checkouts(acquired, client, '/') == 0
+    assert _checkouts(acquired, app.test_client(), '/') == 0
@@ -0,0 +1,58 @@
+import sqlite3
+
+from conftest import BASELINE_USER
+
+def _tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    finally:
+        conn.close()
+
+def test_startup_upgrades_a_baseline_database(app, baseline_db):
+    import app as app_module
+
+    app_module.initialize_app()
+
+    tables = _tables(baseline_db)
+    assert {'user_data_versions', 'journal_entries_fts', 'journal_course_stats',
+            'journal_daily_stats', 'journal_version_insert', 'journal_stats_insert'} <= tables
+
+    client = app.test_client()
+    client.post('/login', data=BASELINE_USER)
+    client.get('/dashboard')  # consume the login flash
+    for path in ('/journal', '/courses', '/dashboard'):
+        assert client.get(path).status_code == 200, path
+
+    # Entries written before the upgrade are searchable and counted
+    results = client.get('/journal/search?q=photosynthesis').get_json()['results']
+    assert [result['date'] for result in results] == ['2024-03-04']
+    assert b'2 entries in total' in client.get('/dashboard').data
+
+def test_init_db_is_idempotent(app, baseline_db):
+    import database
+
+    database.init_db()
+    database.init_db()
+
+    conn = sqlite3.connect(baseline_db)
+    try:
+        assert conn.execute('SELECT SUM(entry_count) FROM journal_daily_stats').fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM journal_entries_fts WHERE journal_entries_fts MATCH 'printing'").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+def test_init_db_script_upgrades_a_baseline_database(app, baseline_db):
+    import runpy
+    import database
+    from conftest import APP_DIR
+
+    runpy.run_path(str(APP_DIR / 'init_db.py'), run_name='__main__')
+
+    with app.app_context():
+        summary = database.get_dashboard_summary(1)
+        version, updated_at = database.get_data_version(1)
+    assert summary['total_entries'] == 2
+    assert summary['course_counts'] == {0: 2}
+    assert summary['last_entry_date'] == '2024-03-05'
+    assert version == 1 and updated_at is not None
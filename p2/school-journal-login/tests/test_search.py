@@ -0,0 +1,106 @@
+import pytest
+
+def _entry(subject, learnt, date='2024-03-04'):
+    return {'date': date, 'subject': subject, 'learnt': learnt, 'challenges': 'None', 'schedule': 'Revise'}
+
+def _search(client, text, **args):
+    response = client.get('/journal/search', query_string={'q': text, **args})
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+def _only_entry_id(client):
+    entries = client.get('/api/entries').get_json()['entries']
+    assert len(entries) == 1
+    return entries[0]['id']
+
+def test_search_follows_insert_update_and_delete(client):
+    client.post('/journal', data=_entry('Biology', 'Photosynthesis turns light into sugar'))
+    entry_id = _only_entry_id(client)
+
+    results = _search(client, 'photosynthesis')
+    assert [result['id'] for result in results] == [entry_id]
+    assert '<mark>Photosynthesis</mark>' in results[0]['snippet']
+    # The last word matches as a prefix
+    assert [result['id'] for result in _search(client, 'photosyn')] == [entry_id]
+
+    client.post(f'/journal/{entry_id}/edit', data=_entry('Biology', 'Mitochondria make energy'))
+    assert _search(client, 'photosynthesis') == []
+    assert [result['id'] for result in _search(client, 'mitochondria')] == [entry_id]
+
+    client.post(f'/journal/{entry_id}/delete')
+    assert _search(client, 'mitochondria') == []
+    assert _search(client, 'biology') == []
+
+def test_search_only_sees_own_entries(app, client):
+    client.post('/journal', data=_entry('Chemistry', 'Covalent bonds share electrons'))
+
+    other = app.test_client()
+    other.post('/register', data={'first_name': 'Other', 'last_name': 'Student', 'username': 'searchother',
+                                  'email': 'searchother@example.com', 'password': 'Passw0rd!',
+                                  'confirm_password': 'Passw0rd!'})
+    other.post('/login', data={'username': 'searchother', 'password': 'Passw0rd!'})
+
+    assert _search(other, 'covalent') == []
+    assert len(_search(client, 'covalent')) == 1
+
+@pytest.mark.parametrize('text', ['', '   ', '"*()', 'AND OR NOT'])
+def test_search_tolerates_odd_input(client, text):
+    client.post('/journal', data=_entry('Physics', 'Forces and motion'))
+
+    _search(client, text)
+
+def test_upgrade_indexes_existing_entries(app, baseline_db):
+    import database
+
+    database.init_db()
+
+    results = database.search_journal_entries(1, 'printing press')
+    assert [result['date'] for result in results] == ['2024-03-05']
+
+def test_search_matches_and_ranks_only_the_users_rows(app, client):
+    import database
+
+    client.post('/journal', data=_entry('Geology', 'Igneous rocks cool from magma'))
+    other = app.test_client()
+    other.post('/register', data={'first_name': 'Other', 'last_name': 'Student', 'username': 'rankother',
+                                  'email': 'rankother@example.com', 'password': 'Passw0rd!',
+                                  'confirm_password': 'Passw0rd!'})
+    other.post('/login', data={'username': 'rankother', 'password': 'Passw0rd!'})
+    for day in range(1, 6):
+        other.post('/journal', data=_entry('Geology', 'Igneous rocks again', date=f'2024-03-0{day}'))
+    with client.session_transaction() as session:
+        user_id = session['user_id']
+
+    with database.standalone_db() as conn:
+        matched = conn.execute('''SELECT je.user_id FROM journal_entries_fts
+                                  JOIN journal_entries je ON je.id = journal_entries_fts.rowid
+                                  WHERE journal_entries_fts MATCH ?''',
+                               (database._fts_query('igneous', user_id),)).fetchall()
+    assert [row[0] for row in matched] == [user_id]
+    # The user_id column is not searchable as text
+    assert _search(client, str(user_id)) == []
+
+def test_upgrade_recreates_a_search_index_without_user_id(app, baseline_db):
+    import sqlite3
+    import database
+
+    conn = sqlite3.connect(baseline_db)
+    conn.executescript('''
+        CREATE VIRTUAL TABLE journal_entries_fts USING fts5(
+            subject, learnt, challenges, schedule, content='journal_entries', content_rowid='id');
+        CREATE TRIGGER journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN
+            INSERT INTO journal_entries_fts (rowid, subject, learnt, challenges, schedule)
+            VALUES (new.id, new.subject, new.learnt, new.challenges, new.schedule);
+        END;
+    ''')
+    conn.close()
+
+    database.init_db()
+
+    conn = sqlite3.connect(baseline_db)
+    try:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(journal_entries_fts)')]
+    finally:
+        conn.close()
+    assert 'user_id' in columns
+    assert [result['date'] for result in database.search_journal_entries(1, 'printing')] == ['2024-03-05']
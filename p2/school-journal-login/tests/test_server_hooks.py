@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import logging_config
+import security
+
+@pytest.fixture
+def start(app):
+    import start
+    return start
+
+@pytest.fixture
+def inherited(app):
+    """Undo what the fork hooks leave behind once the test is done."""
+    yield database._inherited_pools
+    for pool in database._inherited_pools:
+        pool.close_all()
+    database._inherited_pools.clear()
+
+def test_post_fork_resets_pools_and_logging(start, inherited, monkeypatch):
+    parent_pool = database.get_pool()
+    with database.standalone_db() as conn:
+        conn.execute('SELECT 1').fetchone()
+    parent_slots = security._slots
+    monkeypatch.setattr(security, '_executor', object())
+    parent_listener = logging_config._listener
+
+    start.post_fork(None, SimpleNamespace(pid=4242))
+
+    # The parent's pool is kept alive, untouched, and a new one opens on use
+    assert inherited == [parent_pool]
+    assert database._pool is None
+    assert database.get_pool() is not parent_pool
+    assert security._executor is None
+    assert security._slots is not parent_slots
+    assert logging_config._listener is not None
+    assert logging_config._listener is not parent_listener
+    # The new pool and listener work in the "worker"
+    with database.standalone_db() as conn:
+        assert conn.execute('SELECT 1').fetchone()[0] == 1
+
+def test_worker_exit_releases_pools(start, monkeypatch):
+    shutdowns = []
+    monkeypatch.setattr(security, 'shutdown_hashing_pool', lambda: shutdowns.append(True))
+    database.get_pool()
+
+    start.worker_exit(None, SimpleNamespace(pid=4242))
+
+    assert database._pool is None
+    assert shutdowns == [True]
+
+def test_serve_installs_the_hooks(start):
+    pytest.importorskip('gunicorn')
+
+    server = start.create_server({'workers': 2, 'preload_app': True,
+                                  'post_fork': start.post_fork, 'worker_exit': start.worker_exit})
+
+    assert server.cfg.workers == 2
+    assert server.cfg.post_fork is start.post_fork
+    assert server.cfg.worker_exit is start.worker_exit
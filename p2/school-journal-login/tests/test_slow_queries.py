@@ -0,0 +1,85 @@
+import json
+import time
+
+import pytest
+
+import config
+import database
+import logging_config
+import slow_queries
+
+ROW_DELAY = 0.01
+
+@pytest.fixture
+def recorder(app, tmp_path, monkeypatch):
+    """The slow-query recorder at a 30 ms threshold, logging to a temporary file."""
+    log_file = tmp_path / 'slow_queries.log'
+    monkeypatch.setattr(config, 'SLOW_QUERY_THRESHOLD_MS', 30.0)
+    monkeypatch.setattr(config, 'SLOW_QUERY_LOG_FILE', str(log_file))
+    slow_queries.clear()
+    slow_queries._configure_log()
+    database.add_statement_listener(slow_queries.record_statement)
+    yield log_file
+    database.remove_statement_listener(slow_queries.record_statement)
+    slow_queries.clear()
+    logging_config._log_files.pop('slow_queries.log', None)
+    logging_config.stop_logging()
+    monkeypatch.undo()
+    logging_config.configure_logging()
+
+@pytest.fixture
+def conn(app):
+    with database.standalone_db() as conn:
+        conn.create_function('slow', 1, lambda x: time.sleep(ROW_DELAY) or x)
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS scan_check (x INTEGER)')
+        conn.execute('DELETE FROM scan_check')
+        conn.executemany('INSERT INTO scan_check (x) VALUES (?)', [(i,) for i in range(1, 6)])
+        yield conn
+
+def _flushed_log(path):
+    logging_config.stop_logging()
+    try:
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    finally:
+        logging_config.configure_logging()
+
+def test_slow_scan_is_recorded_with_its_plan(recorder, conn):
+    # execute() only finds the first row (one delay); the scan's cost is in the fetch
+    rows = conn.execute('SELECT x FROM scan_check WHERE slow(x) > ?', (0,)).fetchall()
+    assert len(rows) == 5
+
+    (record,) = slow_queries.recent()
+    assert record['sql'] == 'SELECT x FROM scan_check WHERE slow(x) > ?'
+    assert record['duration_ms'] >= 5 * ROW_DELAY * 1000 * 0.9
+    assert record['parameters'] == ['int']
+    assert record['full_scan'] is True
+    assert any(line.strip().startswith('SCAN scan_check') for line in record['plan'])
+
+    (logged,) = _flushed_log(recorder)
+    assert logged == record
+
+def test_fast_statement_is_not_recorded(recorder, conn):
+    conn.execute('SELECT x FROM scan_check WHERE x = ?', (3,)).fetchall()
+
+    assert slow_queries.recent() == []
+
+def test_slow_log_stays_out_of_the_main_log(recorder, conn, tmp_path, monkeypatch):
+    main_log = tmp_path / 'app.log'
+    monkeypatch.setattr(config, 'LOG_FILE', str(main_log))
+    logging_config.stop_logging()
+    logging_config.configure_logging()
+
+    conn.execute('SELECT x FROM scan_check WHERE slow(x) > ?', (0,)).fetchall()
+    _flushed_log(recorder)
+
+    lines = main_log.read_text().splitlines()
+    assert any('Slow query' in line for line in lines)
+    assert not any('"plan"' in line for line in lines)
+
+def test_records_are_not_served_over_http(recorder):
+    from flask import Flask
+
+    flask_app = Flask('slow_queries_check')
+    slow_queries.init_app(flask_app)
+
+    assert [rule.rule for rule in flask_app.url_map.iter_rules()] == ['/static/<path:filename>']
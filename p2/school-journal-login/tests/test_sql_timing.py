@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+import database
+
+ROW_DELAY = 0.01
+ROWS = 5
+SLOW_SQL = ('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) '
+            'SELECT slow(i) AS i FROM n')
+
+@pytest.fixture
+def timed(app):
+    """A pooled connection with a slow() SQL function, and the statements reported for it."""
+    reported = []
+
+    def listener(conn, sql, parameters, seconds):
+        if sql == SLOW_SQL or sql.startswith('CREATE TEMP'):
+            reported.append((sql, seconds))
+
+    database.add_statement_listener(listener)
+    with database.standalone_db() as conn:
+        conn.create_function('slow', 1, lambda i: time.sleep(ROW_DELAY) or i)
+        yield conn, reported
+    database.remove_statement_listener(listener)
+
+def _assert_whole_scan_reported(reported):
+    assert len(reported) == 1
+    # Only the first row is produced by execute(); the rest while fetching
+    assert reported[0][1] >= ROWS * ROW_DELAY * 0.9
+
+def test_fetchall_is_timed(timed):
+    conn, reported = timed
+
+    rows = conn.execute(SLOW_SQL, (ROWS,)).fetchall()
+
+    assert len(rows) == ROWS
+    _assert_whole_scan_reported(reported)
+
+def test_iteration_is_timed_and_reported_when_exhausted(timed):
+    conn, reported = timed
+    cursor = conn.execute(SLOW_SQL, (ROWS,))
+
+    rows = []
+    for row in cursor:
+        rows.append(row)
+        assert reported == []
+
+    assert len(rows) == ROWS
+    _assert_whole_scan_reported(reported)
+
+def test_fetchmany_and_fetchone_are_timed(timed):
+    conn, reported = timed
+    cursor = conn.cursor()
+
+    cursor.execute(SLOW_SQL, (ROWS,))
+    assert len(cursor.fetchmany(2)) == 2
+    assert reported == []
+    while cursor.fetchone() is not None:
+        pass
+
+    _assert_whole_scan_reported(reported)
+
+def test_unfinished_cursor_is_reported_when_closed_reexecuted_or_dropped(timed):
+    conn, reported = timed
+
+    cursor = conn.execute(SLOW_SQL, (ROWS,))
+    cursor.fetchone()
+    cursor.close()
+    cursor = conn.execute(SLOW_SQL, (ROWS,))
+    cursor.fetchone()
+    cursor.execute(SLOW_SQL, (ROWS,))
+    assert len(reported) == 2
+    del cursor
+    conn.execute(SLOW_SQL, (ROWS,)).fetchone()
+
+    assert len(reported) == 4
+
+def test_statement_without_rows_is_reported_at_once(timed):
+    conn, reported = timed
+
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS timing_check (i INTEGER)')
+
+    assert [sql for sql, _ in reported] == ['CREATE TEMP TABLE IF NOT EXISTS timing_check (i INTEGER)']
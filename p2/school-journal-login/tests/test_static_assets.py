@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+from flask import Flask, url_for
+
+import static_assets
+
+CSS = b'body { color: #333; }\n' * 40
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'app.css').write_bytes(CSS)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG' + bytes(500))
+    return tmp_path
+
+@pytest.fixture
+def built_app(static_dir):
+    manifest = static_assets.build(static_dir)
+    app = Flask(__name__, static_folder=str(static_dir), static_url_path='/static')
+    static_assets.init_app(app)
+    return app, manifest
+
+def test_build_hashes_and_precompresses(static_dir):
+    manifest = static_assets.build(static_dir)
+
+    target = manifest['css/app.css']
+    assert target != 'css/app.css' and target.endswith('.css')
+    dist = static_dir / 'dist'
+    assert (dist / target).read_bytes() == CSS
+    assert gzip.decompress((dist / (target + '.gz')).read_bytes()) == CSS
+    assert not (dist / (manifest['logo.png'] + '.gz')).exists()
+    assert static_assets.build(static_dir) == manifest
+
+def test_url_for_emits_hashed_name(built_app):
+    app, manifest = built_app
+    with app.test_request_context():
+        assert url_for('static', filename='css/app.css') == '/static/dist/' + manifest['css/app.css']
+        assert url_for('static', filename='missing.js') == '/static/missing.js'
+
+def test_hashed_asset_is_immutable_and_precompressed(built_app):
+    app, manifest = built_app
+    url = '/static/dist/' + manifest['css/app.css']
+    client = app.test_client()
+
+    plain = client.get(url)
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert plain.data == CSS
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == 'text/css'
+    assert gzip.decompress(compressed.data) == CSS
+    for response in (plain, compressed):
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == static_assets.IMMUTABLE_MAX_AGE
+        assert 'Accept-Encoding' in response.vary
+        response.close()
+
+def test_clean_removes_stale_builds(static_dir):
+    old = static_assets.build(static_dir)['css/app.css']
+    (static_dir / 'css' / 'app.css').write_bytes(CSS + b'a { color: red; }\n')
+
+    new = static_assets.build(static_dir, clean=True)['css/app.css']
+
+    assert new != old
+    assert not (static_dir / 'dist' / old).exists()
+    assert (static_dir / 'dist' / new).exists()
@@ -0,0 +1,92 @@
+import business
+import cache
+import config
+import database
+
+def _user_queries(statements):
+    return [sql for sql in statements if 'FROM users' in sql]
+
+def _session_user(client):
+    with client.session_transaction() as session:
+        return session['user_id'], session['user']
+
+def _in_request(app, func, *args, **session_values):
+    """Call func in its own request, committed at teardown like a real one."""
+    from flask import session
+
+    with app.test_request_context():
+        session.update(session_values)
+        return func(*args)
+
+def test_repeated_lookups_hit_the_cache(app, client, statements):
+    user_id, username = _session_user(client)
+    database.user_cache.clear()
+    before = database.user_cache.stats()
+
+    first = _in_request(app, database.get_user_by_id, user_id)
+    statements.clear()
+    assert _in_request(app, database.get_user_by_id, user_id) is first
+    assert _in_request(app, database.get_user_by_username, username) is first
+
+    assert _user_queries(statements) == []
+    stats = database.user_cache.stats()
+    assert stats['misses'] - before['misses'] == 1
+    assert stats['hits'] - before['hits'] == 2
+
+def test_cache_is_bounded_by_size_and_ttl(monkeypatch):
+    assert database.user_cache.max_size == config.USER_CACHE_SIZE
+    assert database.user_cache.ttl == config.USER_CACHE_TTL
+
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    users = cache.LRUCache(max_size=2, ttl=60)
+    users.set(('id', 1), 'first')
+    users.set(('id', 2), 'second')
+    users.get(('id', 1))
+    users.set(('id', 3), 'third')
+
+    assert users.get(('id', 2)) is None  # least recently used went first
+    assert users.get(('id', 1)) == 'first'
+    now[0] += 61
+    assert users.get(('id', 1)) is None
+    assert users.stats() == {'hits': 2, 'misses': 2, 'evictions': 1, 'size': 1, 'max_size': 2}
+
+def test_profile_update_invalidates_both_keys(app, client):
+    user_id, username = _session_user(client)
+    _in_request(app, database.get_user_by_id, user_id)
+    renamed = username + 'x'
+
+    assert _in_request(app, business.handle_profile_update, user_id, 'Renamed', 'Student', renamed,
+                       f'{renamed}@example.com', '')
+
+    assert _in_request(app, database.get_user_by_id, user_id)['first_name'] == 'Renamed'
+    assert _in_request(app, database.get_user_by_username, username) is None
+    assert _in_request(app, database.get_user_by_username, renamed)['id'] == user_id
+
+def test_password_change_invalidates_the_cached_hash(app, client):
+    import app as app_module
+
+    user_id, username = _session_user(client)
+    old_hash = _in_request(app, database.get_user_by_username, username)['password']
+
+    assert _in_request(app, app_module.handle_profile_update, 'N3wPassw0rd!', 'N3wPassw0rd!',
+                       user=username, user_id=user_id)
+
+    assert _in_request(app, database.get_user_by_username, username)['password'] != old_hash
+    fresh = app.test_client()
+    fresh.post('/login', data={'username': username, 'password': 'Passw0rd!'})
+    with fresh.session_transaction() as session:
+        assert 'user' not in session
+    fresh.post('/login', data={'username': username, 'password': 'N3wPassw0rd!'})
+    with fresh.session_transaction() as session:
+        assert session.get('user') == username
+
+def test_create_user_drops_stale_entries(app):
+    database.user_cache.set(('username', 'cachedfresh'), {'id': -1, 'username': 'cachedfresh'})
+
+    assert _in_request(app, database.create_user, 'Cached', 'Fresh', 'cachedfresh', 'cachedfresh@example.com',
+                       'Passw0rd!')
+
+    user = _in_request(app, database.get_user_by_username, 'cachedfresh')
+    assert user['id'] > 0
+    assert _in_request(app, database.get_user_by_id, user['id']) is user
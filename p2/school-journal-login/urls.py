@@ -1,20 +1,28 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from business import handle_login, handle_register, handle_profile_update
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, session, jsonify
+from business import handle_login, handle_register
+from security import HashingBusyError
+from conditional import conditional_page, current_data_version, TEMPLATES_STAMP
+import fragment_cache
+from flask_limiter.util import get_remote_address
+import login_throttle
+from journal_api import (ApiError, api_view, apply_one, course_fields, course_json, entry_fields,
+                         entry_json, entry_summary_json, form_entry_fields, json_body, run_batch)
+from importer import import_entries, read_rows, guess_format
+from exporter import export_journal, export_filename, FORMATS as EXPORT_FORMATS
 from database import (
-    get_db,
-    get_user_by_id,
-    create_user,
-    create_journal_entry,
-    get_journal_entries,
-    update_journal_entry,
+    get_journal_page,
+    get_dashboard_summary,
+    get_journal_entry,
+    search_journal_entries,
     delete_journal_entry,
-    close_db,
     get_courses_by_user,
     add_course,
     delete_course
 )
+import io
 import logging
 import sqlite3
+from config import JOURNAL_PAGE_SIZE
 
 
 # Setup logger
@@ -29,16 +37,20 @@ def home():
     return render_template('home.html')
 
 @main.route('/dashboard')
+@conditional_page
 def dashboard():
     if 'user' not in session:
         return redirect(url_for('main.login'))
     
     courses = get_courses_by_user(session['user_id'])
+    summary = get_dashboard_summary(session['user_id'])
     return render_template('dashboard.html', 
                         user=session['user'],
-                        courses=courses)
+                        courses=courses,
+                        summary=summary)
 
 @main.route('/courses', methods=['GET', 'POST'])
+@conditional_page
 def courses():
     if 'user' not in session:
         return redirect(url_for('main.login'))
@@ -57,7 +69,7 @@ def delete_course_route(course_id):
     if 'user' not in session:
         return redirect(url_for('main.login'))
 
-    delete_course(session['user_id'], course_id)
+    delete_course(course_id, session['user_id'])
     return redirect(url_for('main.courses'))
 
 @main.route('/login', methods=['GET', 'POST'])
@@ -67,45 +79,58 @@ def login():
             username = request.form.get('username')
             password = request.form.get('password')
             
-            logger.debug(f"Login attempt for username: {username}")
+            logger.debug("Login attempt for username: %s", username)
             
             # Validate input
             if not username or not password:
                 logger.debug("Login failed: missing username or password")
                 flash('Please enter both username and password', 'error')
                 return render_template('login.html')
+
+            # Throttled attempts are turned away before any lookup or hashing
+            client_ip = get_remote_address()
+            retry_after = login_throttle.check(username, client_ip)
+            if retry_after:
+                logger.info("Login throttled for user %s from %s", username, client_ip)
+                flash(f'Too many failed login attempts. Please try again in {retry_after} seconds.', 'error')
+                return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
             
             # Try to log in
             user = handle_login(username, password)
-            logger.debug(f"handle_login returned: {user}")
+            logger.debug("handle_login returned: %s", user)
             
             if user:
+                login_throttle.record_success(username)
+
                 # Set session variables
                 session.permanent = True
                 session['user'] = username
                 session['user_id'] = user['id']
                 
-                logger.debug(f"Login successful for user: {username}")
-                logger.debug(f"Session contents after login: {dict(session)}")
+                logger.debug("Login successful for user: %s", username)
                 
                 flash('Welcome back!', 'success')
                 logger.debug("Redirecting to dashboard page")
                 return redirect(url_for('main.dashboard'))
             else:
-                logger.debug(f"Login failed for username: {username}")
+                logger.debug("Login failed for username: %s", username)
+                login_throttle.record_failure(username, client_ip)
                 flash('Invalid username or password', 'error')
                 return render_template('login.html')
         
         # Check if user is already logged in
         if 'user' in session:
-            logger.debug(f"User already logged in: {session['user']}")
+            logger.debug("User already logged in: %s", session['user'])
             flash('You are already logged in', 'info')
             return redirect(url_for('main.journal'))
         
         logger.debug("Rendering login page")
         return render_template('login.html')
+    except HashingBusyError:
+        flash('The server is busy. Please try again in a moment.', 'error')
+        return render_template('login.html'), 503
     except Exception as e:
-        logger.error(f'Login error: {str(e)}')
+        logger.error('Login error: %s', e)
         flash('An unexpected error occurred. Please try again later.', 'error')
         return render_template('login.html')
 
@@ -120,8 +145,8 @@ def register():
             password = request.form.get('password')
             confirm_password = request.form.get('confirm_password')
             
-            logger.debug(f"Registration attempt for username: {username}")
-            logger.debug(f"Form data: first_name={first_name}, last_name={last_name}, email={email}, username={username}")
+            logger.debug("Registration attempt for username: %s", username)
+            logger.debug("Form data: first_name=%s, last_name=%s, email=%s, username=%s", first_name, last_name, email, username)
             
             # Validate input
             if not all([first_name, last_name, username, email, password, confirm_password]):
@@ -130,38 +155,41 @@ def register():
                 return render_template('register.html')
             
             if not username.isalnum() and '_' not in username:
-                logger.debug(f"Registration failed: invalid username format: {username}")
+                logger.debug("Registration failed: invalid username format: %s", username)
                 flash('Username can only contain letters, numbers, and underscores', 'error')
                 return render_template('register.html')
             
             if len(password) < 8:
-                logger.debug(f"Registration failed: password too short")
+                logger.debug("Registration failed: password too short")
                 flash('Password must be at least 8 characters long', 'error')
                 return render_template('register.html')
             
             # Try to register user
             success = handle_register(first_name, last_name, username, email, password, confirm_password)
-            logger.debug(f"handle_register returned: {success}")
+            logger.debug("handle_register returned: %s", success)
             
             if success:
-                logger.debug(f"Registration successful for user: {username}")
+                logger.debug("Registration successful for user: %s", username)
                 flash('Registration successful! You can now start adding journal entries.', 'success')
                 return redirect(url_for('main.login'))
             else:
-                logger.debug(f"Registration failed for user: {username}")
+                logger.debug("Registration failed for user: %s", username)
                 flash('Registration failed. Please try again.', 'error')
                 return render_template('register.html')
         
         # Check if user is already logged in
         if 'user' in session:
-            logger.debug(f"User already logged in: {session['user']}")
+            logger.debug("User already logged in: %s", session['user'])
             flash('You are already logged in', 'info')
             return redirect(url_for('main.journal'))
         
         logger.debug("Rendering register page")
         return render_template('register.html')
+    except HashingBusyError:
+        flash('The server is busy. Please try again in a moment.', 'error')
+        return render_template('register.html'), 503
     except Exception as e:
-        logger.error(f'Registration error: {str(e)}', exc_info=True)
+        logger.error('Registration error: %s', e, exc_info=True)
         flash(f'An unexpected error occurred: {str(e)}', 'error')
         return render_template('register.html')
 
@@ -169,7 +197,31 @@ def register():
 def profile():
     return render_template('profile.html')
 
+def journal_fragments(user_id, limit=JOURNAL_PAGE_SIZE, after=None, before=None):
+    """Render (or reuse) the journal page's entries table and course options.
+
+    Both are cached per data version, so a repeat view runs no queries and
+    no template loops.
+    """
+    version = current_data_version(user_id)
+
+    def entries_table():
+        page = get_journal_page(user_id, limit=limit, after=after, before=before, with_total=True)
+        logger.debug("Fetched %s of %s journal entries for user %s", len(page['entries']), page['total'], user_id)
+        return render_template('_journal_entries.html', entries=page['entries'], page=page)
+
+    def course_options():
+        return render_template('_course_options.html', courses=get_courses_by_user(user_id))
+
+    return {
+        'entries_table': fragment_cache.cached('journal', user_id, version,
+                                               (TEMPLATES_STAMP, limit, after, before), entries_table),
+        'course_options': fragment_cache.cached('courses', user_id, version,
+                                                (TEMPLATES_STAMP,), course_options),
+    }
+
 @main.route('/journal')
+@conditional_page
 def journal():
     try:
         if 'user' not in session:
@@ -177,36 +229,108 @@ def journal():
             flash('Please log in first', 'error')
             return redirect(url_for('main.login'))
         
-        # Get journal entries
-        with get_db() as conn:
-            c = conn.cursor()
-            entries = c.execute('''
-                SELECT * FROM journal_entries 
-                WHERE user_id = ?
-                ORDER BY date DESC
-            ''', (session['user_id'],)).fetchall()
-            
-            if entries:
-                logger.debug(f"Fetched {len(entries)} journal entries for user {session['user_id']}")
-            else:
-                logger.debug(f"No journal entries found for user {session['user_id']}")
-
-        # Get courses
-        courses = get_courses_by_user(session['user_id'])
-        
-        return render_template('journal.html', entries=entries, courses=courses)
+        return render_template('journal.html', **journal_fragments(
+            session['user_id'],
+            limit=request.args.get('limit', JOURNAL_PAGE_SIZE, type=int),
+            after=request.args.get('after'),
+            before=request.args.get('before')))
         
     except sqlite3.Error as e:
-        logger.error(f"Database error while fetching journal entries: {str(e)}", exc_info=True)
+        logger.error("Database error while fetching journal entries: %s", e, exc_info=True)
         flash('Database error occurred', 'error')
         return redirect(url_for('main.login'))
     except Exception as e:
-        logger.error(f"Journal page error: {str(e)}", exc_info=True)
+        logger.error("Journal page error: %s", e, exc_info=True)
         flash(f'An unexpected error occurred: {str(e)}', 'error')
         return render_template('error.html', error=str(e)), 500
 
-@main.route('/journal/delete/<int:idx>', methods=['POST'])
-def delete_entry(idx):
+@main.route('/journal/search')
+def search_entries():
+    if 'user' not in session:
+        return jsonify(error='Please log in first'), 401
+
+    query = request.args.get('q', '').strip()
+    try:
+        results = search_journal_entries(session['user_id'], query,
+                                         course_id=request.args.get('course_id', type=int),
+                                         date_from=request.args.get('date_from'),
+                                         date_to=request.args.get('date_to'),
+                                         limit=request.args.get('limit', JOURNAL_PAGE_SIZE, type=int))
+    except sqlite3.Error as e:
+        logger.error("Database error while searching journal entries: %s", e)
+        return jsonify(error='Database error occurred'), 500
+
+    return jsonify(query=query, results=[
+        {**result, 'subject': str(result['subject']), 'snippet': str(result['snippet'])}
+        for result in results
+    ])
+
+@main.route('/journal/import', methods=['POST'])
+def import_entries_route():
+    if 'user' not in session:
+        return jsonify(error='Please log in first'), 401
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(error='Please choose a file to import'), 400
+    fmt = request.form.get('format') or guess_format(upload.filename)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify(error=f'Unsupported format: {fmt}'), 400
+
+    # Stream the upload straight into batched inserts without reading it whole
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        stats = import_entries(read_rows(stream, fmt), user_id=session['user_id'])
+    except UnicodeDecodeError:
+        return jsonify(error='The file must be UTF-8 encoded text'), 400
+    except sqlite3.Error as e:
+        logger.error("Database error while importing journal entries: %s", e)
+        return jsonify(error='Database error occurred'), 500
+
+    logger.info("Imported %s journal entries for user %s (%s rejected)", stats['inserted'], session['user_id'], stats['rejected'])
+    return jsonify(stats)
+
+@main.route('/journal/export')
+def export_entries():
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('main.login'))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        flash(f'Unsupported export format: {fmt}', 'error')
+        return redirect(url_for('main.journal'))
+    compress = request.args.get('gzip', type=int) == 1
+
+    chunks = export_journal(session['user_id'], fmt, compress=compress,
+                            course_id=request.args.get('course_id', type=int),
+                            date_from=request.args.get('date_from'),
+                            date_to=request.args.get('date_to'))
+    mimetype = 'application/gzip' if compress else EXPORT_FORMATS[fmt][0]
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+    return response
+
+@main.route('/journal/<int:entry_id>')
+def view_entry(entry_id):
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('main.login'))
+
+    try:
+        entry = get_journal_entry(entry_id, session['user_id'])
+    except sqlite3.Error as e:
+        logger.error("Database error while fetching journal entry: %s", e)
+        flash('Database error occurred', 'error')
+        return redirect(url_for('main.journal'))
+
+    if entry is None:
+        flash('Entry not found', 'error')
+        return redirect(url_for('main.journal'))
+    return render_template('view_entry.html', entry=entry)
+
+@main.route('/journal/<int:entry_id>/delete', methods=['POST'])
+def delete_entry(entry_id):
     try:
         if 'user' not in session:
             logger.debug("User not logged in")
@@ -214,70 +338,134 @@ def delete_entry(idx):
             return redirect(url_for('main.login'))
         
         try:
-            if delete_journal_entry(idx, session['user_id']):
-                logger.debug(f"Successfully deleted journal entry {idx}")
+            if delete_journal_entry(entry_id, session['user_id']):
+                logger.debug("Successfully deleted journal entry %s", entry_id)
                 flash('Journal entry deleted successfully', 'success')
             else:
-                logger.error(f"Failed to delete journal entry {idx}")
-                flash('Failed to delete journal entry', 'error')
+                logger.debug("Journal entry %s not found", entry_id)
+                flash('Entry not found', 'error')
         except sqlite3.Error as e:
-            logger.error(f"Database error while deleting journal entry: {str(e)}")
+            logger.error("Database error while deleting journal entry: %s", e)
             flash('Database error occurred', 'error')
         
     except Exception as e:
-        logger.error(f"Delete entry error: {str(e)}")
+        logger.error("Delete entry error: %s", e)
         flash('An unexpected error occurred', 'error')
     
     return redirect(url_for('main.journal'))
 
-@main.route('/edit/<int:idx>', methods=['GET', 'POST'])
-def edit_entry(idx):
+@main.route('/journal/<int:entry_id>/edit', methods=['GET', 'POST'])
+def edit_entry(entry_id):
     try:
         if 'user' not in session:
             flash('Please log in first', 'error')
             return redirect(url_for('main.login'))
         
-        try:
-            entries = get_journal_entries(session['user_id'])
-            courses = get_courses(session['user_id'])
-            if idx >= len(entries):
-                flash('Entry not found', 'error')
-                return redirect(url_for('main.journal'))
-            
-            entry = entries[idx]
-            
-            if request.method == 'POST':
-                course_id = request.form.get('course_id')
-                date = request.form.get('date')
-                subject = request.form.get('subject')
-                learnt = request.form.get('learnt')
-                challenges = request.form.get('challenges')
-                schedule = request.form.get('schedule')
-                
-                if not all([course_id, date, subject, learnt, challenges, schedule]):
-                    flash('Please fill in all fields', 'error')
-                    return render_template('journal.html', 
-                                        user=session['user'],
-                                        entries=entries,
-                                        courses=courses,
-                                        editing=True,
-                                        current_idx=idx)
-                
-                if update_journal_entry(entry[0], session['user_id'], course_id, date, subject, learnt, challenges, schedule):
-                    flash('Entry updated successfully', 'success')
-                else:
-                    flash('Failed to update entry', 'error')
-                
-                return redirect(url_for('main.journal'))
+        if request.method == 'POST':
+            if not all(request.form.get(name) for name in ('date', 'subject', 'learnt', 'challenges', 'schedule')):
+                flash('Please fill in all fields', 'error')
+                return redirect(url_for('main.edit_entry', entry_id=entry_id))
+
+            # Validated and written like PATCH /api/entries/<id>: the course must be the user's own
+            try:
+                apply_one(session['user_id'], 'update_entry', entry_id, form_entry_fields(request.form))
+            except ApiError as e:
+                if e.status == 404:
+                    flash('Entry not found', 'error')
+                    return redirect(url_for('main.journal'))
+                flash(str(e), 'error')
+                return redirect(url_for('main.edit_entry', entry_id=entry_id))
+
+            flash('Entry updated successfully', 'success')
             return redirect(url_for('main.journal'))
-        finally:
-            close_db(conn)
+
+        entry = get_journal_entry(entry_id, session['user_id'])
+        if entry is None:
+            flash('Entry not found', 'error')
+            return redirect(url_for('main.journal'))
+
+        courses = get_courses_by_user(session['user_id'])
+        return render_template('edit_entry.html', entry=entry, courses=courses)
             
     except Exception as e:
-        logger.error(f"Edit entry error: {str(e)}")
+        logger.error("Edit entry error: %s", e)
         flash('An unexpected error occurred', 'error')
         return redirect(url_for('main.journal'))
 
+# JSON API for entries and courses. Every write, single or batched, goes
+# through database.apply_journal_batch(); payloads are in journal_api.py.
+
+@main.route('/api/entries', methods=['GET'])
+@api_view
+def api_list_entries():
+    page = get_journal_page(session['user_id'],
+                            limit=request.args.get('limit', JOURNAL_PAGE_SIZE, type=int),
+                            after=request.args.get('after'),
+                            before=request.args.get('before'),
+                            with_total=True)
+    return jsonify(entries=[entry_summary_json(entry) for entry in page['entries']],
+                   next_cursor=page['next_cursor'], prev_cursor=page['prev_cursor'],
+                   limit=page['limit'], total=page['total'])
+
+@main.route('/api/entries', methods=['POST'])
+@api_view
+def api_create_entry():
+    entry_id = apply_one(session['user_id'], 'create_entry', None, entry_fields(json_body()))
+    entry = get_journal_entry(entry_id, session['user_id'])
+    return jsonify(entry_json(entry)), 201, {'Location': url_for('main.api_entry', entry_id=entry_id)}
+
+@main.route('/api/entries/<int:entry_id>', methods=['GET'])
+@api_view
+def api_entry(entry_id):
+    entry = get_journal_entry(entry_id, session['user_id'])
+    if entry is None:
+        raise ApiError('Entry not found', 404)
+    return jsonify(entry_json(entry))
+
+@main.route('/api/entries/<int:entry_id>', methods=['PUT', 'PATCH'])
+@api_view
+def api_update_entry(entry_id):
+    # PUT replaces every field, PATCH only the ones given
+    fields = entry_fields(json_body(), partial=request.method == 'PATCH')
+    apply_one(session['user_id'], 'update_entry', entry_id, fields)
+    return jsonify(entry_json(get_journal_entry(entry_id, session['user_id'])))
+
+@main.route('/api/entries/<int:entry_id>', methods=['DELETE'])
+@api_view
+def api_delete_entry(entry_id):
+    apply_one(session['user_id'], 'delete_entry', entry_id, {})
+    return '', 204
+
+@main.route('/api/courses', methods=['GET'])
+@api_view
+def api_list_courses():
+    return jsonify(courses=[course_json(course) for course in get_courses_by_user(session['user_id'])])
+
+@main.route('/api/courses', methods=['POST'])
+@api_view
+def api_create_course():
+    fields = course_fields(json_body())
+    course_id = apply_one(session['user_id'], 'create_course', None, fields)
+    return jsonify(id=course_id, **fields), 201
+
+@main.route('/api/courses/<int:course_id>', methods=['DELETE'])
+@api_view
+def api_delete_course(course_id):
+    apply_one(session['user_id'], 'delete_course', course_id, {})
+    return '', 204
+
+@main.route('/api/batch', methods=['POST'])
+@api_view
+def api_batch():
+    """Apply many entry and course operations in one transaction.
+
+    Body: {"operations": [{"op": "update_entry", "id": 7, "data": {...}}, ...],
+    "atomic": false}. Each item gets its own status; with "atomic" any
+    failure rolls back the whole batch and the response is a 409.
+    """
+    committed, results = run_batch(session['user_id'], json_body())
+    return jsonify(committed=committed, results=results), 200 if committed else 409
+
 @main.route('/logout')
 def logout():
     try:
@@ -288,6 +476,6 @@ def logout():
         flash('You have been logged out', 'info')
         return redirect(url_for('main.home'))
     except Exception as e:
-        logger.error(f'Logout error: {str(e)}')
+        logger.error('Logout error: %s', e)
         flash('An error occurred while logging out', 'error')
         return redirect(url_for('main.home'))